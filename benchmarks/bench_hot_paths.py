@@ -0,0 +1,208 @@
+"""
+Микробенчмарки горячих путей: то, что выполняется на каждое сообщение.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_hot_paths --sizes 1000,10000,100000 --json hot_paths.json
+    python -m benchmarks.bench_hot_paths --compare old.json new.json
+
+Для каждого размера синтетического кэша (tools/synthetic.py):
+    • find_employee_in_cache — попадание и промах;
+    • search_employees_by_name (в том числе начало слова с опечаткой —
+      с долей найденных), search_employees_by_pvz;
+    • normalize_id, normalize_pvz;
+    • форматтеры ответов из handlers/user и handlers/pvz_search;
+    • память снимка кэша на одного сотрудника (tracemalloc).
+
+Время — медиана из нескольких повторов, в микросекундах на вызов.
+Логирование отключено: меряется сам код, а не вывод логов.
+JSON с результатами содержит коммит, чтобы сравнивать прогоны (--compare).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+REPEATS = 5
+# Минимальная длительность одного повтора (сек)
+MIN_REPEAT_TIME = 0.2
+
+
+def _timeit(func, args_list: list) -> float:
+    """Медиана времени одного вызова (мкс); аргументы перебираются по кругу."""
+    n = len(args_list)
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for i in range(loops):
+            func(*args_list[i % n])
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_REPEAT_TIME or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < MIN_REPEAT_TIME / 10 else 2
+
+    samples = [elapsed / loops]
+    for _ in range(REPEATS - 1):
+        start = time.perf_counter()
+        for i in range(loops):
+            func(*args_list[i % n])
+        samples.append((time.perf_counter() - start) / loops)
+    return statistics.median(samples) * 1e6
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def bench_size(employees: int, seed: int) -> dict:
+    from tools.synthetic import generate_raw_cache
+    from utils import cache_manager
+    from utils.helpers import normalize_id, normalize_pvz
+    from handlers.pvz_search import format_employee_short
+    from utils.templates import employee_card
+
+    raw_cache = generate_raw_cache(employees, sheets=max(1, employees // 100), seed=seed)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    build_started = time.perf_counter()
+    cache_manager.install_cache(raw_cache)
+    build_s = time.perf_counter() - build_started
+    snapshot_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    snapshot = cache_manager.get_snapshot()
+    staff = snapshot["employees"]
+    rng = random.Random(seed)
+    sample = [rng.choice(staff) for _ in range(256)]
+
+    hits = [(emp["employee_id"], emp["role"]) for emp in sample]
+    misses = [(str(rng.randint(1_000_000, 9_999_999)), rng.choice(("admin", "mfu"))) for _ in range(256)]
+    names = []
+    for emp in sample:
+        token = rng.choice(emp["fio"].split())
+        if len(token) > 5 and rng.random() < 0.3:
+            i = rng.randrange(len(token))
+            token = token[:i] + token[i + 1:]           # опечатка: пропущенная буква
+        names.append((token,))
+    # Начало длинного слова с опечаткой: «Саидв» → Саидов, «Сайд» → SAIDOV
+    prefix_typos = []
+    for emp in sample:
+        token = max(emp["fio"].split(), key=len)
+        if len(token) >= 7:
+            i = rng.randrange(1, 5)
+            typo = "о" if token[i].lower() != "о" else "а"
+            prefix_typos.append((emp, token[:i] + typo + token[i + 1:5]))
+    pvz_queries = [(emp["pvz"],) for emp in sample]
+    raw_ids = [(f" {emp['employee_id'][:2]} {emp['employee_id'][2:]}\xa0",) for emp in sample]
+    raw_pvz = [(emp["pvz"],) for emp in sample]
+    admins = [(emp,) for emp in sample]
+    full = [(emp, emp["role"]) for emp in sample]
+
+    timings = {
+        "find_employee_hit": _timeit(cache_manager.find_employee_in_cache, hits),
+        "find_employee_miss": _timeit(cache_manager.find_employee_in_cache, misses),
+        "search_by_name": _timeit(cache_manager.search_employees_by_name, names),
+        "search_name_prefix_typo": _timeit(cache_manager.search_employees_by_name,
+                                           [(query,) for _, query in prefix_typos]),
+        "search_by_pvz": _timeit(cache_manager.search_employees_by_pvz, pvz_queries),
+        "normalize_id": _timeit(normalize_id, raw_ids),
+        "normalize_pvz_cached": _timeit(normalize_pvz, raw_pvz),
+        "normalize_pvz_cold": _timeit(lambda p: (normalize_pvz.cache_clear(), normalize_pvz(p)), raw_pvz),
+        "find_employee_reply": _timeit(cache_manager.find_employee_reply, hits),
+        "employee_card_render": _timeit(employee_card, full),
+        "format_employee_short": _timeit(format_employee_short, admins),
+    }
+
+    found = sum(
+        any(r is emp for r in cache_manager.search_employees_by_name(query))
+        for emp, query in prefix_typos
+    )
+
+    return {
+        "employees": len(staff),
+        "prefix_typo_recall": found / len(prefix_typos) if prefix_typos else 1.0,
+        "snapshot_build_s": build_s,
+        "snapshot_bytes": snapshot_bytes,
+        "bytes_per_employee": snapshot_bytes / len(staff) if staff else 0,
+        "us_per_call": timings,
+    }
+
+
+def compare(old_path: str, new_path: str):
+    """Печатает изменение времени между двумя JSON-отчётами."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{old.get('commit') or old_path} → {new.get('commit') or new_path}")
+    for size, new_res in new["results"].items():
+        old_res = old["results"].get(size)
+        if not old_res:
+            continue
+        print(f"\n{size} сотрудников")
+        for name, new_us in new_res["us_per_call"].items():
+            old_us = old_res["us_per_call"].get(name)
+            if old_us:
+                print(f"  {name:<24}{old_us:>10.2f}{new_us:>10.2f} мкс  {(new_us / old_us - 1):>+7.1%}")
+        print(f"  {'байт на сотрудника':<24}{old_res['bytes_per_employee']:>10.0f}"
+              f"{new_res['bytes_per_employee']:>10.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарки горячих путей")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="размеры кэша через запятую")
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="сравнить два JSON-отчёта")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    for key, value in {
+        "TELEGRAM_BOT_TOKEN": "100000001:BENCH", "GOOGLE_API_KEY": "bench",
+        "REGISTRY_SPREADSHEET_ID": "bench", "ADMIN_BOT_ID": "1",
+    }.items():
+        os.environ.setdefault(key, value)
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {},
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        res = bench_size(size, args.seed)
+        report["results"][str(size)] = res
+        print(f"\n{res['employees']} сотрудников: снимок {res['snapshot_build_s']:.2f} сек, "
+              f"{res['bytes_per_employee']:.0f} байт на сотрудника, "
+              f"находится по началу с опечаткой {res['prefix_typo_recall']:.0%}")
+        for name, us in res["us_per_call"].items():
+            print(f"  {name:<24}{us:>10.2f} мкс")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
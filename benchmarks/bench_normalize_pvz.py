@@ -0,0 +1,116 @@
+"""
+Микробенчмарк нормализации ПВЗ + проверка на корпусе реальных написаний.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_normalize_pvz
+
+Сначала прогоняется корпус (написание из таблиц -> ожидаемый код); при
+расхождении скрипт завершается с ошибкой. Затем сравнивается время
+normalize_pvz с мемоизацией, без неё (холодный кэш) и прежней реализации.
+"""
+
+import re
+import sys
+import timeit
+
+from utils.helpers import normalize_pvz, extract_pvz_number
+
+# Написания ПВЗ, встречающиеся в таблицах, и ожидаемый результат
+CORPUS = [
+    ("Таш-5", "ТАШ-5"),
+    ("ТАШ-5", "ТАШ-5"),
+    ("таш 5", "ТАШ-5"),
+    ("tash-5", "ТАШ-5"),
+    ("TASH 5", "ТАШ-5"),
+    ("Ташкент-5", "ТАШ-5"),
+    ("ТАШКЕНТ 5", "ТАШ-5"),
+    ("tashkent-5", "ТАШ-5"),
+    ("  Таш-05 ", "ТАШ-05"),
+    ("Сам-12", "САМ-12"),
+    ("samarkand-12", "САМ-12"),
+    ("Самарканд 12", "САМ-12"),
+    ("samar-12", "САМ-12"),
+    ("Бух-3", "БУХ-3"),
+    ("Bukhara 3", "БУХ-3"),
+    ("Бухара-3", "БУХ-3"),
+    ("Андижан-7", "АНД-7"),
+    ("andijan 7", "АНД-7"),
+    ("Наманган-2", "НАМ-2"),
+    ("namangan-2", "НАМ-2"),
+    ("Фергана-9", "ФЕР-9"),
+    ("fergana 9", "ФЕР-9"),
+    ("Хива-1", "ХИВ-1"),
+    ("xiva-1", "ХИВ-1"),
+    ("khiva 1", "ХИВ-1"),
+    ("Нукус-4", "НУК-4"),
+    ("nukus-4", "НУК-4"),
+    ("Термез-6", "ТЕР-6"),
+    ("ТАШ-5 (ТЦ)", "ТАШ-5 (ТЦ)"),
+    ("", ""),
+]
+
+
+def _legacy_normalize_pvz(pvz_name: str) -> str:
+    """Прежняя реализация: словарь и regex собираются на каждый вызов."""
+    if not pvz_name:
+        return ""
+    pvz = pvz_name.strip().upper()
+    city_replacements = {
+        "ТАШКЕНТ": "ТАШ", "TASHKENT": "ТАШ", "TASH": "ТАШ", "ТАШ": "ТАШ", "ТАSH": "ТАШ",
+        "САМАРКАНД": "САМ", "SAMARKAND": "САМ", "SAMAR": "САМ", "SAM": "САМ", "САМ": "САМ",
+        "БУХАРА": "БУХ", "BUKHARA": "БУХ", "BUKH": "БУХ", "BUH": "БУХ", "БУХ": "БУХ",
+        "АНДИЖАН": "АНД", "ANDIJAN": "АНД", "ANDI": "АНД", "AND": "АНД", "АНД": "АНД",
+        "НАМАНГАН": "НАМ", "NAMANGAN": "НАМ", "NAMA": "НАМ", "NAM": "НАМ", "НАМ": "НАМ",
+        "ФЕРГАНА": "ФЕР", "FERGANA": "ФЕР", "FERG": "ФЕР", "FER": "ФЕР", "ФЕР": "ФЕР",
+        "ХИВА": "ХИВ", "KHIVA": "ХИВ", "XIVA": "ХИВ", "HIV": "ХИВ", "ХИВ": "ХИВ",
+        "НУКУС": "НУК", "NUKUS": "НУК", "NUK": "НУК", "НУК": "НУК",
+    }
+    match = re.match(r'^([А-ЯA-Z]+)[\s\-]*(\d+)$', pvz)
+    if match:
+        return f"{city_replacements.get(match.group(1), match.group(1)[:3])}-{match.group(2)}"
+    return pvz
+
+
+def check_corpus() -> list:
+    """Возвращает список расхождений с корпусом."""
+    failures = []
+    for raw, expected in CORPUS:
+        got = normalize_pvz(raw)
+        if got != expected:
+            failures.append((raw, expected, got))
+        if got != _legacy_normalize_pvz(raw):
+            failures.append((raw, "как раньше: " + _legacy_normalize_pvz(raw), got))
+    return failures
+
+
+def _run(label: str, func, inputs: list, number: int):
+    total = timeit.timeit(lambda: [func(x) for x in inputs], number=number)
+    per_call = total / (number * len(inputs)) * 1e9
+    print(f"{label:<34} {per_call:8.0f} нс/вызов")
+
+
+def main():
+    failures = check_corpus()
+    for raw, expected, got in failures:
+        print(f"❌ {raw!r}: ожидалось {expected!r}, получено {got!r}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Корпус: {len(CORPUS)} написаний совпали\n")
+
+    # Типичная нагрузка /pvz: одни и те же названия ПВЗ повторяются по строкам
+    inputs = [raw for raw, _ in CORPUS] * 50
+    number = 20
+
+    _run("legacy normalize_pvz", _legacy_normalize_pvz, inputs, number)
+
+    def _cold(x):
+        normalize_pvz.cache_clear()
+        return normalize_pvz(x)
+
+    _run("normalize_pvz (без мемоизации)", _cold, inputs, number)
+    _run("normalize_pvz (мемоизация)", normalize_pvz, inputs, number)
+    _run("extract_pvz_number (мемоизация)", extract_pvz_number, inputs, number)
+
+
+if __name__ == "__main__":
+    main()
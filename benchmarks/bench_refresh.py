@@ -0,0 +1,145 @@
+"""
+Бенчмарк обновления кэша (refresh_cache) против локальной заглушки Sheets API.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_refresh
+    python -m benchmarks.bench_refresh --sizes 10,100,1000 --profile faulty --json refresh.json
+
+Для каждого размера реестра замеряются:
+    • wall time полного обновления;
+    • число запросов к API и объём ответов;
+    • пик памяти Python (tracemalloc) за время обновления;
+    • время до первых данных — когда поиск начинает находить сотрудников.
+
+Профили заглушки:
+    clean   — без задержек и ошибок;
+    latency — 30–50 мс на запрос, как до Google из Ташкента;
+    faulty  — задержка + 429, 5xx, зависания, пустые листы.
+
+Большие листы — через --rows (больше 998 строк Google не отдаёт: диапазон A2:Z1000).
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILES = {
+    "clean": {},
+    "latency": {"latency": 0.03, "jitter": 0.02},
+    "faulty": {
+        "latency": 0.03, "jitter": 0.02, "error_429": 0.03, "error_5xx": 0.02,
+        "timeout_rate": 0.005, "empty_rate": 0.05,
+    },
+}
+
+# Таймаут клиента Sheets в бенчмарке: «зависшие» запросы не должны тянуть 15 сек
+CLIENT_TIMEOUT = 2.0
+
+
+def _first_data_watcher(started: float, result: dict, stop: threading.Event):
+    """Ждёт момента, когда поиск по кэшу начинает находить сотрудников."""
+    from utils.cache_manager import get_snapshot
+    while True:
+        if get_snapshot()["employees"]:
+            result["first_data_s"] = time.perf_counter() - started
+            return
+        if stop.is_set():
+            return
+        time.sleep(0.002)
+
+
+def bench_size(sheets: int, rows: int, profile: str, seed: int) -> dict:
+    from tools.fake_sheets import FakeSheets
+    from utils import cache_manager
+
+    fake = FakeSheets(sheets=sheets, rows=rows, hang=CLIENT_TIMEOUT * 2, seed=seed, **PROFILES[profile]).start()
+
+    # Каждый прогон — с пустого кэша, как после рестарта
+    cache_manager._snapshots.clear()
+    cache_manager._snapshot = cache_manager._empty_snapshot(0)
+    cache_manager._cache = {"admin": {}, "mfu": {}}
+
+    import utils.sheets
+    base = utils.sheets.SHEETS_API_BASE
+    utils.sheets.SHEETS_API_BASE = fake.base
+
+    result = {"sheets": sheets, "rows_per_sheet": rows, "profile": profile, "first_data_s": None}
+    stop = threading.Event()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    watcher = threading.Thread(target=_first_data_watcher, args=(started, result, stop), daemon=True)
+    watcher.start()
+    try:
+        cache_manager.refresh_cache()
+    finally:
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stop.set()
+        watcher.join()
+        if result["first_data_s"] is not None:
+            result["first_data_s"] = min(result["first_data_s"], wall)
+        utils.sheets.SHEETS_API_BASE = base
+        fake.stop()
+
+    stats = cache_manager.get_cache_stats()
+    result.update(
+        wall_s=wall,
+        requests=fake.requests,
+        bytes=fake.bytes_sent,
+        statuses={str(k): v for k, v in sorted(fake.statuses.items())},
+        peak_mem_mb=peak / 1024 / 1024,
+        employees=stats["total_admin"] + stats["total_mfu"],
+        errors=stats["errors"],
+        failed_requests=sum(v for k, v in fake.statuses.items() if k != 200),
+    )
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк refresh_cache")
+    parser.add_argument("--sizes", default="10,100,1000", help="размеры реестра через запятую")
+    parser.add_argument("--rows", type=int, default=60, help="сотрудников на таблицу")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="clean")
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    # Без живых Google и Telegram: алерты об ошибках уходят в заглушку
+    from tools.fake_telegram import FakeTelegram
+    telegram = FakeTelegram().start()
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "100000001:BENCH")
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    os.environ.setdefault("ADMIN_BOT_ID", "1")
+    os.environ["REGISTRY_SPREADSHEET_ID"] = "fake-registry"
+    os.environ["TELEGRAM_API_BASE"] = telegram.base
+    os.environ["SHEETS_TIMEOUT_SECONDS"] = str(CLIENT_TIMEOUT)
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    print(f"{'таблиц':>7}{'сотр.':>9}{'wall с':>9}{'1-е данные с':>14}{'запросов':>10}"
+          f"{'МБ ответов':>12}{'пик МБ':>9}{'не 200':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = bench_size(size, args.rows, args.profile, args.seed)
+        results.append(r)
+        first = f"{r['first_data_s']:.2f}" if r["first_data_s"] is not None else "—"
+        print(f"{r['sheets']:>7}{r['employees']:>9}{r['wall_s']:>9.2f}{first:>14}{r['requests']:>10}"
+              f"{r['bytes'] / 1024 / 1024:>12.1f}{r['peak_mem_mb']:>9.1f}{r['failed_requests']:>8}")
+
+    telegram.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"profile": args.profile, "results": results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Память и скорость поиска: свой кэш в каждом процессе против общего снимка (mmap).
+
+Запуск из корня репозитория (Linux — память читается из /proc):
+    python -m benchmarks.bench_shared_snapshot
+    python -m benchmarks.bench_shared_snapshot --employees 50000 --workers 1,2,4,8 --json shared.json
+
+Для каждого числа воркеров запускаются отдельные процессы:
+    local  — каждый строит свой снимок из синтетических таблиц (как при
+             CACHE_MODE=local, где каждый процесс сам ходит в Google);
+    mapped — снимок один раз записан на диск, воркеры отображают его
+             в память (CACHE_MODE=reader).
+Каждый воркер находит всех сотрудников по табельному (все страницы снимка
+прочитаны), после чего, пока живы все воркеры, снимается их память:
+    RSS — резидентная, PSS — с делением общих страниц между процессами,
+    USS — собственная память процесса.
+Сумма PSS — сколько памяти машины на самом деле занимают воркеры.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_ENV = {
+    "TELEGRAM_BOT_TOKEN": "100000001:BENCH", "GOOGLE_API_KEY": "bench",
+    "REGISTRY_SPREADSHEET_ID": "bench", "ADMIN_BOT_ID": "1",
+}
+
+
+def _memory(pid: int) -> dict:
+    """RSS, PSS и USS процесса в МБ (из /proc/<pid>/smaps_rollup)."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": values.get("Rss", 0),
+        "pss_mb": values.get("Pss", 0),
+        "uss_mb": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+# ================= WORKER =================
+
+def worker(mode: str, employees: int, seed: int):
+    """Загружает кэш, читает его целиком и ждёт, пока родитель снимет память."""
+    import logging
+    logging.disable(logging.CRITICAL)
+    from utils import cache_manager
+
+    started = time.perf_counter()
+    if mode == "local":
+        from tools.synthetic import install_synthetic_cache
+        install_synthetic_cache(employees, seed=seed)
+    elif mode == "mapped":
+        cache_manager.load_shared_snapshot()
+    load_s = time.perf_counter() - started
+
+    # Без списка всех сотрудников: у mapped он занял бы память, которую меряем
+    staff = cache_manager.get_snapshot()["employees"]
+    for emp in staff:
+        cache_manager.find_employee_in_cache(emp["employee_id"], emp["role"])
+
+    lookup_us = None
+    if len(staff):
+        rng = random.Random(seed)
+        sample = [staff[rng.randrange(len(staff))] for _ in range(2000)]
+        samples = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            for emp in sample:
+                cache_manager.find_employee_in_cache(emp["employee_id"], emp["role"])
+            samples.append((time.perf_counter() - t0) / len(sample) * 1e6)
+        lookup_us = statistics.median(samples)
+        del sample
+
+    print(json.dumps({"load_s": load_s, "lookup_us": lookup_us}), flush=True)
+    sys.stdin.read()        # родитель закрывает stdin после замера памяти
+
+
+# ================= DRIVER =================
+
+def run_workers(mode: str, count: int, employees: int, seed: int, snapshot_dir: str) -> dict:
+    env = {**os.environ, **_ENV, "CACHE_MODE": "reader" if mode == "mapped" else "local",
+           "SNAPSHOT_DIR": snapshot_dir}
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_shared_snapshot",
+             "--worker", mode, "--employees", str(employees), "--seed", str(seed)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env,
+        )
+        for _ in range(count)
+    ]
+    reports = [json.loads(p.stdout.readline()) for p in procs]
+    memory = [_memory(p.pid) for p in procs]
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+
+    lookups = [r["lookup_us"] for r in reports if r["lookup_us"] is not None]
+    return {
+        "mode": mode,
+        "workers": count,
+        "total_pss_mb": sum(m["pss_mb"] for m in memory),
+        "pss_per_worker_mb": statistics.mean(m["pss_mb"] for m in memory),
+        "uss_per_worker_mb": statistics.mean(m["uss_mb"] for m in memory),
+        "rss_per_worker_mb": statistics.mean(m["rss_mb"] for m in memory),
+        "load_s": statistics.mean(r["load_s"] for r in reports),
+        "lookup_us": statistics.median(lookups) if lookups else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память воркеров: свой кэш против общего снимка")
+    parser.add_argument("--employees", type=int, default=20_000, help="размер синтетического кэша")
+    parser.add_argument("--workers", default="1,2,4,8", help="числа воркеров через запятую")
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--worker", choices=("local", "mapped", "empty"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    for key, value in _ENV.items():
+        os.environ.setdefault(key, value)
+
+    if args.worker:
+        worker(args.worker, args.employees, args.seed)
+        return 0
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("Нужен Linux: память воркеров читается из /proc/<pid>/smaps_rollup")
+        return 1
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    from tools.synthetic import install_synthetic_cache
+    from utils import snapshot_store
+
+    snapshot_dir = tempfile.mkdtemp(prefix="bench-snapshots-")
+    try:
+        started = time.perf_counter()
+        path = snapshot_store.write_snapshot(install_synthetic_cache(args.employees, seed=args.seed), snapshot_dir)
+        print(f"Снимок {args.employees} сотрудников: {os.path.getsize(path) / 1024 / 1024:.1f} МБ на диске, "
+              f"записан за {time.perf_counter() - started:.1f} сек")
+
+        baseline = run_workers("empty", 1, args.employees, args.seed, snapshot_dir)
+        print(f"Пустой процесс (интерпретатор и модули бота): PSS {baseline['pss_per_worker_mb']:.1f} МБ\n")
+
+        results = []
+        print(f"{'режим':<8}{'воркеров':>9}{'Σ PSS МБ':>11}{'PSS/воркер':>12}{'USS/воркер':>12}"
+              f"{'загрузка с':>12}{'поиск мкс':>11}")
+        for count in (int(s) for s in args.workers.split(",")):
+            for mode in ("local", "mapped"):
+                r = run_workers(mode, count, args.employees, args.seed, snapshot_dir)
+                results.append(r)
+                print(f"{r['mode']:<8}{r['workers']:>9}{r['total_pss_mb']:>11.1f}{r['pss_per_worker_mb']:>12.1f}"
+                      f"{r['uss_per_worker_mb']:>12.1f}{r['load_s']:>12.3f}{r['lookup_us']:>11.2f}")
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"employees": args.employees, "baseline": baseline, "results": results},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,12 @@
 # import os
 # sys.path.insert(0, os.path.dirname(__file__))
 
+from utils import startup  # первым: отсчёт времени запуска
+
+import asyncio
 import logging
+import threading
+from telegram import Update
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -10,28 +15,37 @@ from telegram.ext import (
     filters,
     ConversationHandler,
     CallbackQueryHandler,
+    InlineQueryHandler,
+    ChosenInlineResultHandler,
+    TypeHandler,
 )
+startup.mark("telegram.ext")
 
-from config import TOKEN, CACHE_TTL_SECONDS, RATE_LIMIT_MAX, RATE_LIMIT_WINDOW
+from config import (
+    TOKEN, TELEGRAM_API_BASE, CACHE_TTL_SECONDS, RATE_LIMIT_MAX, RATE_LIMIT_WINDOW, WEBHOOK_URL,
+    CONCURRENT_UPDATES,
+)
 from utils.cache_manager import start_cache_refresh_loop
+from utils.rate_limiter import OutboundRateLimiter
+from utils.update_processor import PerUserUpdateProcessor
+from utils.user_state import init_persistence as init_user_state_persistence
 from utils.admin_notifier import send_admin_message
-from handlers.admin import cmd_refresh, cmd_status, cmd_logs
-from handlers.user import start, select_role, enter_id, SELECT_ROLE, ENTER_ID
-from handlers.admin_search import (
-    cmd_asearch, enter_name, select_employee,
-    ENTER_NAME, SELECT_EMPLOYEE
-)
-from handlers.pvz_search import (
-    cmd_pvz, enter_pvz, select_employee_pvz,
-    ENTER_PVZ, SELECT_EMPLOYEE_PVZ
+from utils import metrics
+from utils.log_setup import setup_logging
+startup.mark("utils")
+from handlers.admin import (
+    cmd_refresh, cmd_status, cmd_logs, cmd_top_queries, cmd_profile, cmd_memprofile, cmd_export,
 )
+from handlers.user import start, select_role, enter_id, pick_suggestion, SELECT_ROLE, ENTER_ID, SUGGEST_PREFIX
+from handlers import admin_search, pvz_search
+from handlers.admin_search import cmd_asearch, enter_name, name_page, select_employee, ENTER_NAME
+from handlers.pvz_search import cmd_pvz, enter_pvz, pvz_page, select_employee_pvz, ENTER_PVZ
+from handlers.inline_search import inline_query, chosen_inline_result
+from handlers.bulk_lookup import cmd_bulk, receive_ids, ENTER_IDS
+startup.mark("handlers")
 
 # ================= LOGGING =================
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
-logging.getLogger("httpx").setLevel(logging.WARNING)
+setup_logging()
 
 
 # ================= GLOBAL ERROR =================
@@ -39,40 +53,95 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 async def error_handler(update, context):
     if "terminated by other getUpdates request" in str(context.error):
         return
+    metrics.inc("bot_errors_total", error=type(context.error).__name__)
     error = f"🚨 GLOBAL ERROR\n\nUpdate:\n{update}\n\nError:\n{context.error}"
     logging.error(error)
-    send_admin_message(error)
+    await asyncio.to_thread(send_admin_message, error)
 
 
-# ================= MAIN =================
+async def _after_update(update, context):
+    startup.first_update_served()
 
-if __name__ == "__main__":
-    start_cache_refresh_loop(notify_callback=send_admin_message)
 
-    application = ApplicationBuilder().token(TOKEN).build()
+async def _on_polling_start(application):
+    startup.ready()
+
+
+# ================= APPLICATION =================
+
+def build_application(token: str = TOKEN, outbound_limit: bool = True, concurrent_updates: int = None):
+    """
+    Собирает Application со всеми обработчиками бота.
+
+    Args:
+        token: токен бота
+        outbound_limit: ограничивать исходящие запросы к Bot API (OutboundRateLimiter)
+        concurrent_updates: апдейтов одновременно (по умолчанию CONCURRENT_UPDATES);
+            апдейты одного пользователя всегда обрабатываются по порядку
+    """
+    processor = PerUserUpdateProcessor(concurrent_updates or CONCURRENT_UPDATES)
+    metrics.register_gauge(
+        "updates_in_flight", lambda: processor.current_concurrent_updates,
+        "Апдейтов в обработке и в очереди пользователя",
+    )
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .base_url(f"{TELEGRAM_API_BASE}/bot")
+        .base_file_url(f"{TELEGRAM_API_BASE}/file/bot")
+        .concurrent_updates(processor)
+        .post_init(_on_polling_start)
+    )
+    if outbound_limit:
+        builder = builder.rate_limiter(OutboundRateLimiter())
+    application = builder.build()
 
     # Админские команды
     application.add_handler(CommandHandler("refresh", cmd_refresh))
     application.add_handler(CommandHandler("status", cmd_status))
     application.add_handler(CommandHandler("logs", cmd_logs))
+    application.add_handler(CommandHandler("top_queries", cmd_top_queries))
+    application.add_handler(CommandHandler("profile", cmd_profile, block=False))
+    application.add_handler(CommandHandler("memprofile", cmd_memprofile, block=False))
+    application.add_handler(CommandHandler("export", cmd_export))
+
+    # Кнопки списков результатов — без состояния, регистрируются раньше диалогов
+    application.add_handler(CallbackQueryHandler(name_page, pattern=rf"^{admin_search.PAGE_PREFIX}\|"))
+    application.add_handler(CallbackQueryHandler(
+        select_employee,
+        pattern=rf"^({admin_search.SELECT_PREFIX}\||{admin_search.CANCEL_DATA}$)",
+    ))
+    application.add_handler(CallbackQueryHandler(pvz_page, pattern=rf"^{pvz_search.PAGE_PREFIX}\|"))
+    application.add_handler(CallbackQueryHandler(
+        select_employee_pvz,
+        pattern=rf"^({pvz_search.SELECT_PREFIX}\||{pvz_search.CANCEL_DATA}$)",
+    ))
 
     # Админский поиск по имени
     asearch_handler = ConversationHandler(
         entry_points=[CommandHandler("asearch", cmd_asearch)],
         states={
             ENTER_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, enter_name)],
-            SELECT_EMPLOYEE: [CallbackQueryHandler(select_employee)],
         },
         fallbacks=[CommandHandler("asearch", cmd_asearch)],
     )
     application.add_handler(asearch_handler)
 
+    # Пакетный поиск по списку табельных (админ)
+    bulk_handler = ConversationHandler(
+        entry_points=[CommandHandler("bulk", cmd_bulk)],
+        states={
+            ENTER_IDS: [MessageHandler((filters.TEXT & ~filters.COMMAND) | filters.Document.ALL, receive_ids)],
+        },
+        fallbacks=[CommandHandler("bulk", cmd_bulk)],
+    )
+    application.add_handler(bulk_handler)
+
     # Поиск по ПВЗ (для всех пользователей)
     pvz_handler = ConversationHandler(
         entry_points=[CommandHandler("pvz", cmd_pvz)],
         states={
             ENTER_PVZ: [MessageHandler(filters.TEXT & ~filters.COMMAND, enter_pvz)],
-            SELECT_EMPLOYEE_PVZ: [CallbackQueryHandler(select_employee_pvz)],
         },
         fallbacks=[CommandHandler("pvz", cmd_pvz)],
     )
@@ -88,18 +157,50 @@ if __name__ == "__main__":
                 CallbackQueryHandler(select_role, pattern="^new_search$"),
                 CallbackQueryHandler(select_role, pattern="^share_card$"),
                 CallbackQueryHandler(select_role, pattern="^cancel_search$"),
+                CallbackQueryHandler(pick_suggestion, pattern=rf"^{SUGGEST_PREFIX}\|"),
             ],
         },
         fallbacks=[CommandHandler("start", start)],
     )
 
     application.add_handler(conv_handler)
+
+    # Inline-режим (@бот запрос)
+    application.add_handler(InlineQueryHandler(inline_query))
+    application.add_handler(ChosenInlineResultHandler(chosen_inline_result))
+
+    # Отчёт о первом обслуженном апдейте (группа после всех обработчиков)
+    application.add_handler(TypeHandler(Update, _after_update), group=100)
+
     application.add_error_handler(error_handler)
+    return application
+
+
+# ================= MAIN =================
 
-    send_admin_message(
+def main():
+    init_user_state_persistence()
+    metrics.start_metrics_server()
+    start_cache_refresh_loop(notify_callback=send_admin_message)
+
+    application = build_application()
+    startup.mark("application")
+
+    # Уведомление — в фоне: запуск не ждёт ответа Bot API
+    threading.Thread(target=send_admin_message, daemon=True, args=(
         f"🤖 Бот запущен\n"
         f"Интервал кэша: {CACHE_TTL_SECONDS // 60} мин\n"
-        f"Лимит запросов: {RATE_LIMIT_MAX} за {RATE_LIMIT_WINDOW} сек"
-    )
+        f"Лимит запросов: {RATE_LIMIT_MAX} за {RATE_LIMIT_WINDOW} сек\n"
+        f"Параллельных апдейтов: {CONCURRENT_UPDATES}\n"
+        f"Режим: {'webhook' if WEBHOOK_URL else 'polling'}",
+    )).start()
 
-    application.run_polling()
+    if WEBHOOK_URL:
+        from utils.webhook import serve_webhook
+        asyncio.run(serve_webhook(application))
+    else:
+        application.run_polling()
+
+
+if __name__ == "__main__":
+    main()
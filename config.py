@@ -1,14 +1,96 @@
 import os
+import socket
 
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 API_KEY = os.getenv("GOOGLE_API_KEY")
 REGISTRY_ID = os.getenv("REGISTRY_SPREADSHEET_ID")
 ADMIN_ID = os.getenv("ADMIN_BOT_ID")
+# Адрес Bot API (меняется для локального сервера Bot API или нагрузочного теста)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+
+# Адрес Google Sheets API (меняется для локальной заглушки, см. tools/fake_sheets.py)
+SHEETS_API_BASE = os.getenv("SHEETS_API_BASE", "https://sheets.googleapis.com/v4").rstrip("/")
+SHEETS_TIMEOUT_SECONDS = float(os.getenv("SHEETS_TIMEOUT_SECONDS", "15"))
 
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_MINUTES", "10")) * 60
+# Своё расписание у каждой таблицы реестра (см. utils/refresh_scheduler.py): интервал
+# подстраивается в пределах [мин, макс]; при мин = макс = CACHE_TTL — все раз в CACHE_TTL
+REFRESH_MIN_SECONDS = int(os.getenv("REFRESH_MIN_SECONDS", str(CACHE_TTL_SECONDS // 5)))
+REFRESH_MAX_SECONDS = int(os.getenv("REFRESH_MAX_SECONDS", str(CACHE_TTL_SECONDS * 6)))
+# Как часто цикл обновления проверяет, у каких таблиц подошёл срок
+REFRESH_TICK_SECONDS = float(os.getenv("REFRESH_TICK_SECONDS", "30"))
+# Кэш на несколько процессов одной машины (см. utils/snapshot_store.py):
+#   local  — процесс сам обновляет кэш из Google и держит его в памяти;
+#   writer — то же, и каждый снимок записывается в SNAPSHOT_DIR;
+#   reader — процесс не ходит в Google, а отображает в память снимок из SNAPSHOT_DIR;
+#   auto   — процессы сами выбирают обновителя (utils/leader.py): лидер работает
+#            как writer, остальные как reader и подменяют лидера, если он упал
+CACHE_MODE = os.getenv("CACHE_MODE", "local").lower()
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "/tmp/wb-bot-snapshots")
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "2"))
+# Имя экземпляра в /status и в файле лидера
+INSTANCE_NAME = os.getenv("INSTANCE_NAME") or f"{socket.gethostname()}:{os.getpid()}"
 RATE_LIMIT_MAX = int(os.getenv("RATE_LIMIT_MAX", "10"))
 RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
+CARD_RATE_LIMIT_MAX = int(os.getenv("CARD_RATE_LIMIT_MAX", "3"))
+CARD_RATE_LIMIT_WINDOW = int(os.getenv("CARD_RATE_LIMIT_WINDOW", "60"))
+PVZ_RATE_LIMIT_MAX = int(os.getenv("PVZ_RATE_LIMIT_MAX", "10"))
+PVZ_RATE_LIMIT_WINDOW = int(os.getenv("PVZ_RATE_LIMIT_WINDOW", "60"))
+INLINE_RATE_LIMIT_MAX = int(os.getenv("INLINE_RATE_LIMIT_MAX", "30"))
+INLINE_RATE_LIMIT_WINDOW = int(os.getenv("INLINE_RATE_LIMIT_WINDOW", "60"))
+# Глобальный лимит исходящих сообщений (Telegram допускает ~30/сек)
+OUTBOUND_MSG_PER_SEC = int(os.getenv("OUTBOUND_MSG_PER_SEC", "25"))
+# Сколько апдейтов обрабатывается одновременно (1 — строго по одному, как раньше)
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "32"))
 SUSPICIOUS_DIFF_IDS = int(os.getenv("SUSPICIOUS_DIFF_IDS", "5"))
+SUSPICIOUS_WINDOW_MINUTES = int(os.getenv("SUSPICIOUS_WINDOW_MINUTES", "1440"))
+SUSPICIOUS_BURST = int(os.getenv("SUSPICIOUS_BURST", "15"))
+SUSPICIOUS_ALERT_COOLDOWN_MINUTES = int(os.getenv("SUSPICIOUS_ALERT_COOLDOWN_MINUTES", "60"))
+ID_SUGGESTIONS_MAX = int(os.getenv("ID_SUGGESTIONS_MAX", "3"))
+# /bulk: максимум табельных за раз и размер присланного файла
+BULK_MAX_IDS = int(os.getenv("BULK_MAX_IDS", "2000"))
+BULK_MAX_FILE_KB = int(os.getenv("BULK_MAX_FILE_KB", "512"))
+# Готовых страниц /pvz и /asearch в кэше ответов (0 — не кэшировать)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+
+# Состояние пользователей: лимит памяти и (опционально) файл SQLite для сохранения
+USER_STATE_MAX_KB = int(os.getenv("USER_STATE_MAX_KB", "8192"))
+USER_STATE_DB = os.getenv("USER_STATE_DB", "")
+USER_STATE_FLUSH_SECONDS = int(os.getenv("USER_STATE_FLUSH_SECONDS", "30"))
+
+# Дополнительные алиасы городов ПВЗ: JSON-файл и/или лист реестра (колонки: вариант, код)
+PVZ_ALIASES_FILE = os.getenv("PVZ_ALIASES_FILE", "")
+PVZ_ALIASES_SHEET = os.getenv("PVZ_ALIASES_SHEET", "")
+
+# Режим webhook (если задан WEBHOOK_URL — публичный https-адрес бота) вместо long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8080")))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+WEBHOOK_DRAIN_SECONDS = int(os.getenv("WEBHOOK_DRAIN_SECONDS", "25"))
+# Несколько процессов на одном порту (SO_REUSEPORT) — для воркеров с CACHE_MODE=reader
+WEBHOOK_REUSE_PORT = os.getenv("WEBHOOK_REUSE_PORT", "").lower() in ("1", "true", "yes")
+
+# HTTP-эндпоинт метрик Prometheus и /healthz (0 — выключен)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# /healthz отвечает 503, если снимок кэша старше этого (по умолчанию — 3 интервала обновления)
+HEALTHZ_MAX_AGE_SECONDS = int(os.getenv("HEALTHZ_MAX_AGE_SECONDS", str(3 * CACHE_TTL_SECONDS)))
+
+# /profile и /memprofile: длительность замера по умолчанию и максимум (сек)
+PROFILE_DEFAULT_SECONDS = int(os.getenv("PROFILE_DEFAULT_SECONDS", "30"))
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "300"))
+
+# Логирование: уровень, формат консоли (text/json), файл с ротацией (JSON)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_MAX_MB = int(os.getenv("LOG_MAX_MB", "50"))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+# Выборка частых событий: «событие=доля» через запятую (lookup — поиск по табельному,
+# search — поиск по ПВЗ и ФИО); пусто — писать всё
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "lookup=0.1,search=0.1")
 
 if not TOKEN:
     raise ValueError("TELEGRAM_BOT_TOKEN не установлен ⚠️")
@@ -18,3 +100,9 @@ if not REGISTRY_ID:
     raise ValueError("REGISTRY_SPREADSHEET_ID не установлен ⚠️")
 if not ADMIN_ID:
     raise ValueError("ADMIN_BOT_ID не установлен ⚠️")
+if CACHE_MODE not in ("local", "writer", "reader", "auto"):
+    raise ValueError("CACHE_MODE должен быть local, writer, reader или auto ⚠️")
+if LOG_FORMAT not in ("text", "json"):
+    raise ValueError("LOG_FORMAT должен быть text или json ⚠️")
+if not 0 < REFRESH_MIN_SECONDS <= REFRESH_MAX_SECONDS:
+    raise ValueError("Нужно 0 < REFRESH_MIN_SECONDS <= REFRESH_MAX_SECONDS ⚠️")
@@ -1,12 +1,74 @@
-import threading
-from telegram import Update
+import asyncio
+import io
+import time
+from datetime import datetime
+from telegram import Update, InputFile
 from telegram.ext import ContextTypes
 
-from config import ADMIN_ID, CACHE_TTL_SECONDS, RATE_LIMIT_MAX, RATE_LIMIT_WINDOW, SUSPICIOUS_DIFF_IDS
-from utils.cache_manager import refresh_cache, get_cache_stats, get_last_refresh
+from config import (
+    ADMIN_ID, CACHE_TTL_SECONDS, RATE_LIMIT_MAX, RATE_LIMIT_WINDOW,
+    SUSPICIOUS_DIFF_IDS, SUSPICIOUS_WINDOW_MINUTES, SUSPICIOUS_BURST,
+    PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS, CACHE_MODE, SNAPSHOT_DIR, INSTANCE_NAME,
+)
+from utils.cache_manager import (
+    refresh_cache, get_cache_stats, get_last_refresh, get_snapshot_version, get_snapshot, iter_employees,
+)
 from utils.request_logger import get_request_log
+from utils.analytics import get_summary, get_top
+from utils.user_state import get_stats as get_user_state_stats
+from utils.result_cache import get_stats as get_result_cache_stats
 from utils.admin_notifier import send_admin_message
-from utils.helpers import now_tashkent, fmt_dt
+from utils.helpers import now_tashkent, fmt_dt, TZ_TASHKENT
+from utils.profiler import profile_cpu, profile_memory
+from utils import leader, export, refresh_scheduler
+
+# Аргументы /export, задающие роль
+EXPORT_ROLES = {"admin": "admin", "админ": "admin", "mfu": "mfu", "мфу": "mfu"}
+
+
+def _ago(ts: float) -> str:
+    seconds = int(time.time() - ts)
+    if seconds < 60:
+        return f"{seconds} сек назад"
+    return f"{seconds // 60} мин {seconds % 60} сек назад"
+
+
+def _result_cache_line() -> str:
+    rc = get_result_cache_stats()
+    parts = []
+    for kind, label in (("pvz", "/pvz"), ("asearch", "/asearch")):
+        hits, misses = rc["hits"][kind], rc["misses"][kind]
+        total = hits + misses
+        ratio = f"{hits * 100 // total}%" if total else "—"
+        parts.append(f"{label} {ratio} ({hits}/{total})")
+    return f"  • Кэш ответов: {' | '.join(parts)}, записей {rc['entries']} из {rc['max_entries']}\n"
+
+
+def _refresh_line() -> str:
+    """Строка /status о расписании обновления таблиц (пусто, если процесс в Google не ходит)."""
+    rs = refresh_scheduler.get_stats()
+    if not rs["sheets"]:
+        return ""
+    return (
+        f"  • Расписание: интервалы {rs['min_interval'] / 60:.0f}–{rs['max_interval'] / 60:.0f} мин, "
+        f"к обновлению {rs['due']}, востребованных {rs['hot']}, "
+        f"чтений {rs['fetches']} (с изменениями {rs['changes']})\n"
+    )
+
+
+def _leader_lines() -> str:
+    """Строки /status о лидере-обновителе (CACHE_MODE=auto)."""
+    if CACHE_MODE != "auto":
+        return ""
+    info = leader.read_info(SNAPSHOT_DIR)
+    if not info:
+        return "  • Обновитель: ещё не выбран\n"
+    who = "этот процесс" if leader.is_leader() else "другой процесс"
+    published = _ago(info["published_at"]) if info.get("published_at") else "ещё не публиковал"
+    return (
+        f"  • Обновитель: {info['instance']} ({who}), с {fmt_dt(datetime.fromtimestamp(info['since'], TZ_TASHKENT))}\n"
+        f"  • Его публикация: {published}, v{info.get('version') or '—'}; пульс {_ago(info['heartbeat'])}\n"
+    )
 
 
 def is_admin(update: Update) -> bool:
@@ -20,9 +82,11 @@ async def cmd_refresh(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text("🔄 Обновляю кэш, подожди...")
 
-    t = threading.Thread(target=lambda: refresh_cache(notify_callback=send_admin_message), daemon=True)
-    t.start()
-    t.join(timeout=120)
+    # Обновление идёт в потоке: остальные апдейты обрабатываются, пока грузятся таблицы
+    try:
+        await asyncio.wait_for(asyncio.to_thread(refresh_cache, notify_callback=send_admin_message), 120)
+    except asyncio.TimeoutError:
+        pass
 
     last_refresh = get_last_refresh()
     if last_refresh:
@@ -52,17 +116,20 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         minutes = int(age.total_seconds() // 60)
         seconds = int(age.total_seconds() % 60)
         age_str = f"{minutes} мин {seconds} сек назад"
-        next_sec = CACHE_TTL_SECONDS - int(age.total_seconds())
+        next_due = refresh_scheduler.next_due()
+        if next_due is not None:
+            next_sec = int(next_due - time.time())
+        else:
+            next_sec = CACHE_TTL_SECONDS - int(age.total_seconds())
         next_str = f"через ~{max(0, next_sec) // 60} мин"
     else:
         age_str = "ещё не обновлялся"
         next_str = "скоро"
 
-    log_copy = get_request_log()
+    a = get_summary()
+    hour, day, total = a["last_hour"], a["last_day"], a["total"]
 
-    unique_users = len(set(e["user_id"] for e in log_copy))
-    total_requests = len(log_copy)
-    found_count = sum(1 for e in log_copy if e["found"])
+    us = get_user_state_stats()
 
     await update.message.reply_text(
         f"📊 Статус бота\n\n"
@@ -72,15 +139,26 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"  • Таблиц: {s['sheet_count']}\n"
         f"  • Записей Админ: {s['total_admin']}\n"
         f"  • Записей МФУ: {s['total_mfu']}\n"
-        f"  • Ошибок при загрузке: {s['errors']}\n\n"
-        f"👥 Активность (всего в логе):\n"
-        f"  • Запросов: {total_requests}\n"
-        f"  • Уникальных юзеров: {unique_users}\n"
-        f"  • Найдено: {found_count} | Не найдено: {total_requests - found_count}\n\n"
+        f"  • Ошибок при загрузке: {s['errors']}\n"
+        f"  • Режим: {CACHE_MODE}, снимок v{get_snapshot_version()}, экземпляр {INSTANCE_NAME}\n"
+        f"{_refresh_line()}"
+        f"{_leader_lines()}"
+        f"{_result_cache_line()}\n"
+        f"👥 Активность (час / сутки / с запуска):\n"
+        f"  • Запросов: {hour['requests']} / {day['requests']} / {total['requests']}\n"
+        f"  • Уникальных юзеров: ~{hour['users']} / ~{day['users']} / ~{total['users']}\n"
+        f"  • Найдено: {hour['found']} / {day['found']} / {total['found']}\n"
+        f"  • Не найдено: {hour['not_found']} / {day['not_found']} / {total['not_found']}\n"
+        f"  • Админ | МФУ (сутки): {day['admin']} | {day['mfu']}\n\n"
+        f"👤 Состояние пользователей:\n"
+        f"  • Юзеров в памяти: {us['users']}\n"
+        f"  • Память: {us['bytes'] // 1024} КБ из {us['limit_bytes'] // 1024} КБ\n"
+        f"  • Ожидают записи в БД: {us['pending_writes']}\n\n"
         f"⚙️ Настройки:\n"
         f"  • Интервал кэша: {CACHE_TTL_SECONDS // 60} мин\n"
         f"  • Лимит запросов: {RATE_LIMIT_MAX} за {RATE_LIMIT_WINDOW} сек\n"
-        f"  • Алерт подозрит.: {SUSPICIOUS_DIFF_IDS} разных номеров"
+        f"  • Алерт подозрит.: {SUSPICIOUS_DIFF_IDS} разных номеров за {SUSPICIOUS_WINDOW_MINUTES} мин "
+        f"или всплеск ~{SUSPICIOUS_BURST} запросов"
     )
 
 
@@ -105,3 +183,126 @@ async def cmd_logs(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
     await update.message.reply_text("📋 Последние запросы:\n\n" + "\n".join(lines))
+
+
+async def cmd_top_queries(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update):
+        await update.message.reply_text("❌ Нет доступа к этой команде.")
+        return
+
+    top = get_top(10)
+
+    if not top["employee_ids"]:
+        await update.message.reply_text("📭 Запросов ещё не было.")
+        return
+
+    lines = ["🔝 Самые искомые табельные (с запуска, оценка):\n"]
+    for i, (employee_id, count, _) in enumerate(top["employee_ids"], 1):
+        lines.append(f"{i}. №{employee_id} — ~{count}")
+
+    lines.append("\n👤 Самые активные пользователи:\n")
+    for i, (user_id, count, username) in enumerate(top["users"], 1):
+        lines.append(f"{i}. @{username or '—'} ({user_id}) — ~{count}")
+
+    await update.message.reply_text("\n".join(lines))
+
+
+def _profile_seconds(context: ContextTypes.DEFAULT_TYPE):
+    """Длительность замера из аргумента команды; None — аргумент некорректный."""
+    if not context.args:
+        return PROFILE_DEFAULT_SECONDS
+    try:
+        seconds = float(context.args[0])
+    except ValueError:
+        return None
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return None
+    return seconds
+
+
+async def _run_profile(update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str, func):
+    if not is_admin(update):
+        await update.message.reply_text("❌ Нет доступа к этой команде.")
+        return
+
+    seconds = _profile_seconds(context)
+    if seconds is None:
+        await update.message.reply_text(
+            f"❌ Укажи длительность в секундах: от 1 до {PROFILE_MAX_SECONDS}.\n"
+            f"Например: /{kind} 30"
+        )
+        return
+
+    await update.message.reply_text(f"⏱ Замер {kind} на {seconds:g} сек запущен — бот продолжает работать.")
+
+    # Замер идёт в отдельном потоке: event loop обслуживает трафик, который и профилируем
+    report = await asyncio.to_thread(func, seconds)
+    if report is None:
+        await update.message.reply_text("⚠️ Уже идёт другой замер — дождись его окончания.")
+        return
+
+    filename = f"{kind}-{now_tashkent().strftime('%Y%m%d-%H%M%S')}.txt"
+    await update.message.reply_document(
+        document=InputFile(io.BytesIO(report.encode()), filename=filename),
+        caption=f"📄 Отчёт {kind} за {seconds:g} сек",
+    )
+
+
+async def cmd_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/profile [сек] — сэмплирование стеков всех потоков."""
+    await _run_profile(update, context, "profile", profile_cpu)
+
+
+async def cmd_memprofile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/memprofile [сек] — места выделения памяти (tracemalloc)."""
+    await _run_profile(update, context, "memprofile", profile_memory)
+
+
+def _export_filters(args: list) -> dict:
+    """
+    Фильтры /export из аргументов: роль, а остальное — ПВЗ (если есть цифры)
+    или город. «ТАШ 5» и «Таш-5» — один и тот же ПВЗ.
+    """
+    filters = {}
+    rest = []
+    for arg in args:
+        if arg.lower() in EXPORT_ROLES:
+            filters["role"] = EXPORT_ROLES[arg.lower()]
+        else:
+            rest.append(arg)
+    place = " ".join(rest)
+    if place:
+        filters["pvz" if any(ch.isdigit() for ch in place) else "city"] = place
+    return filters
+
+
+async def cmd_export(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/export [admin|mfu] [ПВЗ или город] — все сотрудники из кэша одним файлом .csv.gz."""
+    if not is_admin(update):
+        await update.message.reply_text("❌ Нет доступа к этой команде.")
+        return
+
+    filters = _export_filters(context.args or [])
+    snapshot = get_snapshot()
+    if not snapshot["employees"]:
+        await update.message.reply_text("⏳ Кэш ещё загружается — попробуй через минуту.")
+        return
+
+    # Строки идут генератором прямо в gzip во временном файле — в потоке, чтобы не держать бота
+    f, count = await asyncio.to_thread(
+        export.write_csv, iter_employees(snapshot=snapshot, **filters), None, True,
+    )
+    described = ", ".join(f"{k}={v}" for k, v in filters.items()) or "без фильтров"
+    if not count:
+        f.close()
+        await update.message.reply_text(f"📭 Нет сотрудников по фильтрам: {described}")
+        return
+
+    with f:
+        data = f.read()
+    filename = f"export-v{snapshot['version']}-{now_tashkent().strftime('%Y%m%d-%H%M%S')}.csv.gz"
+    await update.message.reply_document(
+        document=InputFile(data, filename=filename),
+        caption=f"📤 Выгрузка снимка v{snapshot['version']}: {count} сотрудников ({described}), "
+                f"{len(data) // 1024 + 1} КБ",
+    )
@@ -1,5 +1,8 @@
 """
 Админская команда /asearch для поиска сотрудников по имени.
+
+Результаты выводятся постранично, состояние листания хранится
+в callback_data кнопок (версия снимка, смещение, запрос).
 """
 
 import logging
@@ -7,12 +10,23 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
 from config import ADMIN_ID
-from utils.cache_manager import search_employees_by_name, find_employee_in_cache
+from utils.cache_manager import search_employees_by_name, find_employee_reply, get_snapshot
+from utils.metrics import observe_handler
+from utils import result_cache
 from utils.helpers import fmt_dt
 from utils.cache_manager import get_last_refresh
+from utils.pagination import (
+    PAGE_SIZE, encode_callback, decode_callback, fits_callback, clean_query,
+    clamp_offset, page_label, nav_row,
+)
 
 # ================= STATES =================
-ENTER_NAME, SELECT_EMPLOYEE = range(2)
+ENTER_NAME = 0
+
+# ================= CALLBACKS =================
+PAGE_PREFIX = "asp"       # asp|<версия>|<смещение>|<запрос>
+SELECT_PREFIX = "ase"     # ase|<роль>|<табельный>
+CANCEL_DATA = "cancel_asearch"
 
 
 def is_admin(update: Update) -> bool:
@@ -21,45 +35,79 @@ def is_admin(update: Update) -> bool:
 
 # ================= FORMATTERS =================
 
-def format_employee_full(data: dict, role: str) -> str:
-    """Форматирует полную информацию о сотруднике с табельным номером."""
-    if role == "admin":
-        return (
-            f"👤  <b>{data['fio']}</b>\n"
-            f"🏢  <b>ПВЗ:</b> {data['pvz']}\n"
-            f"🆔  <b>Табельный:</b> <code>{data['employee_id']}</code>\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"⏱  <b>Факт часов:</b>  {data['fact']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"📊  <b>Лимиты</b>\n"
-            f"   Открыто:       {data['open_limits']}\n"
-            f"   План:           {data['plan_limits']}\n"
-            f"   Выполнение:  {data['execution']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"💳  <b>Карты</b>\n"
-            f"   Виртуальные:  {data['virtual_cards']}\n"
-            f"   Пластиковые:  {data['plastic_cards']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"🎥  <b>ВЧЛ:</b>  {data['vchl']}"
+def render_name_page(results: list, search_query: str, version: int, offset: int) -> tuple:
+    """
+    Строит текст и клавиатуру одной страницы результатов поиска по имени.
+
+    Returns:
+        (text, InlineKeyboardMarkup)
+    """
+    total = len(results)
+    offset = clamp_offset(offset, total)
+    page = results[offset:offset + PAGE_SIZE]
+
+    text_lines = [
+        f"✅ Найдено сотрудников: <b>{total}</b>",
+        f"📄 {page_label(offset, total)}\n",
+    ]
+    buttons = []
+
+    for i, emp in enumerate(page):
+        idx = offset + i + 1
+        role_emoji = "👔" if emp["role"] == "admin" else "🖨"
+        text_lines.append(
+            f"{idx}. {role_emoji} <b>{emp['fio']}</b>\n"
+            f"   ПВЗ: {emp['pvz']} | ID: <code>{emp['employee_id']}</code>"
         )
+        # Создаем кнопки по 5 в ряд
+        if i % 5 == 0:
+            buttons.append([])
+        buttons[-1].append(InlineKeyboardButton(
+            str(idx),
+            callback_data=encode_callback(SELECT_PREFIX, emp["role"], emp["employee_id"]),
+        ))
+
+    nav = nav_row(PAGE_PREFIX, version, offset, total, search_query)
+    if nav:
+        buttons.append(nav)
+
+    # Добавляем кнопку отмены
+    buttons.append([InlineKeyboardButton("❌ Отмена", callback_data=CANCEL_DATA)])
+
+    text = "\n".join(text_lines) + "\n\n👇 Выберите сотрудника:"
+    return text, InlineKeyboardMarkup(buttons)
+
+
+def _name_response(snapshot: dict, search_query: str, offset: int):
+    """Страница результатов из кэша ответов или построенная заново; None — не найдено."""
+    total = result_cache.get_total("asearch", snapshot["version"], search_query)
+    if total is not None:
+        offset = clamp_offset(offset, total)
+        cached = result_cache.get("asearch", snapshot["version"], search_query, offset)
+        if cached is not None:
+            return cached
+
+    results = search_employees_by_name(search_query, snapshot)
+    if not results:
+        return None
+    offset = clamp_offset(offset, len(results))
+    response = render_name_page(results, search_query, snapshot["version"], offset)
+    result_cache.put("asearch", snapshot["version"], search_query, offset, response, len(results))
+    return response
+
+
+def _not_found_text(search_query: str) -> str:
+    last_refresh = get_last_refresh()
+    if last_refresh:
+        note = f"🕐 Данные актуальны на: {fmt_dt(last_refresh)}"
     else:
-        return (
-            f"👤  <b>{data['fio']}</b>\n"
-            f"🏢  <b>ПВЗ:</b> {data['pvz']}\n"
-            f"🆔  <b>Табельный:</b> <code>{data['employee_id']}</code>\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"⏱  <b>Факт часов:</b>  {data['fact']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"💳  <b>Карты</b>\n"
-            f"   Виртуальные:  {data['virtual_cards']}\n"
-            f"   Пластиковые:  {data['plastic_cards']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"🎥  <b>ВЧЛ:</b>  {data['vchl']}"
-        )
+        note = "⏳ Кэш ещё загружается"
+    return f"❌ Сотрудники с именем '<b>{search_query}</b>' не найдены.\n\n{note}"
 
 
 # ================= HANDLERS =================
 
+@observe_handler("cmd_asearch")
 async def cmd_asearch(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало поиска сотрудника по имени."""
     if not is_admin(update):
@@ -69,15 +117,17 @@ async def cmd_asearch(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🔍 <b>Поиск сотрудника по имени</b>\n\n"
         "Введи имя или фамилию:\n"
-        "<i>(например: SAID, AKBAR, RUSTAM)</i>",
+        "<i>(например: SAID, Саид, AKBAR RUSTAM — латиницей или кириллицей, "
+        "опечатки допустимы)</i>",
         parse_mode="HTML"
     )
     return ENTER_NAME
 
 
+@observe_handler("enter_name")
 async def enter_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка введенного имени и показ результатов."""
-    search_query = update.message.text.strip()
+    """Обработка введенного имени и показ первой страницы результатов."""
+    search_query = clean_query(update.message.text)
 
     if not search_query:
         await update.message.reply_text("❌ Пустое сообщение.\n\nВведи имя:")
@@ -87,99 +137,93 @@ async def enter_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Слишком короткий запрос.\n\nВведи минимум 2 символа:")
         return ENTER_NAME
 
-    results = search_employees_by_name(search_query)
+    snapshot = get_snapshot()
 
-    if not results:
-        last_refresh = get_last_refresh()
-        if last_refresh:
-            note = f"🕐 Данные актуальны на: {fmt_dt(last_refresh)}"
-        else:
-            note = "⏳ Кэш ещё загружается"
-
-        await update.message.reply_text(
-            f"❌ Сотрудники с именем '<b>{search_query}</b>' не найдены.\n\n{note}",
-            parse_mode="HTML"
-        )
+    # Запрос целиком едет в callback_data кнопок листания
+    if not fits_callback(encode_callback(PAGE_PREFIX, snapshot["version"], 99999, search_query)):
+        await update.message.reply_text("❌ Слишком длинный запрос.\n\nВведи имя или фамилию короче:")
+        return ENTER_NAME
+
+    response = _name_response(snapshot, search_query, 0)
+
+    if response is None:
+        await update.message.reply_text(_not_found_text(search_query), parse_mode="HTML")
         return ConversationHandler.END
 
-    # Ограничиваем до 20 результатов
-    if len(results) > 20:
-        await update.message.reply_text(
-            f"⚠️ Найдено {len(results)} сотрудников — слишком много.\n\n"
-            f"Уточни запрос для более точного поиска."
-        )
-        return ENTER_NAME
+    text, keyboard = response
+    await update.message.reply_text(text, parse_mode="HTML", reply_markup=keyboard)
 
-    # Сохраняем результаты в context
-    context.user_data["search_results"] = results
+    return ConversationHandler.END
 
-    # Формируем список и кнопки
-    text_lines = [f"✅ Найдено сотрудников: <b>{len(results)}</b>\n"]
-    buttons = []
 
-    for idx, emp in enumerate(results, 1):
-        role_emoji = "👔" if emp["role"] == "admin" else "🖨"
-        text_lines.append(
-            f"{idx}. {role_emoji} <b>{emp['fio']}</b>\n"
-            f"   ПВЗ: {emp['pvz']} | ID: <code>{emp['employee_id']}</code>"
-        )
-        # Создаем кнопки по 3 в ряд
-        if (idx - 1) % 3 == 0:
-            buttons.append([])
-        buttons[-1].append(InlineKeyboardButton(str(idx), callback_data=f"emp_{idx-1}"))
+@observe_handler("name_page")
+async def name_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Листание страниц результатов поиска по имени."""
+    query = update.callback_query
 
-    # Добавляем кнопку отмены
-    buttons.append([InlineKeyboardButton("❌ Отмена", callback_data="cancel")])
+    if not is_admin(update):
+        await query.answer("❌ Нет доступа", show_alert=True)
+        return
 
-    keyboard = InlineKeyboardMarkup(buttons)
-    await update.message.reply_text(
-        "\n".join(text_lines) + "\n\n👇 Выберите сотрудника:",
-        parse_mode="HTML",
-        reply_markup=keyboard
-    )
+    try:
+        version, offset, search_query = decode_callback(query.data)
+        version, offset = int(version), int(offset)
+    except ValueError:
+        await query.answer("❌ Ошибка: неверные данные кнопки", show_alert=True)
+        return
 
-    return SELECT_EMPLOYEE
+    await query.answer()
+
+    # Листаем тот же снимок, что и на первой странице, пока он в памяти
+    snapshot = get_snapshot(version)
+    refreshed = snapshot is None
+    if refreshed:
+        snapshot = get_snapshot()
+
+    response = _name_response(snapshot, search_query, offset)
+    if response is None:
+        await query.edit_message_text(_not_found_text(search_query), parse_mode="HTML")
+        return
+
+    text, keyboard = response
+    if refreshed:
+        text = "🔄 Данные обновились — показываю актуальную версию.\n\n" + text
 
+    await query.edit_message_text(text, parse_mode="HTML", reply_markup=keyboard)
 
+
+@observe_handler("select_employee")
 async def select_employee(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка выбора сотрудника из списка."""
     query = update.callback_query
+
+    if not is_admin(update):
+        await query.answer("❌ Нет доступа", show_alert=True)
+        return
+
     await query.answer()
 
-    if query.data == "cancel":
+    if query.data == CANCEL_DATA:
         await query.edit_message_text("❌ Поиск отменен.")
-        return ConversationHandler.END
+        return
 
-    # Извлекаем индекс
     try:
-        idx = int(query.data.split("_")[1])
-        results = context.user_data.get("search_results", [])
-
-        if idx >= len(results):
-            await query.answer("❌ Ошибка: неверный индекс", show_alert=True)
-            return ConversationHandler.END
-
-        selected = results[idx]
-        employee_id = selected["employee_id"]
-        role = selected["role"]
+        role, employee_id = decode_callback(query.data)
 
         # Получаем полные данные
-        data = find_employee_in_cache(employee_id, role)
+        data, text = find_employee_reply(employee_id, role, with_id=True)
 
         if not data:
             await query.edit_message_text(
-                f"❌ Не удалось загрузить данные для сотрудника {selected['fio']}"
+                f"❌ Не удалось загрузить данные для сотрудника {employee_id}"
             )
-            return ConversationHandler.END
+            return
 
         # Показываем полную статистику
-        text = format_employee_full(data, role)
         await query.edit_message_text(text, parse_mode="HTML")
 
-        logging.info(f"Admin search: {selected['fio']} ({employee_id}) - {role}")
+        logging.info("Admin search: %s (%s) - %s", data["fio"], employee_id, role, extra={"event": "lookup"})
 
     except Exception as e:
         logging.error(f"Ошибка при выборе сотрудника: {e}")
         await query.answer("❌ Произошла ошибка", show_alert=True)
-
-    return ConversationHandler.END
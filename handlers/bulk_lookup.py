@@ -0,0 +1,203 @@
+"""
+Админская команда /bulk — статистика по списку табельных одним файлом.
+
+    /bulk            — бот просит прислать список сообщением или файлом (.txt/.csv)
+    /bulk xlsx       — то же, ответ в XLSX (если установлен openpyxl)
+    /bulk 123 456    — номера прямо в команде (или на следующих строках)
+
+Номера разбираются по строкам: строка из одних чисел (через запятую, «;»,
+табуляцию или пробел) — несколько табельных, иначе берётся первая числовая
+ячейка (CSV с ФИО и прочими колонками). Пробел разделяет номера, только если
+все части — полноценные табельные (3–6 цифр): «12 345» — это один номер 12345. Поиск — по индексу снимка кэша, по
+одному обращению на номер; строки пишутся в файл по мере поиска.
+Ненайденные номера перечисляются в ответе, а в файле — отдельным блоком
+(в XLSX — отдельным листом).
+"""
+
+import asyncio
+import logging
+import re
+from telegram import Update, InputFile
+from telegram.ext import ContextTypes, ConversationHandler
+
+from config import ADMIN_ID, BULK_MAX_IDS, BULK_MAX_FILE_KB
+from utils.cache_manager import iter_employees_by_ids, get_snapshot
+from utils.helpers import now_tashkent
+from utils.metrics import observe_handler
+from utils.user_state import get_field, set_field, pop_field
+from utils import export
+
+# ================= STATES =================
+ENTER_IDS = 0
+
+FORMATS = ("csv", "xlsx")
+# Сколько ненайденных номеров показывать в сообщении (полный список — в файле)
+NOT_FOUND_SHOWN = 50
+
+_CELL_SEP = re.compile(r"[,;\t]")
+# Длина табельного — как в validate_employee_id
+ID_MIN_LEN, ID_MAX_LEN = 3, 6
+
+
+def is_admin(update: Update) -> bool:
+    return str(update.effective_user.id) == str(ADMIN_ID)
+
+
+# ================= PARSING =================
+
+def _clean(cell: str) -> str:
+    return cell.strip().replace(" ", "").replace("\xa0", "")
+
+
+def parse_ids(text: str):
+    """
+    Извлекает табельные из текста по строкам (см. описание модуля).
+
+    Yields:
+        табельные в порядке появления, без повторов
+    """
+    seen = set()
+    for line in text.splitlines():
+        cells = [c for c in _CELL_SEP.split(line) if c.strip()]
+        if len(cells) == 1:
+            words = cells[0].split()
+            if all(w.isdigit() and ID_MIN_LEN <= len(w) <= ID_MAX_LEN for w in words):
+                cells = words
+        cleaned = [_clean(c) for c in cells]
+        numbers = [c for c in cleaned if c.isdigit()]
+        if not numbers:
+            continue
+        if len(numbers) != len(cleaned):
+            numbers = numbers[:1]
+        for employee_id in numbers:
+            if employee_id not in seen:
+                seen.add(employee_id)
+                yield employee_id
+
+
+# ================= BATCH =================
+
+def build_report(text: str, fmt: str) -> tuple:
+    """
+    Ищет табельные из текста и пишет найденных сотрудников в файл.
+    Выполняется в потоке: и разбор, и поиск, и запись идут одним проходом.
+
+    Returns:
+        (файл, формат, всего номеров, найдено сотрудников, [ненайденные номера], обрезано ли)
+    """
+    not_found = []
+    stats = {"ids": 0, "truncated": False}
+
+    def _rows():
+        ids = parse_ids(text)
+        for employee_id, found in iter_employees_by_ids(ids, get_snapshot()):
+            if stats["ids"] >= BULK_MAX_IDS:
+                stats["truncated"] = True
+                break
+            stats["ids"] += 1
+            if not found:
+                not_found.append(employee_id)
+            yield from found
+
+    # Список ненайденных заполняется по ходу записи и дописывается в конец файла
+    extra = {"Не найдены": not_found}
+    if fmt == "xlsx" and not export.xlsx_available():
+        fmt = "csv"
+    writer = export.write_xlsx if fmt == "xlsx" else export.write_csv
+    f, count = writer(_rows(), extra)
+    return f, fmt, stats["ids"], count, not_found, stats["truncated"]
+
+
+# ================= HANDLERS =================
+
+async def _reply_report(update: Update, text: str, fmt: str):
+    message = update.message
+    f, used, total, count, not_found, truncated = await asyncio.to_thread(build_report, text, fmt)
+    if not total:
+        f.close()
+        set_field(update.effective_user.id, "bulk_format", fmt, ttl=600)
+        await message.reply_text(
+            "❌ Не нашёл ни одного табельного.\n\n"
+            "Пришли номера по одному в строке или CSV с номерами в первой колонке:"
+        )
+        return ENTER_IDS
+
+    lines = [f"📦 Номеров: <b>{total}</b>, найдено сотрудников: <b>{count}</b>"]
+    if truncated:
+        lines.append(f"⚠️ Обработаны первые {BULK_MAX_IDS} номеров")
+    if used != fmt:
+        lines.append("⚠️ openpyxl не установлен — файл в CSV")
+    if not_found:
+        shown = ", ".join(not_found[:NOT_FOUND_SHOWN])
+        more = f" и ещё {len(not_found) - NOT_FOUND_SHOWN}" if len(not_found) > NOT_FOUND_SHOWN else ""
+        lines.append(f"❌ Не найдены ({len(not_found)}): <code>{shown}</code>{more}")
+
+    filename = f"bulk-{now_tashkent().strftime('%Y%m%d-%H%M%S')}.{used}"
+    # PTB всё равно читает файл целиком перед отправкой
+    with f:
+        data = f.read()
+    await message.reply_document(
+        document=InputFile(data, filename=filename),
+        caption="\n".join(lines),
+        parse_mode="HTML",
+    )
+    logging.info(f"📦 Пакетный поиск: {total} номеров, найдено {count}, не найдено {len(not_found)}")
+    return ConversationHandler.END
+
+
+@observe_handler("cmd_bulk")
+async def cmd_bulk(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Начало пакетного поиска; номера могут прийти прямо в команде."""
+    if not is_admin(update):
+        await update.message.reply_text("❌ Нет доступа к этой команде.")
+        return ConversationHandler.END
+
+    # Всё после команды (и формата) — список номеров
+    parts = update.message.text.split(None, 1)
+    text = parts[1] if len(parts) > 1 else ""
+    fmt = "csv"
+    head = text.split(None, 1)
+    if head and head[0].lower() in FORMATS:
+        fmt = head[0].lower()
+        text = head[1] if len(head) > 1 else ""
+    if text.strip():
+        return await _reply_report(update, text, fmt)
+
+    set_field(update.effective_user.id, "bulk_format", fmt, ttl=600)
+    note = ""
+    if fmt == "xlsx" and not export.xlsx_available():
+        note = "\n\n⚠️ openpyxl не установлен — ответ будет в CSV."
+    await update.message.reply_text(
+        "📦 <b>Пакетный поиск</b>\n\n"
+        f"Пришли табельные номера (до {BULK_MAX_IDS}) сообщением — по одному в строке — "
+        f"или файлом .txt/.csv до {BULK_MAX_FILE_KB} КБ." + note,
+        parse_mode="HTML",
+    )
+    return ENTER_IDS
+
+
+@observe_handler("receive_ids")
+async def receive_ids(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Список номеров сообщением или документом."""
+    if not is_admin(update):
+        return ConversationHandler.END
+
+    message = update.message
+    fmt = get_field(update.effective_user.id, "bulk_format", "csv")
+    pop_field(update.effective_user.id, "bulk_format")
+
+    if message.document:
+        document = message.document
+        if document.file_size and document.file_size > BULK_MAX_FILE_KB * 1024:
+            await message.reply_text(f"❌ Файл больше {BULK_MAX_FILE_KB} КБ. Раздели список на части.")
+            return ConversationHandler.END
+        name = (document.file_name or "").lower()
+        if not name.endswith((".txt", ".csv")):
+            await message.reply_text("❌ Нужен файл .txt или .csv с табельными номерами.")
+            return ConversationHandler.END
+        data = await (await document.get_file()).download_as_bytearray()
+        text = bytes(data).decode("utf-8-sig", errors="replace")
+    else:
+        text = message.text
+
+    return await _reply_report(update, text, fmt)
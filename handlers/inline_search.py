@@ -0,0 +1,220 @@
+"""
+Inline-режим: @бот <запрос> прямо в любом чате.
+
+Запрос разбирается так:
+    • только цифры      — табельный номер: точный, в роли из диалога /start,
+                          с лимитом и журналом как в диалоге (для админа —
+                          поиск по префиксу)
+    • буквы + номер     — ПВЗ (например: ТАШ-5, tash-5)
+    • остальное         — префикс имени/фамилии (только для админа, как /asearch)
+
+Поиск идёт по отсортированным индексам снимка кэша без сканирования таблиц.
+Inline-режим и обратная связь о выбранном результате включаются в @BotFather
+(/setinline и /setinlinefeedback).
+"""
+
+import logging
+import re
+import time
+from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from telegram.ext import ContextTypes
+
+from config import CACHE_TTL_SECONDS
+from utils.cache_manager import (
+    get_snapshot, get_last_refresh, get_reply_text, find_employee_reply,
+    prefix_search_ids, prefix_search_pvz, prefix_search_names,
+)
+from utils.rate_limiter import check_rate_limit
+from utils.metrics import observe_handler, inc
+from utils.request_logger import log_request
+from utils.admin_notifier import send_admin_message
+from utils.helpers import now_tashkent, normalize_id
+from utils import refresh_scheduler
+from handlers.admin import is_admin
+from handlers.user import validate_employee_id
+from session_cache import get_role
+
+# Telegram принимает не больше 50 результатов за один ответ
+RESULTS_PER_ANSWER = 50
+
+_PVZ_QUERY_RE = re.compile(r"^[^\W\d_]+[\s\-]*\d+$")
+
+
+# ================= HELPERS =================
+
+def _cache_time() -> int:
+    """Сколько секунд Telegram может кэшировать ответ — до следующего обновления кэша."""
+    last_refresh = get_last_refresh()
+    if last_refresh is None:
+        return 0
+    next_due = refresh_scheduler.next_due()
+    if next_due is not None:
+        return max(0, min(int(next_due - time.time()), CACHE_TTL_SECONDS))
+    age = int((now_tashkent() - last_refresh).total_seconds())
+    return max(0, min(CACHE_TTL_SECONDS - age, CACHE_TTL_SECONDS))
+
+
+def _article(emp: dict, text: str, pos: int) -> InlineQueryResultArticle:
+    """pos — номер результата в выдаче: табельный может повторяться в разных
+    таблицах или быть пустым, а одинаковые id Telegram не принимает."""
+    role_label = "Администратор" if emp["role"] == "admin" else "МФУ"
+    return InlineQueryResultArticle(
+        id=f"{emp['role']}:{emp['employee_id']}:{pos}",
+        title=emp["fio"],
+        description=f"{role_label} · ПВЗ: {emp['pvz']} · Факт: {emp['fact']}",
+        input_message_content=InputTextMessageContent(text, parse_mode="HTML"),
+    )
+
+
+def _digits(query_text: str) -> str:
+    """Запрос из одних цифр (пробелы не в счёт) или пустая строка."""
+    cleaned = query_text.replace(" ", "").replace("\xa0", "")
+    return cleaned if cleaned.isdigit() else ""
+
+
+def _lookup(user, digits: str) -> list:
+    """
+    Точный поиск по табельному для обычного пользователя — как в диалоге
+    /start: лимит «lookup», журнал запросов и детектор подозрительной
+    активности, одна карточка в роли, выбранной в диалоге.
+
+    Returns:
+        список пар (сотрудник, текст сообщения); None — лимит превышен
+    """
+    # Неполный номер, пока пользователь печатает, — не запрос
+    ok, _ = validate_employee_id(digits)
+    if not ok:
+        return []
+    if not check_rate_limit(user.id):
+        return None
+
+    employee_id = normalize_id(digits)
+    role = get_role(user.id)
+    if role:
+        emp, text = find_employee_reply(employee_id, role)
+    else:
+        # Роль ещё не выбрана — не больше одной карточки
+        snapshot = get_snapshot()
+        emp = next((emp for emp in prefix_search_ids(employee_id, 2, snapshot)
+                    if emp["employee_id"] == employee_id), None)
+        text = emp and get_reply_text(emp, with_id=False, snapshot=snapshot)
+
+    log_role = role or (emp["role"] if emp else None)
+    log_request(
+        user_id=user.id,
+        username=user.username,
+        employee_id=employee_id,
+        role=log_role,
+        found=emp is not None,
+        alert_callback=send_admin_message,
+    )
+    inc("lookups_total", role=log_role or "unknown", found=str(emp is not None).lower())
+    return [(emp, text)] if emp else []
+
+
+def _search(query_text: str, admin: bool, limit: int) -> list:
+    """
+    Выполняет поиск по типу запроса (табельный обычного пользователя — _lookup).
+
+    Returns:
+        список пар (сотрудник, текст сообщения)
+    """
+    snapshot = get_snapshot()
+
+    if admin and _digits(query_text):
+        found = prefix_search_ids(_digits(query_text), limit, snapshot)
+        return [(emp, get_reply_text(emp, snapshot=snapshot)) for emp in found]
+
+    if _PVZ_QUERY_RE.match(query_text):
+        found = prefix_search_pvz(query_text, limit, snapshot)
+        return [(emp, get_reply_text(emp, snapshot=snapshot)) for emp in found]
+
+    if admin and len(query_text) >= 2:
+        found = prefix_search_names(query_text, limit, snapshot)
+        return [(emp, get_reply_text(emp, snapshot=snapshot)) for emp in found]
+
+    return []
+
+
+# ================= HANDLERS =================
+
+@observe_handler("inline_query")
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ответ на inline-запрос @бот <запрос>."""
+    query = update.inline_query
+    query_text = query.query.strip()
+
+    if not query_text:
+        await query.answer([], cache_time=0, is_personal=True)
+        return
+
+    admin = is_admin(update)
+    digits = _digits(query_text)
+    if digits and not admin:
+        try:
+            found = _lookup(query.from_user, digits)
+        except Exception as e:
+            logging.error(f"Ошибка inline-поиска '{query_text}': {e}")
+            found = None
+        if found is None:
+            await query.answer([], cache_time=0, is_personal=True)
+            return
+        await query.answer(
+            [_article(emp, text, pos) for pos, (emp, text) in enumerate(found)],
+            cache_time=_cache_time(),
+            is_personal=True,
+        )
+        return
+
+    if not check_rate_limit(query.from_user.id, "inline"):
+        await query.answer([], cache_time=0, is_personal=True)
+        return
+
+    try:
+        offset = int(query.offset or 0)
+    except ValueError:
+        offset = 0
+
+    try:
+        found = _search(query_text, admin, offset + RESULTS_PER_ANSWER + 1)
+    except Exception as e:
+        logging.error(f"Ошибка inline-поиска '{query_text}': {e}")
+        await query.answer([], cache_time=0, is_personal=True)
+        return
+
+    page = found[offset:offset + RESULTS_PER_ANSWER]
+    next_offset = str(offset + RESULTS_PER_ANSWER) if len(found) > offset + RESULTS_PER_ANSWER else ""
+
+    await query.answer(
+        [_article(emp, text, pos) for pos, (emp, text) in enumerate(page, offset)],
+        cache_time=_cache_time(),
+        is_personal=True,
+        next_offset=next_offset,
+    )
+
+
+@observe_handler("chosen_inline_result")
+async def chosen_inline_result(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Логирует выбранный inline-результат поиска по ПВЗ или админского поиска
+    как обычный запрос по табельному. Табельный обычного пользователя
+    уже записан при самом запросе (_lookup).
+    """
+    chosen = update.chosen_inline_result
+    if _digits(chosen.query) and not is_admin(update):
+        return
+    try:
+        role, employee_id, _ = chosen.result_id.split(":")
+    except ValueError:
+        return
+    if not employee_id:
+        return
+
+    log_request(
+        user_id=chosen.from_user.id,
+        username=chosen.from_user.username,
+        employee_id=employee_id,
+        role=role,
+        found=True,
+        alert_callback=send_admin_message,
+    )
@@ -1,17 +1,34 @@
 """
 Команда /pvz для поиска всех сотрудников конкретного ПВЗ.
+
+Результаты выводятся постранично. Кнопки листания несут в callback_data
+версию снимка кэша, смещение и запрос, поэтому списки результатов
+в context.user_data не хранятся.
 """
 
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
-from utils.cache_manager import search_employees_by_pvz, find_employee_in_cache
-from utils.helpers import fmt_dt, normalize_pvz
+from utils.cache_manager import search_employees_by_pvz, find_employee_reply, get_snapshot
+from utils.helpers import fmt_dt, normalize_pvz, extract_pvz_number
 from utils.cache_manager import get_last_refresh
+from session_cache import set_last_pvz
+from utils.rate_limiter import check_rate_limit
+from utils.metrics import observe_handler
+from utils import result_cache
+from utils.pagination import (
+    PAGE_SIZE, encode_callback, decode_callback, sign_callback, verify_callback, fits_callback, clean_query,
+    clamp_offset, page_label, nav_row,
+)
 
 # ================= STATES =================
-ENTER_PVZ, SELECT_EMPLOYEE_PVZ = range(2)
+ENTER_PVZ = 0
+
+# ================= CALLBACKS =================
+PAGE_PREFIX = "pvzp"      # pvzp|<версия>|<смещение>|<ПВЗ>
+SELECT_PREFIX = "pvze"    # pvze|<роль>|<табельный>|<подпись>
+CANCEL_DATA = "cancel_pvz"
 
 
 # ================= FORMATTERS =================
@@ -26,45 +43,101 @@ def format_employee_short(emp: dict) -> str:
     )
 
 
-def format_employee_full(data: dict, role: str) -> str:
-    """Форматирует полную информацию о сотруднике."""
-    if role == "admin":
-        return (
-            f"👤  <b>{data['fio']}</b>\n"
-            f"🏢  <b>ПВЗ:</b> {data['pvz']}\n"
-            f"🆔  <b>Табельный:</b> <code>{data['employee_id']}</code>\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"⏱  <b>Факт часов:</b>  {data['fact']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"📊  <b>Лимиты</b>\n"
-            f"   Открыто:       {data['open_limits']}\n"
-            f"   План:           {data['plan_limits']}\n"
-            f"   Выполнение:  {data['execution']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"💳  <b>Карты</b>\n"
-            f"   Виртуальные:  {data['virtual_cards']}\n"
-            f"   Пластиковые:  {data['plastic_cards']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"🎥  <b>ВЧЛ:</b>  {data['vchl']}"
-        )
+def render_pvz_page(results: list, pvz_name: str, version: int, offset: int) -> tuple:
+    """
+    Строит текст и клавиатуру одной страницы результатов ПВЗ.
+
+    Returns:
+        (text, InlineKeyboardMarkup)
+    """
+    total = len(results)
+    offset = clamp_offset(offset, total)
+    page = results[offset:offset + PAGE_SIZE]
+
+    # Результаты отсортированы: сначала администраторы, затем МФУ
+    admins_total = sum(1 for e in results if e["role"] == "admin")
+
+    text_lines = [
+        f"🏢 <b>ПВЗ: {pvz_name}</b>\n",
+        f"👥 Найдено сотрудников: <b>{total}</b>",
+        f"📄 {page_label(offset, total)}",
+    ]
+
+    current_role = None
+    for idx, emp in enumerate(page, offset + 1):
+        if emp["role"] != current_role:
+            current_role = emp["role"]
+            if current_role == "admin":
+                text_lines.append(f"\n👔 <b>Администраторы ({admins_total}):</b>")
+            else:
+                text_lines.append(f"\n🖨 <b>МФУ ({total - admins_total}):</b>")
+        text_lines.append(f"{idx}. {format_employee_short(emp)}")
+
+    # Кнопки сотрудников (по 5 в ряд)
+    buttons = []
+    for i, emp in enumerate(page):
+        if i % 5 == 0:
+            buttons.append([])
+        buttons[-1].append(InlineKeyboardButton(
+            str(offset + i + 1),
+            callback_data=sign_callback(SELECT_PREFIX, emp["role"], emp["employee_id"]),
+        ))
+
+    nav = nav_row(PAGE_PREFIX, version, offset, total, pvz_name)
+    if nav:
+        buttons.append(nav)
+
+    # Добавляем кнопку отмены
+    buttons.append([InlineKeyboardButton("❌ Отмена", callback_data=CANCEL_DATA)])
+
+    text = "\n".join(text_lines) + "\n\n👇 Выбери сотрудника для подробной информации:"
+    return text, InlineKeyboardMarkup(buttons)
+
+
+def _pvz_response(snapshot: dict, pvz_name: str, offset: int):
+    """
+    Страница результатов ПВЗ из кэша ответов или построенная заново.
+
+    Returns:
+        (text, keyboard, exact) — exact: запрос совпал с названием ПВЗ целиком;
+        None если сотрудники не найдены
+    """
+    total = result_cache.get_total("pvz", snapshot["version"], pvz_name)
+    if total is not None:
+        offset = clamp_offset(offset, total)
+        cached = result_cache.get("pvz", snapshot["version"], pvz_name, offset)
+        if cached is not None:
+            return cached
+
+    results = search_employees_by_pvz(pvz_name, snapshot)
+    if not results:
+        return None
+    offset = clamp_offset(offset, len(results))
+    exact = any(emp["pvz_normalized"] == pvz_name for emp in results)
+
+    # Если название не влезает в callback_data — листаем по номеру ПВЗ
+    page_name = pvz_name
+    if not fits_callback(encode_callback(PAGE_PREFIX, snapshot["version"], len(results), pvz_name)):
+        page_name = extract_pvz_number(pvz_name)
+
+    text, keyboard = render_pvz_page(results, page_name, snapshot["version"], offset)
+    response = (text, keyboard, exact)
+    result_cache.put("pvz", snapshot["version"], pvz_name, offset, response, len(results))
+    return response
+
+
+def _not_found_text(pvz_name: str) -> str:
+    last_refresh = get_last_refresh()
+    if last_refresh:
+        note = f"🕐 Данные актуальны на: {fmt_dt(last_refresh)}"
     else:
-        return (
-            f"👤  <b>{data['fio']}</b>\n"
-            f"🏢  <b>ПВЗ:</b> {data['pvz']}\n"
-            f"🆔  <b>Табельный:</b> <code>{data['employee_id']}</code>\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"⏱  <b>Факт часов:</b>  {data['fact']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"💳  <b>Карты</b>\n"
-            f"   Виртуальные:  {data['virtual_cards']}\n"
-            f"   Пластиковые:  {data['plastic_cards']}\n"
-            f"━━━━━━━━━━━━━━━━━\n"
-            f"🎥  <b>ВЧЛ:</b>  {data['vchl']}"
-        )
+        note = "⏳ Кэш ещё загружается"
+    return f"❌ Сотрудники ПВЗ '<b>{pvz_name}</b>' не найдены.\n\n{note}"
 
 
 # ================= HANDLERS =================
 
+@observe_handler("cmd_pvz")
 async def cmd_pvz(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало поиска сотрудников по ПВЗ."""
     await update.message.reply_text(
@@ -76,8 +149,9 @@ async def cmd_pvz(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ENTER_PVZ
 
 
+@observe_handler("enter_pvz")
 async def enter_pvz(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка введенного названия ПВЗ и показ результатов."""
+    """Обработка введенного названия ПВЗ и показ первой страницы результатов."""
     pvz_query = update.message.text.strip()
 
     if not pvz_query:
@@ -88,131 +162,100 @@ async def enter_pvz(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Слишком короткий запрос.\n\nВведи минимум 2 символа:")
         return ENTER_PVZ
 
+    if not check_rate_limit(update.effective_user.id, "pvz"):
+        await update.message.reply_text(
+            "⏱ Слишком много запросов.\n\nПодожди немного и попробуй снова."
+        )
+        return ENTER_PVZ
+
     # Нормализуем для отображения
-    normalized = normalize_pvz(pvz_query)
+    normalized = clean_query(normalize_pvz(pvz_query))
 
-    results = search_employees_by_pvz(pvz_query)
+    response = _pvz_response(get_snapshot(), normalized, 0)
 
-    if not results:
-        last_refresh = get_last_refresh()
-        if last_refresh:
-            note = f"🕐 Данные актуальны на: {fmt_dt(last_refresh)}"
-        else:
-            note = "⏳ Кэш ещё загружается"
-
-        await update.message.reply_text(
-            f"❌ Сотрудники ПВЗ '<b>{normalized}</b>' не найдены.\n\n{note}",
-            parse_mode="HTML"
-        )
+    if response is None:
+        await update.message.reply_text(_not_found_text(normalized), parse_mode="HTML")
         return ConversationHandler.END
 
-    # Ограничиваем до 30 результатов
-    if len(results) > 30:
-        await update.message.reply_text(
-            f"⚠️ Найдено {len(results)} сотрудников — слишком много для отображения.\n\n"
-            f"Показываю первых 30:"
-        )
-        results = results[:30]
+    text, keyboard, exact = response
+    if exact:
+        set_last_pvz(update.effective_user.id, normalized)
 
-    # Сохраняем результаты в context
-    context.user_data["pvz_results"] = results
-    context.user_data["pvz_name"] = normalized
+    await update.message.reply_text(text, parse_mode="HTML", reply_markup=keyboard)
 
-    # Формируем список и кнопки
-    text_lines = [
-        f"🏢 <b>ПВЗ: {normalized}</b>\n",
-        f"👥 Найдено сотрудников: <b>{len(results)}</b>\n"
-    ]
+    return ConversationHandler.END
 
-    # Группируем по ролям
-    admins = [e for e in results if e["role"] == "admin"]
-    mfu = [e for e in results if e["role"] == "mfu"]
 
-    if admins:
-        text_lines.append(f"\n👔 <b>Администраторы ({len(admins)}):</b>")
-        for idx, emp in enumerate(admins, 1):
-            text_lines.append(f"{idx}. {format_employee_short(emp)}")
+@observe_handler("pvz_page")
+async def pvz_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Листание страниц результатов ПВЗ."""
+    query = update.callback_query
 
-    if mfu:
-        text_lines.append(f"\n🖨 <b>МФУ ({len(mfu)}):</b>")
-        for idx, emp in enumerate(mfu, len(admins) + 1):
-            text_lines.append(f"{idx}. {format_employee_short(emp)}")
+    try:
+        version, offset, pvz_name = decode_callback(query.data)
+        version, offset = int(version), int(offset)
+    except ValueError:
+        await query.answer("❌ Ошибка: неверные данные кнопки", show_alert=True)
+        return
 
-    # Создаем кнопки (по 5 в ряд)
-    buttons = []
-    for idx in range(len(results)):
-        if idx % 5 == 0:
-            buttons.append([])
-        buttons[-1].append(InlineKeyboardButton(str(idx + 1), callback_data=f"pvz_{idx}"))
+    if not check_rate_limit(update.effective_user.id, "pvz"):
+        await query.answer("⏱ Слишком много запросов. Подожди немного.", show_alert=True)
+        return
 
-    # Добавляем кнопку отмены
-    buttons.append([InlineKeyboardButton("❌ Отмена", callback_data="cancel_pvz")])
+    await query.answer()
 
-    keyboard = InlineKeyboardMarkup(buttons)
+    # Листаем тот же снимок, что и на первой странице, пока он в памяти
+    snapshot = get_snapshot(version)
+    refreshed = snapshot is None
+    if refreshed:
+        snapshot = get_snapshot()
 
-    # Отправляем сообщение (может быть длинным, разбиваем если нужно)
-    full_text = "\n".join(text_lines) + "\n\n👇 Выбери сотрудника для подробной информации:"
+    response = _pvz_response(snapshot, pvz_name, offset)
+    if response is None:
+        await query.edit_message_text(_not_found_text(pvz_name), parse_mode="HTML")
+        return
 
-    if len(full_text) > 4000:
-        # Telegram лимит 4096 символов, отправляем по частям
-        await update.message.reply_text(
-            "\n".join(text_lines[:len(text_lines)//2]),
-            parse_mode="HTML"
-        )
-        await update.message.reply_text(
-            "\n".join(text_lines[len(text_lines)//2:]) + "\n\n👇 Выбери сотрудника:",
-            parse_mode="HTML",
-            reply_markup=keyboard
-        )
-    else:
-        await update.message.reply_text(
-            full_text,
-            parse_mode="HTML",
-            reply_markup=keyboard
-        )
+    text, keyboard, _ = response
+    if refreshed:
+        text = "🔄 Данные обновились — показываю актуальную версию.\n\n" + text
 
-    return SELECT_EMPLOYEE_PVZ
+    await query.edit_message_text(text, parse_mode="HTML", reply_markup=keyboard)
 
 
+@observe_handler("select_employee_pvz")
 async def select_employee_pvz(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка выбора сотрудника из списка ПВЗ."""
     query = update.callback_query
-    await query.answer()
 
-    if query.data == "cancel_pvz":
+    if query.data == CANCEL_DATA:
+        await query.answer()
         await query.edit_message_text("❌ Поиск отменен.")
-        return ConversationHandler.END
-
-    # Извлекаем индекс
-    try:
-        idx = int(query.data.split("_")[1])
-        results = context.user_data.get("pvz_results", [])
+        return
 
-        if idx >= len(results):
-            await query.answer("❌ Ошибка: неверный индекс", show_alert=True)
-            return ConversationHandler.END
+    # Кнопку выдал бот в списке результатов — подделанный табельный не пройдёт
+    parts = verify_callback(query.data)
+    if parts is None or len(parts) != 2:
+        await query.answer("❌ Ошибка: неверные данные кнопки", show_alert=True)
+        return
+    await query.answer()
 
-        selected = results[idx]
-        employee_id = selected["employee_id"]
-        role = selected["role"]
+    try:
+        role, employee_id = parts
 
         # Получаем полные данные
-        data = find_employee_in_cache(employee_id, role)
+        data, text = find_employee_reply(employee_id, role, with_id=True)
 
         if not data:
             await query.edit_message_text(
-                f"❌ Не удалось загрузить данные для сотрудника {selected['fio']}"
+                f"❌ Не удалось загрузить данные для сотрудника {employee_id}"
             )
-            return ConversationHandler.END
+            return
 
         # Показываем полную статистику
-        text = format_employee_full(data, role)
         await query.edit_message_text(text, parse_mode="HTML")
 
-        logging.info(f"PVZ search: {selected['fio']} ({employee_id}) - {selected['pvz']}")
+        logging.info("PVZ search: %s (%s) - %s", data["fio"], employee_id, data["pvz"], extra={"event": "lookup"})
 
     except Exception as e:
         logging.error(f"Ошибка при выборе сотрудника из ПВЗ: {e}")
         await query.answer("❌ Произошла ошибка", show_alert=True)
-
-    return ConversationHandler.END
@@ -1,19 +1,26 @@
+import asyncio
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+from telegram.ext import ContextTypes, ConversationHandler
 
-from utils.cache_manager import find_employee_in_cache, get_last_refresh
+from utils.cache_manager import find_employee_reply, get_last_refresh, suggest_employee_ids
 from utils.rate_limiter import check_rate_limit
-from utils.request_logger import log_request, clear_user_searches
+from utils.metrics import observe_handler, timer, inc
+from utils.request_logger import log_request
 from utils.admin_notifier import send_admin_message
 from utils.helpers import fmt_dt, normalize_id
-from session_cache import get_role, set_role, clear_role
-from utils.card_generator import generate_card
+from utils.pagination import encode_callback, decode_callback
+from session_cache import (
+    get_role, set_role, clear_role, get_last_pvz, set_last_pvz, get_last_employee, set_last_employee,
+)
 
 # ================= STATES =================
 
 SELECT_ROLE, ENTER_ID = range(2)
 
+# callback_data подсказки похожего табельного: sugg|<табельный>
+SUGGEST_PREFIX = "sugg"
+
 
 # ================= KEYBOARDS =================
 
@@ -35,42 +42,14 @@ def search_keyboard():
         [InlineKeyboardButton("❌  Отмена", callback_data="cancel_search")],
     ])
 
-
-# ================= FORMATTERS =================
-
-def format_card_admin(data: dict) -> str:
-    return (
-        f"👤  <b>{data['fio']}</b>\n"
-        f"🏢  <b>ПВЗ:</b> {data['pvz']}\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"⏱  <b>Факт часов:</b>  {data['fact']}\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"📊  <b>Лимиты</b>\n"
-        f"   Открыто:       {data['open_limits']}\n"
-        f"   План:           {data['plan_limits']}\n"
-        f"   Выполнение:  {data['execution']}\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"💳  <b>Карты</b>\n"
-        f"   Виртуальные:  {data['virtual_cards']}\n"
-        f"   Пластиковые:  {data['plastic_cards']}\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"🎥  <b>ВЧЛ:</b>  {data['vchl']}"
-    )
-
-
-def format_card_mfu(data: dict) -> str:
-    return (
-        f"👤  <b>{data['fio']}</b>\n"
-        f"🏢  <b>ПВЗ:</b> {data['pvz']}\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"⏱  <b>Факт часов:</b>  {data['fact']}\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"💳  <b>Карты</b>\n"
-        f"   Виртуальные:  {data['virtual_cards']}\n"
-        f"   Пластиковые:  {data['plastic_cards']}\n"
-        f"━━━━━━━━━━━━━━━━━\n"
-        f"🎥  <b>ВЧЛ:</b>  {data['vchl']}"
-    )
+def suggestions_keyboard(suggestions: list):
+    """Клавиатура с похожими табельными и кнопкой отмены."""
+    rows = [[
+        InlineKeyboardButton(f"🔎 {emp_id}", callback_data=encode_callback(SUGGEST_PREFIX, emp_id))
+        for emp_id in suggestions
+    ]]
+    rows.append([InlineKeyboardButton("❌  Отмена", callback_data="cancel_search")])
+    return InlineKeyboardMarkup(rows)
 
 
 # ================= VALIDATION =================
@@ -101,10 +80,10 @@ def validate_employee_id(text: str) -> tuple[bool, str]:
 
 # ================= HANDLERS =================
 
+@observe_handler("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
 
-    clear_user_searches(user.id)
     clear_role(user.id)
 
     last_refresh = get_last_refresh()
@@ -130,6 +109,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return SELECT_ROLE
 
 
+@observe_handler("select_role")
 async def select_role(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -138,14 +118,21 @@ async def select_role(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # ── Генерация и отправка карточки ───────────────────────────────────────
     if data == "share_card":
-        employee = context.user_data.get("last_employee")
+        employee = get_last_employee(query.from_user.id)
         role = get_role(query.from_user.id)
         if not employee or not role:
             await query.answer("⚠️ Данные устарели, сделай новый поиск.", show_alert=True)
             return SELECT_ROLE
+        if not check_rate_limit(query.from_user.id, "card"):
+            await query.answer("⏱ Слишком много карточек. Подожди немного.", show_alert=True)
+            return SELECT_ROLE
         await query.answer("⏳ Генерирую карточку...")
         try:
-            png_bytes = generate_card(employee, role)
+            # Pillow импортируется только здесь: большинству сессий карточка не нужна
+            from utils.card_generator import generate_card
+            # Рендер PNG занимает десятки мс — в потоке, чтобы не держать остальных
+            with timer("card_render_seconds"):
+                png_bytes = await asyncio.to_thread(generate_card, employee, role)
             await query.message.reply_photo(
                 photo=png_bytes,
                 caption=f"📊 {employee.get('fio', '')} · {employee.get('pvz', '')}",
@@ -181,7 +168,6 @@ async def select_role(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     role = data
     set_role(query.from_user.id, role)
-    context.user_data["role"] = role
 
     role_label = "Администратор" if role == "admin" else "МФУ"
     await query.edit_message_text(
@@ -193,6 +179,67 @@ async def select_role(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ENTER_ID
 
 
+async def _lookup_and_reply(message, user, employee_id: str, context: ContextTypes.DEFAULT_TYPE):
+    """Ищет сотрудника по табельному и отвечает карточкой или подсказками."""
+    role = get_role(user.id)
+
+    if not role:
+        await message.reply_text(
+            "⚠️ Не удалось определить роль.\n\nНажми /start чтобы начать заново."
+        )
+        return SELECT_ROLE
+
+    data, text = find_employee_reply(employee_id, role)
+
+    log_request(
+        user_id=user.id,
+        username=user.username,
+        employee_id=employee_id,
+        role=role,
+        found=data is not None,
+        alert_callback=send_admin_message,
+    )
+    inc("lookups_total", role=role, found=str(data is not None).lower())
+
+    if data:
+        # Сохраняем для генерации карточки и подсказок
+        set_last_employee(user.id, data)
+        set_last_pvz(user.id, data.get("pvz_normalized"))
+
+        await message.reply_text(
+            text,
+            parse_mode="HTML",
+            reply_markup=new_search_keyboard(),
+        )
+        return SELECT_ROLE
+
+    last_refresh = get_last_refresh()
+    if last_refresh is None:
+        note = "⏳ Кэш ещё загружается — попробуй через минуту."
+        suggestions = []
+    else:
+        note = f"🕐 Данные актуальны на: {fmt_dt(last_refresh)}"
+        # Без выбранного ранее ПВЗ подсказок нет — только «проверь номер»
+        suggestions = suggest_employee_ids(employee_id, role, pvz=get_last_pvz(user.id))
+
+    if suggestions:
+        hint = "Возможно, ты имел в виду один из этих номеров 👇"
+        keyboard = suggestions_keyboard(suggestions)
+    else:
+        hint = "Проверь номер и попробуй ещё раз:"
+        keyboard = search_keyboard()
+
+    await message.reply_text(
+        f"❌ Табельный <code>{employee_id}</code> не найден.\n\n"
+        f"{note}\n\n"
+        f"{hint}",
+        parse_mode="HTML",
+        reply_markup=keyboard
+    )
+    return ENTER_ID
+
+
+@observe_handler("enter_id")
 async def enter_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.effective_user
@@ -211,52 +258,7 @@ async def enter_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return ENTER_ID
 
         employee_id = normalize_id(user_text)
-        role = get_role(user.id) or context.user_data.get("role")
-
-        if not role:
-            await update.message.reply_text(
-                "⚠️ Не удалось определить роль.\n\nНажми /start чтобы начать заново."
-            )
-            return SELECT_ROLE
-
-        data = find_employee_in_cache(employee_id, role)
-
-        log_request(
-            user_id=user.id,
-            username=user.username,
-            employee_id=employee_id,
-            role=role,
-            found=data is not None,
-            alert_callback=send_admin_message,
-        )
-
-        if data:
-            # Сохраняем для генерации карточки
-            context.user_data["last_employee"] = data
-
-            text = format_card_admin(data) if role == "admin" else format_card_mfu(data)
-            await update.message.reply_text(
-                text,
-                parse_mode="HTML",
-                reply_markup=new_search_keyboard(),
-            )
-            return SELECT_ROLE
-
-        else:
-            last_refresh = get_last_refresh()
-            if last_refresh is None:
-                note = "⏳ Кэш ещё загружается — попробуй через минуту."
-            else:
-                note = f"🕐 Данные актуальны на: {fmt_dt(last_refresh)}"
-
-            await update.message.reply_text(
-                f"❌ Табельный <code>{employee_id}</code> не найден.\n\n"
-                f"{note}\n\n"
-                f"Проверь номер и попробуй ещё раз:",
-                parse_mode="HTML",
-                reply_markup=search_keyboard()
-            )
-            return ENTER_ID
+        return await _lookup_and_reply(update.message, user, employee_id, context)
 
     except Exception as e:
         error = (
@@ -266,8 +268,34 @@ async def enter_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"Ошибка: {e}"
         )
         logging.error(error)
-        send_admin_message(error)
+        await asyncio.to_thread(send_admin_message, error)
         await update.message.reply_text(
             "⚠️ Что-то пошло не так.\n\nПопробуй ещё раз или нажми /start"
         )
         return SELECT_ROLE
+
+
+@observe_handler("pick_suggestion")
+async def pick_suggestion(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Поиск по табельному из кнопки-подсказки."""
+    query = update.callback_query
+    user = query.from_user
+
+    # Номер из кнопки присылает клиент — проверяется как введённый вручную:
+    # тот же лимит, та же валидация, тот же журнал запросов (_lookup_and_reply)
+    if not check_rate_limit(user.id):
+        await query.answer("⏱ Слишком много запросов. Подожди немного.", show_alert=True)
+        return ENTER_ID
+
+    raw_id = decode_callback(query.data)[0]
+    ok, _ = validate_employee_id(raw_id)
+    if not ok:
+        await query.answer("❌ Ошибка: неверные данные кнопки", show_alert=True)
+        return ENTER_ID
+
+    await query.answer()
+    employee_id = normalize_id(raw_id)
+
+    # Убираем кнопки у сообщения «не найден», чтобы подсказку не нажимали повторно
+    await query.edit_message_reply_markup(reply_markup=None)
+    return await _lookup_and_reply(query.message, user, employee_id, context)
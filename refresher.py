@@ -0,0 +1,36 @@
+"""
+Отдельный процесс-обновитель общего снимка кэша — без бота.
+
+    CACHE_MODE=writer SNAPSHOT_DIR=/var/lib/wb-bot python refresher.py
+
+Обновляет кэш из Google Sheets по расписанию таблиц (utils/refresh_scheduler.py)
+и записывает каждый снимок в SNAPSHOT_DIR. Процессы бота на этой же машине запускаются с
+CACHE_MODE=reader и тем же SNAPSHOT_DIR: они подхватывают снимки через mmap
+и сами в Google не ходят.
+"""
+
+import logging
+import threading
+
+from config import CACHE_MODE, SNAPSHOT_DIR
+from utils.cache_manager import start_cache_refresh_loop
+from utils.admin_notifier import send_admin_message
+from utils import metrics
+from utils.log_setup import setup_logging
+
+# ================= LOGGING =================
+setup_logging()
+
+
+def main():
+    if CACHE_MODE != "writer":
+        raise SystemExit("refresher.py запускается с CACHE_MODE=writer")
+
+    metrics.start_metrics_server()
+    start_cache_refresh_loop(notify_callback=send_admin_message)
+    logging.info(f"💾 Обновитель запущен, снимки пишутся в {SNAPSHOT_DIR}")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
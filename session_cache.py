@@ -1,18 +1,39 @@
 """
-Кэш ролей пользователей на время сессии (живёт в памяти, сбрасывается при рестарте бота).
-При /start роль всегда сбрасывается — пользователь выбирает заново.
+Сессия пользователя поверх общего хранилища состояния (utils/user_state.py).
+
+Роль выбирается при /start и живёт до следующего /start или истечения TTL.
+Также запоминаются последний ПВЗ пользователя (из найденной карточки или /pvz) —
+по нему фильтруются подсказки похожих табельных — и последняя найденная
+карточка для кнопки «Поделиться карточкой».
 """
 
-_user_roles: dict[int, str] = {}
+from utils.user_state import get_field, set_field, pop_field
 
 
 def get_role(user_id: int) -> str | None:
-    return _user_roles.get(user_id)
+    return get_field(user_id, "role")
 
 
 def set_role(user_id: int, role: str) -> None:
-    _user_roles[user_id] = role
+    set_field(user_id, "role", role)
 
 
 def clear_role(user_id: int) -> None:
-    _user_roles.pop(user_id, None)
+    pop_field(user_id, "role")
+
+
+def get_last_pvz(user_id: int) -> str | None:
+    return get_field(user_id, "last_pvz")
+
+
+def set_last_pvz(user_id: int, pvz: str) -> None:
+    if pvz:
+        set_field(user_id, "last_pvz", pvz)
+
+
+def get_last_employee(user_id: int) -> dict | None:
+    return get_field(user_id, "last_employee")
+
+
+def set_last_employee(user_id: int, employee: dict) -> None:
+    set_field(user_id, "last_employee", employee)
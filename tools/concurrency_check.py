@@ -0,0 +1,266 @@
+"""
+Проверка параллельной обработки апдейтов: ничего не теряется и не перемешивается.
+
+Запуск из корня репозитория:
+    python -m tools.concurrency_check
+    python -m tools.concurrency_check --users 500 --concurrency 64
+    python -m tools.concurrency_check --plain      # без очереди на пользователя — должно упасть
+
+Каждый виртуальный пользователь присылает всю сессию разом, не дожидаясь
+ответов (как при быстром вводе или повторной доставке):
+    /start → роль → табельный №1 → «Новый поиск» → табельный №2
+Апдейты разных пользователей перемешиваются и одновременно кладутся в
+update_queue настоящего Application из bot.py (синтетический кэш, заглушка
+Bot API).
+
+Для каждого пользователя проверяется:
+    • ответы бота пришли в его чат в правильном порядке и ни один не потерян;
+    • обе карточки — именно тех сотрудников и той роли, что он запрашивал;
+    • в состоянии пользователя (session_cache) — его роль и его последняя карточка.
+
+Ошибки обработки (исключения в обработчиках, сеть до заглушки) печатаются
+отдельно и тоже валят проверку — расхождение не должно объясняться сбоем
+стенда. Отдельно проверяется, что всплеск апдейтов одного пользователя не
+занимает все слоты параллельности: апдейт другого пользователя, пришедший
+следом, обрабатывается сразу, а не после всего всплеска.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from tools.loadtest import UpdateFactory, _ENV_DEFAULTS, _NO_LIMITS
+
+# Ожидаемые ответы бота на шаги сессии: (метод Bot API, что должно быть в тексте)
+GREETING = "Привет"
+SEARCH_PROMPT = "Введи свой табельный номер"
+
+
+def build_sessions(snapshot: dict, users: int, seed: int) -> list:
+    """Сессии пользователей: user_id, роль и два разных найденных сотрудника."""
+    rng = random.Random(seed)
+    by_role: dict = {"admin": [], "mfu": []}
+    for emp in snapshot["employees"]:
+        by_role[emp["role"]].append(emp)
+
+    sessions = []
+    for i in range(users):
+        role = rng.choice([r for r in by_role if by_role[r]])
+        first, second = rng.sample(by_role[role], 2)
+        sessions.append({"user_id": 30_000 + i, "role": role, "employees": (first, second)})
+    return sessions
+
+
+def session_updates(session: dict, factory: UpdateFactory) -> list:
+    uid = session["user_id"]
+    first, second = session["employees"]
+    return [
+        factory.message(uid, "/start"),
+        factory.callback(uid, session["role"]),
+        factory.message(uid, first["employee_id"]),
+        factory.callback(uid, "new_search"),
+        factory.message(uid, second["employee_id"]),
+    ]
+
+
+def expected_replies(session: dict) -> list:
+    first, second = session["employees"]
+    return [
+        ("sendMessage", GREETING),
+        ("editMessageText", SEARCH_PROMPT),
+        ("sendMessage", first["fio"]),
+        ("editMessageText", SEARCH_PROMPT),
+        ("sendMessage", second["fio"]),
+    ]
+
+
+def interleave(per_user: list, rng: random.Random) -> list:
+    """Перемешивает апдейты разных пользователей, сохраняя порядок внутри каждого."""
+    queues = [list(updates) for updates in per_user]
+    merged = []
+    while queues:
+        i = rng.randrange(len(queues))
+        merged.append(queues[i].pop(0))
+        if not queues[i]:
+            queues.pop(i)
+    return merged
+
+
+def verify(sessions: list, sent: list) -> list:
+    """Сравнивает ответы бота с ожидаемыми; возвращает список ошибок."""
+    from session_cache import get_role, get_last_employee
+
+    replies: dict = {}
+    for method, params in sent:
+        if method not in ("sendMessage", "editMessageText"):
+            continue
+        try:
+            chat_id = int(params.get("chat_id"))
+        except (TypeError, ValueError):
+            continue
+        replies.setdefault(chat_id, []).append((method, params.get("text", "")))
+
+    problems = []
+    for session in sessions:
+        uid = session["user_id"]
+        got = replies.get(uid, [])
+        expected = expected_replies(session)
+        if len(got) != len(expected):
+            problems.append(f"{uid}: ответов {len(got)} вместо {len(expected)}")
+            continue
+        for step, ((method, text), (exp_method, marker)) in enumerate(zip(got, expected)):
+            if method != exp_method or marker not in text:
+                problems.append(f"{uid}: шаг {step + 1}: {method} «{text[:40]}» вместо {exp_method} «{marker}»")
+                break
+        else:
+            # Карточка админа — с лимитами, МФУ — без
+            has_limits = "Лимиты" in got[2][1]
+            if has_limits != (session["role"] == "admin"):
+                problems.append(f"{uid}: карточка не той роли")
+
+        last = get_last_employee(uid)
+        if get_role(uid) != session["role"]:
+            problems.append(f"{uid}: в состоянии роль {get_role(uid)!r} вместо {session['role']!r}")
+        if not last or last["employee_id"] != session["employees"][1]["employee_id"]:
+            problems.append(f"{uid}: в состоянии чужая или пустая карточка")
+    return problems
+
+
+async def run(args, sessions: list, fake) -> dict:
+    from telegram import Update
+    from telegram.ext import TypeHandler, SimpleUpdateProcessor
+    from bot import build_application
+    from tools.fake_telegram import BOT_USER
+
+    application = build_application(outbound_limit=False, concurrent_updates=args.concurrency)
+    if args.plain:
+        # Обычная параллельность PTB: без очереди на пользователя
+        application._update_processor = SimpleUpdateProcessor(args.concurrency)
+
+    factory = UpdateFactory(application.bot, BOT_USER)
+    updates = interleave([session_updates(s, factory) for s in sessions], random.Random(args.seed))
+    remaining = len(updates)
+    all_done = asyncio.Event()
+
+    async def _done(update, context):
+        nonlocal remaining
+        remaining -= 1
+        if not remaining:
+            all_done.set()
+
+    application.add_handler(TypeHandler(Update, _done), group=99)
+
+    errors: list = []
+
+    async def _on_error(update, context):
+        errors.append(f"{type(context.error).__name__}: {context.error}")
+
+    application.error_handlers.clear()
+    application.add_error_handler(_on_error)
+
+    async with application:
+        await application.start()
+        started = time.perf_counter()
+        for update in updates:
+            application.update_queue.put_nowait(update)
+        try:
+            await asyncio.wait_for(all_done.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+        await application.stop()
+
+    return {"updates": len(updates), "processed": len(updates) - remaining, "elapsed": elapsed, "errors": errors}
+
+
+# Всплеск: столько апдейтов одного пользователя на столько слотов, по HOL_WORK сек каждый
+HOL_BURST, HOL_SLOTS, HOL_WORK = 8, 4, 0.2
+
+
+async def check_head_of_line(factory) -> float:
+    """
+    Через сколько секунд обработан апдейт пользователя B, пришедший сразу
+    после всплеска апдейтов пользователя A (без ожидания слота — ~HOL_WORK).
+    """
+    from utils.update_processor import PerUserUpdateProcessor
+
+    processor = PerUserUpdateProcessor(HOL_SLOTS)
+    started = time.perf_counter()
+    finished = {}
+
+    async def _work(tag):
+        await asyncio.sleep(HOL_WORK)
+        finished[tag] = time.perf_counter() - started
+
+    tasks = [
+        asyncio.create_task(processor.process_update(factory.message(1, str(i)), _work(i)))
+        for i in range(HOL_BURST)
+    ]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(processor.process_update(factory.message(2, "b"), _work("b"))))
+    await asyncio.gather(*tasks)
+    return finished["b"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка параллельной обработки апдейтов")
+    parser.add_argument("--users", type=int, default=300, help="виртуальных пользователей")
+    parser.add_argument("--concurrency", type=int, default=32, help="апдейтов одновременно")
+    parser.add_argument("--employees", type=int, default=5000, help="размер синтетического кэша")
+    parser.add_argument("--api-latency-ms", type=float, default=5, help="задержка заглушки Bot API")
+    parser.add_argument("--plain", action="store_true", help="без порядка на пользователя (для сравнения)")
+    parser.add_argument("--timeout", type=float, default=120, help="сколько ждать обработки (сек)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from tools.fake_telegram import FakeTelegram
+    fake = FakeTelegram(latency=args.api_latency_ms / 1000).start()
+    fake.keep_sent = True
+
+    for key, value in _ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(_NO_LIMITS)
+    os.environ["TELEGRAM_API_BASE"] = fake.base
+
+    import logging
+    import warnings
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore", message=".*per_message.*")
+
+    from tools.synthetic import install_synthetic_cache
+    snapshot = install_synthetic_cache(args.employees)
+    sessions = build_sessions(snapshot, args.users, args.seed)
+
+    result = asyncio.run(run(args, sessions, fake))
+    fake.stop()
+
+    problems = verify(sessions, fake.sent)
+    problems += [f"ошибка обработки: {error}" for error in result["errors"]]
+
+    from telegram import Bot
+    from tools.fake_telegram import BOT_USER
+    hol = asyncio.run(check_head_of_line(UpdateFactory(Bot("1:HOL"), BOT_USER)))
+    if not args.plain and hol > 2 * HOL_WORK:
+        problems.append(
+            f"апдейт другого пользователя ждал всплеска: {hol:.2f} сек вместо ~{HOL_WORK} "
+            f"({HOL_BURST} апдейтов одного пользователя на {HOL_SLOTS} слота)"
+        )
+    print(f"Апдейтов: {result['updates']} | обработано: {result['processed']} "
+          f"за {result['elapsed']:.2f} сек | параллельно до {args.concurrency}"
+          f"{' (без порядка на пользователя)' if args.plain else ''}")
+    print(f"Чужой апдейт после всплеска {HOL_BURST} апдейтов одного пользователя: {hol:.2f} сек")
+    for problem in problems[:20]:
+        print(f"  ✗ {problem}")
+    if len(problems) > 20:
+        print(f"  … и ещё {len(problems) - 20}")
+
+    ok = result["processed"] == result["updates"] and not problems
+    print("OK" if ok else f"FAIL: {len(problems)} расхождений")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
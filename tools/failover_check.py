@@ -0,0 +1,165 @@
+"""
+Проверка выбора обновителя кэша (CACHE_MODE=auto) и его подмены.
+
+Запуск из корня репозитория:
+    python -m tools.failover_check
+    python -m tools.failover_check --workers 5 --poll 0.5
+
+Поднимает заглушки Sheets и Bot API и несколько процессов в режиме auto
+с общим SNAPSHOT_DIR. Проверяется:
+    • в Google ходит только один процесс — число запросов к Sheets равно
+      одному обновлению, сколько бы процессов ни было;
+    • все последователи подхватывают снимок лидера;
+    • после SIGKILL лидера другой процесс становится лидером за время
+      порядка интервала опроса, и это не вызывает внеочередного обновления
+      (снимок ещё свежий).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from tools.loadtest import _ENV_DEFAULTS
+
+
+def child():
+    """Процесс бота без Telegram: только цикл кэша; печатает смену версии снимка."""
+    import logging
+    logging.disable(logging.CRITICAL)
+    from utils import cache_manager
+
+    cache_manager.start_cache_refresh_loop()
+    version = 0
+    while True:
+        current = cache_manager.get_snapshot_version()
+        if current != version:
+            version = current
+            print(json.dumps({"version": version}), flush=True)
+        time.sleep(0.05)
+
+
+def _wait(predicate, timeout: float, step: float = 0.02):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(step)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка выбора и подмены обновителя кэша")
+    parser.add_argument("--workers", type=int, default=3, help="процессов в режиме auto")
+    parser.add_argument("--poll", type=float, default=0.5, help="SNAPSHOT_POLL_SECONDS")
+    parser.add_argument("--sheets", type=int, default=5, help="таблиц в реестре заглушки")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child()
+        return 0
+
+    for key, value in _ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+
+    from tools.fake_sheets import FakeSheets, REGISTRY_ID
+    from tools.fake_telegram import FakeTelegram
+    from utils import leader
+
+    sheets = FakeSheets(sheets=args.sheets, rows=40).start()
+    telegram = FakeTelegram().start()
+    snapshot_dir = tempfile.mkdtemp(prefix="failover-")
+    env = {
+        **os.environ, **_ENV_DEFAULTS,
+        "REGISTRY_SPREADSHEET_ID": REGISTRY_ID,
+        "SHEETS_API_BASE": sheets.base,
+        "TELEGRAM_API_BASE": telegram.base,
+        "CACHE_MODE": "auto",
+        "SNAPSHOT_DIR": snapshot_dir,
+        "SNAPSHOT_POLL_SECONDS": str(args.poll),
+        "CACHE_TTL_MINUTES": "60",
+    }
+
+    procs = {}
+    versions = {}
+
+    def _read(name, proc):
+        for line in proc.stdout:
+            versions[name] = json.loads(line)["version"]
+
+    for i in range(args.workers):
+        name = f"worker-{i}"
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "tools.failover_check", "--child"],
+            stdout=subprocess.PIPE, text=True, env={**env, "INSTANCE_NAME": name},
+        )
+        procs[name] = proc
+        threading.Thread(target=_read, args=(name, proc), daemon=True).start()
+
+    def _published():
+        info = leader.read_info(snapshot_dir)
+        return info if info.get("published_at") else None
+
+    def _new_leader():
+        info = leader.read_info(snapshot_dir)
+        return info if info.get("instance") != first else None
+
+    problems = []
+    try:
+        info = _wait(_published, 60)
+        if not info:
+            print("FAIL: лидер не опубликовал снимок за 60 сек")
+            return 1
+        first = info["instance"]
+        version = info["version"]
+        # Запросов на одно обновление: реестр и по два листа на таблицу
+        per_refresh = sheets.requests
+        print(f"Лидер: {first}, снимок v{version}, запросов к Sheets: {per_refresh}")
+
+        if not _wait(lambda: len(versions) == args.workers and set(versions.values()) == {version}, 10 * args.poll + 5):
+            problems.append(f"не все процессы подхватили v{version}: {versions}")
+        time.sleep(3 * args.poll)
+        if sheets.requests != per_refresh:
+            problems.append(f"в Sheets ходил не только лидер: {sheets.requests} запросов вместо {per_refresh}")
+
+        killed = time.perf_counter()
+        procs[first].send_signal(signal.SIGKILL)
+        procs[first].wait()
+        info = _wait(_new_leader, 30)
+        if not info:
+            problems.append("после гибели лидера новый не выбран за 30 сек")
+        else:
+            takeover = time.perf_counter() - killed
+            print(f"Новый лидер: {info['instance']} через {takeover:.2f} сек (опрос {args.poll} сек)")
+            if takeover > 2 * args.poll + 1:
+                problems.append(f"подмена лидера заняла {takeover:.2f} сек")
+            time.sleep(3 * args.poll)
+            if sheets.requests != per_refresh:
+                problems.append("новый лидер обновил кэш внеочередно, хотя снимок свежий")
+            if leader.read_info(snapshot_dir).get("version") != version:
+                problems.append("новый лидер не принял версию прежнего")
+    finally:
+        for proc in procs.values():
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        sheets.stop()
+        telegram.stop()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    for problem in problems:
+        print(f"  ✗ {problem}")
+    print("OK" if not problems else "FAIL")
+    return 0 if not problems else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
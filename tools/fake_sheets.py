@@ -0,0 +1,211 @@
+"""
+Локальная заглушка Google Sheets API (values.get) для проверки обновления кэша.
+
+Отдаёт реестр (A2:A или A2:C) и листы «Администраторы»/«МФУ» из синтетических
+данных (tools/synthetic.py) и умеет имитировать проблемы живого API:
+задержку, 429, 5xx, зависание дольше таймаута клиента, пустые листы и
+большие листы. Диапазон A2:Z1000 соблюдается, как в Google: строки после
+1000-й не отдаются.
+
+Бот направляется сюда через SHEETS_API_BASE=http://127.0.0.1:<порт>/v4.
+
+Запуск отдельно (для ручной проверки бота):
+    python -m tools.fake_sheets --sheets 100 --rows 80 --port 8081
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+from tools.synthetic import generate_values
+
+REGISTRY_ID = "fake-registry"
+SHEET_ROLES = {"Администраторы": "admin", "МФУ": "mfu"}
+
+_PATH_RE = re.compile(r"^/v4/spreadsheets/([^/]+)/values/(.+)$")
+_RANGE_RE = re.compile(r"^(?:(.+)!)?[A-Z]+(\d+):[A-Z]+(\d+)?$")
+
+
+class FakeSheets:
+    """
+    Сервер-заглушка Sheets API в фоновом потоке.
+
+    Args:
+        sheets: число таблиц в реестре
+        rows: сотрудников на таблицу (делятся между листами админов и МФУ)
+        latency: базовая задержка ответа (сек)
+        jitter: случайная добавка к задержке, 0..jitter (сек)
+        error_429: доля ответов 429 Too Many Requests
+        error_5xx: доля ответов 500/503
+        timeout_rate: доля запросов, которые «зависают» на hang секунд
+        hang: сколько висит «зависший» запрос (сек)
+        empty_rate: доля таблиц с пустыми листами (только заголовок)
+        seed: зерно для данных и для выбора сбоев
+    """
+
+    def __init__(self, sheets: int = 10, rows: int = 100, latency: float = 0.0, jitter: float = 0.0,
+                 error_429: float = 0.0, error_5xx: float = 0.0, timeout_rate: float = 0.0,
+                 hang: float = 30.0, empty_rate: float = 0.0, seed: int = 42, port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+
+        self.requests = 0
+        self.bytes_sent = 0
+        self.statuses: Counter = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+        self.values = generate_values(sheets * rows, sheets, seed)
+        self.sheet_ids = sorted(self.values["admin"])
+        # Колонки B и C реестра (свои интервалы обновления таблицы, мин.): {sid: ["5", "30"]}
+        self.registry_columns: dict = {}
+        empty = set(random.Random(seed + 1).sample(self.sheet_ids, int(len(self.sheet_ids) * empty_rate)))
+        for role in ("admin", "mfu"):
+            for sid in empty:
+                self.values[role][sid] = self.values[role][sid][:1]
+
+        fake = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v4"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.statuses.clear()
+
+    # ---------------- обработка ----------------
+
+    def _values(self, spreadsheet_id: str, cell_range: str):
+        match = _RANGE_RE.match(cell_range)
+        if not match:
+            return None
+        sheet, first, last = match.group(1), int(match.group(2)), match.group(3)
+
+        if spreadsheet_id == REGISTRY_ID and sheet is None:
+            # Строка 1 — заголовок
+            rows = [[""]] + [[sid, *self.registry_columns.get(sid, [])] for sid in self.sheet_ids]
+        elif spreadsheet_id == REGISTRY_ID:
+            rows = [[""]]                                          # лист алиасов ПВЗ пустой
+        elif sheet in SHEET_ROLES and spreadsheet_id in self.values["admin"]:
+            # Строка 1 листа — служебная, строка 2 — заголовки колонок
+            rows = [[""]] + self.values[SHEET_ROLES[sheet]][spreadsheet_id]
+        else:
+            return None
+
+        end = int(last) if last else len(rows)
+        return rows[first - 1:end]
+
+    def _fault(self):
+        with self._lock:
+            roll = self._rng.random()
+            delay = self.latency + (self._rng.random() * self.jitter if self.jitter else 0)
+        if roll < self.timeout_rate:
+            return "hang", delay
+        roll -= self.timeout_rate
+        if roll < self.error_429:
+            return 429, delay
+        roll -= self.error_429
+        if roll < self.error_5xx:
+            return 503, delay
+        return None, delay
+
+    def _send(self, handler, status: int, body: dict):
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += len(payload)
+            self.statuses[status] += 1
+        try:
+            handler.send_response(status)
+            handler.send_header("Content-Type", "application/json; charset=utf-8")
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # клиент ушёл по таймауту
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        match = _PATH_RE.match(url.path)
+        fault, delay = self._fault()
+        if delay:
+            time.sleep(delay)
+
+        if fault == "hang":
+            time.sleep(self.hang)
+            self._send(handler, 504, {"error": {"code": 504, "message": "Deadline exceeded"}})
+            return
+        if fault:
+            self._send(handler, fault, {"error": {"code": fault, "message": "Simulated failure"}})
+            return
+
+        values = self._values(unquote(match.group(1)), unquote(match.group(2))) if match else None
+        if values is None:
+            self._send(handler, 400, {"error": {"code": 400, "message": "Unable to parse range"}})
+            return
+
+        body = {"range": unquote(match.group(2)), "majorDimension": "ROWS"}
+        if values:
+            body["values"] = values
+        self._send(handler, 200, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка Google Sheets API")
+    parser.add_argument("--sheets", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-429", type=float, default=0)
+    parser.add_argument("--error-5xx", type=float, default=0)
+    parser.add_argument("--timeout-rate", type=float, default=0)
+    parser.add_argument("--empty-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    fake = FakeSheets(
+        sheets=args.sheets, rows=args.rows, latency=args.latency_ms / 1000,
+        error_429=args.error_429, error_5xx=args.error_5xx,
+        timeout_rate=args.timeout_rate, empty_rate=args.empty_rate, port=args.port,
+    )
+    print(f"SHEETS_API_BASE={fake.base}")
+    print(f"REGISTRY_SPREADSHEET_ID={REGISTRY_ID}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
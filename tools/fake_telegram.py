@@ -0,0 +1,147 @@
+"""
+Локальная заглушка Telegram Bot API для нагрузочных тестов.
+
+Отвечает на любые методы правдоподобными ответами (getMe — бот,
+send*/edit* — сообщение, остальное — true), считает вызовы по методам и
+может добавлять задержку, чтобы имитировать сеть до api.telegram.org.
+
+Бот направляется сюда через TELEGRAM_API_BASE=http://127.0.0.1:<порт>.
+"""
+
+import itertools
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {
+    "id": 100000001,
+    "is_bot": True,
+    "first_name": "LoadTest",
+    "username": "loadtest_bot",
+    "can_join_groups": False,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": True,
+}
+
+_URL_RE = re.compile(r"^/(?:file/)?bot[^/]+/(\w+)")
+_MULTIPART_FIELD_RE = re.compile(rb'name="(\w+)"\r\n\r\n([^\r]*)\r\n')
+
+
+class _Server(ThreadingHTTPServer):
+    """
+    Очередь на приём — с запасом: по умолчанию она 5 соединений, и всплески
+    от нагрузочных проверок получали отказ или сброс (httpx.ReadError) —
+    мерился бы listen backlog заглушки, а не бот.
+    """
+    daemon_threads = True
+    request_queue_size = 512
+
+
+class FakeTelegram:
+    """
+    Сервер-заглушка Bot API в фоновом потоке.
+
+    Args:
+        latency: задержка ответа на каждый запрос (сек)
+        port: порт (0 — любой свободный)
+    """
+
+    def __init__(self, latency: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.sent: list = []            # (метод, параметры) для send*/edit*
+        self.keep_sent = False
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                fake._handle(self)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._thread = None
+
+    @property
+    def base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ---------------- обработка ----------------
+
+    @staticmethod
+    def _params(handler) -> dict:
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        ctype = handler.headers.get("Content-Type", "")
+        if ctype.startswith("application/json"):
+            return json.loads(body or b"{}")
+        if ctype.startswith("multipart/form-data"):
+            return {k.decode(): v.decode(errors="replace") for k, v in _MULTIPART_FIELD_RE.findall(body)}
+        return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+
+    def _message(self, params: dict) -> dict:
+        chat_id = params.get("chat_id") or 1
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            chat_id = 1
+        message = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        return message
+
+    def _result(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            return []
+        if method.startswith("send") or method in ("editMessageText", "editMessageCaption"):
+            return self._message(params)
+        if method == "editMessageReplyMarkup":
+            return self._message(params) if params.get("chat_id") else True
+        return True
+
+    def _handle(self, handler):
+        match = _URL_RE.match(handler.path)
+        method = match.group(1) if match else "unknown"
+        params = self._params(handler)
+
+        with self._lock:
+            self.calls[method] += 1
+            if self.keep_sent and (method.startswith("send") or method.startswith("edit")):
+                self.sent.append((method, params))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        payload = json.dumps({"ok": True, "result": self._result(method, params)}).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
@@ -0,0 +1,414 @@
+"""
+Нагрузочный тест бота целиком: настоящий Application из bot.py,
+синтетический кэш и заглушка Bot API.
+
+Запуск из корня репозитория:
+    python -m tools.loadtest --employees 20000 --rate 20 --duration 30
+    python -m tools.loadtest --replay scenario.jsonl
+    python -m tools.loadtest --rate 50 --record scenario.jsonl
+
+Виртуальные пользователи проходят сценарии, как живые:
+    lookup   /start → роль → табельный
+    card     то же + «Поделиться карточкой»
+    pvz      /pvz → ПВЗ → следующая страница
+    asearch  /asearch → имя (от имени админа)
+
+Апдейты кладутся в update_queue приложения, как при polling, поэтому
+задержка включает ожидание в очереди. Отчёт: p50/p95/p99 по шагам
+(обработчикам), задержка event loop и вызовы Bot API по методам.
+
+Формат сценария (JSONL), по строке на сессию:
+    {"t": 0.35, "user_id": 5001, "scenario": "lookup", "role": "mfu", "query": "123456"}
+Подходят и записи лога запросов (user_id, employee_id, role) — они
+проигрываются как lookup с темпом --rate.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+# Нагрузочный тест не ходит в Google и Telegram: подставляем значения
+# до импорта config. Лимиты по умолчанию снимаем — иначе меряем rate limiter.
+_ENV_DEFAULTS = {
+    "TELEGRAM_BOT_TOKEN": "100000001:LOADTEST",
+    "GOOGLE_API_KEY": "loadtest",
+    "REGISTRY_SPREADSHEET_ID": "loadtest",
+    "ADMIN_BOT_ID": "1",
+}
+_NO_LIMITS = {
+    "RATE_LIMIT_MAX": "1000000",
+    "CARD_RATE_LIMIT_MAX": "1000000",
+    "PVZ_RATE_LIMIT_MAX": "1000000",
+    "INLINE_RATE_LIMIT_MAX": "1000000",
+    "SUSPICIOUS_DIFF_IDS": "1000000",
+    "SUSPICIOUS_BURST": "1000000",
+}
+
+SCENARIOS = ("lookup", "card", "pvz", "asearch")
+DEFAULT_MIX = "lookup=70,card=5,pvz=15,asearch=10"
+
+# Доля поисков несуществующего табельного
+MISS_SHARE = 0.1
+
+
+# ================= SCENARIO =================
+
+def _parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Неизвестный сценарий: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def generate_sessions(snapshot: dict, rate: float, duration: float, mix: dict,
+                      admin_id: int, seed: int = 1) -> list:
+    """Сессии с пуассоновскими интервалами прихода и заданной долей сценариев."""
+    rng = random.Random(seed)
+    employees = snapshot["employees"]
+    pvz_keys = snapshot["pvz_keys"] or ["ТАШ-1"]
+    names, weights = list(mix), list(mix.values())
+
+    sessions = []
+    t = 0.0
+    user_id = 10_000
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration:
+            break
+        user_id += 1
+        scenario = rng.choices(names, weights)[0]
+        session = {"t": round(t, 4), "user_id": user_id, "scenario": scenario}
+
+        if scenario in ("lookup", "card"):
+            if employees and rng.random() > MISS_SHARE:
+                emp = rng.choice(employees)
+                session.update(role=emp["role"], query=emp["employee_id"])
+            else:
+                session.update(role=rng.choice(("admin", "mfu")), query=str(rng.randint(100, 999_999)))
+        elif scenario == "pvz":
+            session["query"] = rng.choice(pvz_keys)
+        else:
+            session["user_id"] = admin_id
+            fio = rng.choice(employees)["fio"] if employees else "Саид"
+            session["query"] = rng.choice(fio.split())[:rng.randint(3, 8)]
+        sessions.append(session)
+    return sessions
+
+
+def load_sessions(path: str, rate: float) -> list:
+    """Читает сценарий; строки лога запросов превращает в lookup."""
+    sessions = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "scenario" not in entry:
+                entry = {
+                    "user_id": int(entry["user_id"]),
+                    "scenario": "lookup",
+                    "role": entry.get("role", "mfu"),
+                    "query": str(entry["employee_id"]),
+                }
+            entry.setdefault("t", i / rate)
+            sessions.append(entry)
+    sessions.sort(key=lambda s: s["t"])
+    return sessions
+
+
+# ================= UPDATES =================
+
+class UpdateFactory:
+    """Собирает апдейты Telegram в том виде, в каком их присылает getUpdates."""
+
+    def __init__(self, bot, bot_user: dict):
+        self.bot = bot
+        self.bot_user = bot_user
+        self._update_id = 0
+        self._message_id = 0
+
+    def _ids(self):
+        self._update_id += 1
+        self._message_id += 1
+        return self._update_id, self._message_id
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    def message(self, user_id: int, text: str):
+        from telegram import Update
+        update_id, message_id = self._ids()
+        data = {
+            "update_id": update_id,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": text,
+            },
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            data["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return Update.de_json(data, self.bot)
+
+    def callback(self, user_id: int, data: str):
+        from telegram import Update
+        update_id, message_id = self._ids()
+        return Update.de_json({
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "chat_instance": str(user_id),
+                "from": self._user(user_id),
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": self.bot_user,
+                    "text": "…",
+                },
+            },
+        }, self.bot)
+
+
+def session_steps(session: dict, factory: UpdateFactory, snapshot_version: int) -> list:
+    """Шаги сессии: (имя обработчика, апдейт) в порядке отправки."""
+    from utils.pagination import encode_callback, PAGE_SIZE
+    from handlers import pvz_search
+
+    uid, query = session["user_id"], session.get("query", "")
+    scenario = session["scenario"]
+
+    if scenario in ("lookup", "card"):
+        steps = [
+            ("start", factory.message(uid, "/start")),
+            ("select_role", factory.callback(uid, session.get("role", "mfu"))),
+            ("enter_id", factory.message(uid, query)),
+        ]
+        if scenario == "card":
+            steps.append(("share_card", factory.callback(uid, "share_card")))
+        return steps
+
+    if scenario == "pvz":
+        return [
+            ("cmd_pvz", factory.message(uid, "/pvz")),
+            ("enter_pvz", factory.message(uid, query)),
+            ("pvz_page", factory.callback(
+                uid, encode_callback(pvz_search.PAGE_PREFIX, snapshot_version, PAGE_SIZE, query),
+            )),
+        ]
+
+    return [
+        ("cmd_asearch", factory.message(uid, "/asearch")),
+        ("enter_name", factory.message(uid, query)),
+    ]
+
+
+# ================= RUN =================
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+async def _loop_lag_probe(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    """Насколько позже запланированного просыпается корутина — задержка event loop."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run(args, sessions: list, snapshot: dict, fake) -> dict:
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    from bot import build_application
+    from tools.fake_telegram import BOT_USER
+
+    application = build_application(outbound_limit=args.outbound_limit, concurrent_updates=args.concurrency)
+
+    pending: dict = {}
+
+    async def _done(update, context):
+        waiter = pending.pop(update.update_id, None)
+        if waiter and not waiter.done():
+            waiter.set_result(time.perf_counter())
+
+    # Последняя группа: срабатывает после того, как обработчики бота закончили
+    application.add_handler(TypeHandler(Update, _done), group=99)
+
+    factory = UpdateFactory(application.bot, BOT_USER)
+    latencies: dict = defaultdict(list)
+    timeouts: dict = defaultdict(int)
+    user_locks: dict = defaultdict(asyncio.Lock)
+
+    async def _session(session: dict):
+        # Сессии одного пользователя (админ в /asearch) не перемешиваются
+        async with user_locks[session["user_id"]]:
+            for step, update in session_steps(session, factory, snapshot["version"]):
+                waiter = asyncio.get_running_loop().create_future()
+                pending[update.update_id] = waiter
+                sent = time.perf_counter()
+                await application.update_queue.put(update)
+                try:
+                    finished = await asyncio.wait_for(waiter, args.step_timeout)
+                except asyncio.TimeoutError:
+                    pending.pop(update.update_id, None)
+                    timeouts[step] += 1
+                    return
+                latencies[step].append(finished - sent)
+
+    lag: list = []
+    stop = asyncio.Event()
+
+    async with application:
+        await application.start()
+        probe = asyncio.create_task(_loop_lag_probe(lag, stop))
+
+        started = time.perf_counter()
+        tasks = []
+        for session in sessions:
+            delay = session["t"] - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(_session(session)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await probe
+        await application.stop()
+
+    return {
+        "elapsed": elapsed,
+        "sessions": len(sessions),
+        "latencies": latencies,
+        "timeouts": dict(timeouts),
+        "loop_lag": lag,
+        "api_calls": dict(fake.calls),
+    }
+
+
+def report(result: dict, args) -> dict:
+    steps = {}
+    total_updates = 0
+    for step, values in sorted(result["latencies"].items()):
+        values.sort()
+        total_updates += len(values)
+        steps[step] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": values[-1] * 1000,
+            "timeouts": result["timeouts"].get(step, 0),
+        }
+    lag = sorted(result["loop_lag"])
+    return {
+        "employees": args.employees,
+        "target_rate": args.rate,
+        "sessions": result["sessions"],
+        "elapsed_s": result["elapsed"],
+        "updates_per_s": total_updates / result["elapsed"] if result["elapsed"] else 0,
+        "steps": steps,
+        "loop_lag_ms": {
+            "p50": percentile(lag, 0.50) * 1000,
+            "p99": percentile(lag, 0.99) * 1000,
+            "max": (lag[-1] if lag else 0) * 1000,
+        },
+        "api_calls": result["api_calls"],
+    }
+
+
+def print_report(summary: dict):
+    print()
+    print(f"Сессий: {summary['sessions']} за {summary['elapsed_s']:.1f} сек "
+          f"(цель {summary['target_rate']}/сек), апдейтов/сек: {summary['updates_per_s']:.1f}")
+    print()
+    print(f"{'шаг':<14}{'n':>7}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}{'max мс':>10}{'таймаут':>9}")
+    for step, s in summary["steps"].items():
+        print(f"{step:<14}{s['count']:>7}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+              f"{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}{s['timeouts']:>9}")
+    lag = summary["loop_lag_ms"]
+    print()
+    print(f"Задержка event loop: p50 {lag['p50']:.1f} мс | p99 {lag['p99']:.1f} мс | max {lag['max']:.1f} мс")
+    print("Вызовы Bot API: " + ", ".join(f"{k}={v}" for k, v in sorted(summary["api_calls"].items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест обработчиков бота")
+    parser.add_argument("--employees", type=int, default=10_000, help="размер синтетического кэша")
+    parser.add_argument("--sheets", type=int, default=50, help="число таблиц в синтетическом реестре")
+    parser.add_argument("--rate", type=float, default=10, help="новых сессий в секунду")
+    parser.add_argument("--duration", type=float, default=30, help="длительность генерации сессий (сек)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"доли сценариев (по умолчанию {DEFAULT_MIX})")
+    parser.add_argument("--api-latency-ms", type=float, default=0, help="задержка заглушки Bot API")
+    parser.add_argument("--concurrency", type=int, default=None, help="апдейтов одновременно (CONCURRENT_UPDATES)")
+    parser.add_argument("--outbound-limit", action="store_true", help="включить OutboundRateLimiter")
+    parser.add_argument("--keep-limits", action="store_true", help="не снимать пользовательские rate limit")
+    parser.add_argument("--step-timeout", type=float, default=60, help="таймаут одного шага (сек)")
+    parser.add_argument("--replay", help="проиграть сценарий из JSONL")
+    parser.add_argument("--record", help="сохранить сгенерированный сценарий в JSONL")
+    parser.add_argument("--json", help="сохранить отчёт в JSON")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from tools.fake_telegram import FakeTelegram
+    fake = FakeTelegram(latency=args.api_latency_ms / 1000).start()
+
+    for key, value in _ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    if not args.keep_limits:
+        os.environ.update(_NO_LIMITS)
+    os.environ["TELEGRAM_API_BASE"] = fake.base
+
+    import logging
+    import warnings
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore", message=".*per_message.*")
+
+    from tools.synthetic import install_synthetic_cache
+    from config import ADMIN_ID
+
+    t0 = time.perf_counter()
+    snapshot = install_synthetic_cache(args.employees, args.sheets)
+    print(f"Синтетический кэш: {len(snapshot['employees'])} сотрудников за {time.perf_counter() - t0:.1f} сек")
+
+    if args.replay:
+        sessions = load_sessions(args.replay, args.rate)
+    else:
+        sessions = generate_sessions(snapshot, args.rate, args.duration, _parse_mix(args.mix),
+                                     int(ADMIN_ID), args.seed)
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as f:
+            for session in sessions:
+                f.write(json.dumps(session, ensure_ascii=False) + "\n")
+
+    result = asyncio.run(run(args, sessions, snapshot, fake))
+    fake.stop()
+
+    summary = report(result, args)
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 0 if not result["timeouts"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Проверка расписания обновления кэша на неизменных таблицах.
+
+Запуск из корня репозитория:
+    python -m tools.refresh_check
+    python -m tools.refresh_check --hours 24 --sheets 20
+
+Цикл обновления (refresh_cache(only_due=True) раз в REFRESH_TICK_SECONDS)
+прогоняется против заглушки Sheets в виртуальном времени. Таблицы не
+меняются, поэтому их интервалы растут до REFRESH_MAX_SECONDS — намного
+больше CACHE_TTL. Проверяется:
+    • снимок всё равно публикуется не реже раза в CACHE_TTL: его возраст
+      не превышает CACHE_TTL + REFRESH_TICK_SECONDS, /healthz всё время 200;
+    • таблицы при этом читаются реже, чем при обновлении всех раз в CACHE_TTL.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from tools.loadtest import _ENV_DEFAULTS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка свежести снимка при неизменных таблицах")
+    parser.add_argument("--hours", type=float, default=12, help="виртуальных часов работы")
+    parser.add_argument("--sheets", type=int, default=10, help="таблиц в реестре заглушки")
+    args = parser.parse_args(argv)
+
+    for key, value in _ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+
+    from tools.fake_sheets import FakeSheets, REGISTRY_ID
+    from tools.fake_telegram import FakeTelegram
+
+    sheets = FakeSheets(sheets=args.sheets, rows=20).start()
+    telegram = FakeTelegram().start()
+    os.environ["REGISTRY_SPREADSHEET_ID"] = REGISTRY_ID
+    os.environ["SHEETS_API_BASE"] = sheets.base
+    os.environ["TELEGRAM_API_BASE"] = telegram.base
+    os.environ["CACHE_MODE"] = "local"
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    # Виртуальные часы: расписание, возраст снимка и /healthz смотрят на time.time()
+    clock = [1_700_000_000.0]
+    real_time = time.time
+    time.time = lambda: clock[0]
+    try:
+        from config import CACHE_TTL_SECONDS, REFRESH_TICK_SECONDS, HEALTHZ_MAX_AGE_SECONDS
+        from utils import cache_manager, metrics
+
+        limit = CACHE_TTL_SECONDS + REFRESH_TICK_SECONDS
+        ticks = int(args.hours * 3600 / REFRESH_TICK_SECONDS)
+        max_age = 0.0
+        unhealthy = 0
+        for _ in range(ticks):
+            cache_manager.refresh_cache(only_due=True)
+            clock[0] += REFRESH_TICK_SECONDS
+            max_age = max(max_age, metrics.snapshot_age())
+            status, _ = metrics.healthz()
+            unhealthy += status != 200
+        versions = cache_manager.get_snapshot_version()
+    finally:
+        time.time = real_time
+        sheets.stop()
+        telegram.stop()
+
+    # Чтения таблиц, если бы все читались раз в CACHE_TTL (по 2 листа на таблицу)
+    baseline = int(args.hours * 3600 / CACHE_TTL_SECONDS) * args.sheets * 2
+    print(f"Виртуально {args.hours:g} ч, таблиц {args.sheets} | CACHE_TTL {CACHE_TTL_SECONDS} с, "
+          f"/healthz до {HEALTHZ_MAX_AGE_SECONDS} с")
+    print(f"Снимков опубликовано: {versions} | макс. возраст снимка {max_age:.0f} с (порог {limit:.0f} с) "
+          f"| /healthz не 200: {unhealthy}")
+    print(f"Запросов к Sheets: {sheets.requests} (раз в CACHE_TTL было бы ~{baseline})")
+
+    ok = max_age <= limit and not unhealthy and sheets.requests < baseline
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Синтетические данные сотрудников для нагрузочных тестов и бенчмарков.
+
+Строки имеют те же заголовки, что и листы «Администраторы»/«МФУ» в Google
+Sheets, поэтому проходят через тот же разбор, что и живые данные.
+Генерация детерминирована (seed), чтобы прогоны можно было сравнивать.
+"""
+
+import random
+
+HEADERS = [
+    "Табельный номер",
+    "ФИО",
+    "ПВЗ",
+    "Факт",
+    "Открыто Лимитов",
+    "План по лимитам",
+    "Выполнение плана по лимитам",
+    " 📱Оформленно виртуальных карт",
+    "💷Оформленно пластиковых карт",
+    "ВЧЛ",
+]
+
+FIRST_NAMES = [
+    "Саид", "Акбар", "Рустам", "Дилшод", "Шахзод", "Жасур", "Азиз", "Бекзод",
+    "Нодира", "Гульнора", "Малика", "Севара", "Дильноза", "Зарина", "Камола",
+    "SAID", "AKBAR", "RUSTAM", "DILSHOD", "SHAHZOD", "JASUR", "NODIRA", "MALIKA",
+]
+LAST_NAMES = [
+    "Каримов", "Рахимов", "Юсупов", "Алиев", "Усманов", "Назаров", "Турсунов",
+    "Ахмедова", "Исмоилова", "Хасанова", "Садыкова", "Мирзаева",
+    "KARIMOV", "RAHIMOV", "YUSUPOV", "ALIEV", "USMANOV", "NAZAROV", "AHMEDOVA",
+]
+PATRONYMICS = ["Рустамович", "Акбарович", "Саидович", "Рустамовна", "Акбаровна", "", ""]
+
+# Как ПВЗ пишут в таблицах: разный регистр, язык и разделители
+PVZ_SPELLINGS = {
+    "ТАШ": ("Таш-{n}", "ТАШ {n}", "tash-{n}", "Ташкент-{n}"),
+    "САМ": ("Сам-{n}", "samarkand {n}", "САМ-{n}"),
+    "БУХ": ("Бух-{n}", "Bukhara-{n}"),
+    "АНД": ("Андижан {n}", "and-{n}"),
+    "НАМ": ("Нам-{n}", "namangan-{n}"),
+    "ФЕР": ("Фер-{n}", "fergana {n}"),
+    "ХИВ": ("Хива-{n}", "xiva-{n}"),
+    "НУК": ("Нукус-{n}", "nukus {n}"),
+}
+
+# Доля администраторов среди сотрудников
+ADMIN_SHARE = 0.2
+# Сотрудников на один ПВЗ (в среднем)
+EMPLOYEES_PER_PVZ = 8
+
+
+def _employee_row(rng: random.Random, employee_id: int, pvz: str) -> list:
+    fio = " ".join(p for p in (
+        rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES), rng.choice(PATRONYMICS),
+    ) if p)
+    plan = rng.randint(10, 200)
+    opened = rng.randint(0, plan)
+    return [
+        str(employee_id),
+        fio,
+        pvz,
+        str(rng.randint(0, 220)),
+        str(opened),
+        str(plan),
+        f"{opened * 100 // plan}%",
+        str(rng.randint(0, 300)),
+        str(rng.randint(0, 150)),
+        str(rng.randint(0, 40)),
+    ]
+
+
+def generate_values(employees: int, sheets: int = 1, seed: int = 42) -> dict:
+    """
+    Генерирует содержимое листов так, как его отдаёт Sheets API (values).
+
+    Returns:
+        {"admin": {spreadsheet_id: [HEADERS, row, ...]}, "mfu": {...}}
+    """
+    rng = random.Random(seed)
+    sheet_ids = [f"synthetic-{i:04d}" for i in range(max(1, sheets))]
+    values = {role: {sid: [list(HEADERS)] for sid in sheet_ids} for role in ("admin", "mfu")}
+
+    cities = list(PVZ_SPELLINGS)
+    pvz_count = max(1, employees // EMPLOYEES_PER_PVZ)
+    employee_ids = rng.sample(range(100, 1_000_000), employees)
+
+    for i, employee_id in enumerate(employee_ids):
+        city = cities[i % len(cities)]
+        number = rng.randint(1, max(1, pvz_count // len(cities)))
+        pvz = rng.choice(PVZ_SPELLINGS[city]).format(n=number)
+        role = "admin" if rng.random() < ADMIN_SHARE else "mfu"
+        sheet = sheet_ids[i % len(sheet_ids)]
+        values[role][sheet].append(_employee_row(rng, employee_id, pvz))
+
+    return values
+
+
+def generate_raw_cache(employees: int, sheets: int = 1, seed: int = 42) -> dict:
+    """
+    Генерирует сырой кэш в формате, который строит refresh_cache.
+
+    Returns:
+        {"admin": {spreadsheet_id: [record, ...]}, "mfu": {...}}
+    """
+    values = generate_values(employees, sheets, seed)
+    return {
+        role: {
+            sid: [dict(zip(rows[0], row)) for row in rows[1:]]
+            for sid, rows in sheets_values.items()
+        }
+        for role, sheets_values in values.items()
+    }
+
+
+def install_synthetic_cache(employees: int, sheets: int = 1, seed: int = 42) -> dict:
+    """Заполняет кэш бота синтетическими данными и возвращает опубликованный снимок."""
+    from utils import cache_manager
+
+    raw_cache = generate_raw_cache(employees, sheets, seed)
+    cache_manager.install_cache(raw_cache, sheet_count=sheets)
+    return cache_manager.get_snapshot()
@@ -0,0 +1,181 @@
+"""
+Имитация Telegram, доставляющего апдейты на webhook бота.
+
+Против запущенного бота (WEBHOOK_URL=..., WEBHOOK_SECRET=...):
+    python -m tools.webhook_sender --url http://127.0.0.1:8080/telegram --secret <секрет>
+
+Полностью локально — бот в этом же процессе, Bot API и кэш поддельные:
+    python -m tools.webhook_sender --local --count 300 --stop-after 150
+
+Отправитель шлёт сессии /start → роль → табельный от разных пользователей,
+проверяет, что запрос без секрета получает 403, и печатает коды ответов и
+задержку доставки. С --stop-after в середине потока запускается остановка
+бота: принятые апдейты должны быть обработаны, новые — получить 503.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from tools.loadtest import UpdateFactory, percentile, _ENV_DEFAULTS, _NO_LIMITS
+
+
+def build_payloads(count: int, employee_ids: list, seed: int = 1) -> list:
+    """Апдейты в JSON-виде, как их присылает Telegram: сессии по три апдейта."""
+    from tools.fake_telegram import BOT_USER
+
+    rng = random.Random(seed)
+    factory = UpdateFactory(None, BOT_USER)
+    payloads = []
+    user_id = 20_000
+    while len(payloads) < count:
+        user_id += 1
+        employee_id = rng.choice(employee_ids) if employee_ids else str(rng.randint(100, 999_999))
+        for update in (
+            factory.message(user_id, "/start"),
+            factory.callback(user_id, rng.choice(("admin", "mfu"))),
+            factory.message(user_id, employee_id),
+        ):
+            payloads.append((user_id, update.to_dict()))
+    return payloads[:count]
+
+
+async def send(url: str, secret: str, payloads: list, concurrency: int, on_sent=None) -> dict:
+    """
+    Доставляет апдейты. Апдейты одного пользователя идут по порядку,
+    разные пользователи — параллельно (как это делает Telegram).
+    """
+    import httpx
+
+    statuses: Counter = Counter()
+    latencies = []
+    by_user: dict = {}
+    for user_id, payload in payloads:
+        by_user.setdefault(user_id, []).append(payload)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    sent = 0
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        bad = await client.post(url, json=payloads[0][1], headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+        statuses[f"bad_secret_{bad.status_code}"] += 1
+
+        async def _deliver(user_payloads: list):
+            nonlocal sent
+            async with semaphore:
+                for payload in user_payloads:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(
+                            url, json=payload, headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+                        )
+                        statuses[response.status_code] += 1
+                    except httpx.HTTPError as e:
+                        statuses[type(e).__name__] += 1
+                    latencies.append(time.perf_counter() - started)
+                    sent += 1
+                    if on_sent:
+                        on_sent(sent)
+
+        await asyncio.gather(*(_deliver(p) for p in by_user.values()))
+
+    latencies.sort()
+    return {
+        "statuses": dict(statuses),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def run_local(args) -> int:
+    """Бот, Bot API и кэш — в этом процессе; проверка доставки и плавной остановки."""
+    from tools.fake_telegram import FakeTelegram
+    from tools.synthetic import install_synthetic_cache
+
+    fake = FakeTelegram().start()
+    for key, value in _ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(_NO_LIMITS)
+    os.environ["TELEGRAM_API_BASE"] = fake.base
+    os.environ["WEBHOOK_URL"] = "https://bot.example.invalid"
+    os.environ.setdefault("WEBHOOK_SECRET", "local-test-secret")
+
+    import logging
+    import warnings
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore", message=".*per_message.*")
+
+    from bot import build_application
+    from utils.webhook import serve_webhook
+    from config import WEBHOOK_PATH
+
+    snapshot = install_synthetic_cache(args.employees)
+    employee_ids = [emp["employee_id"] for emp in snapshot["employees"]]
+
+    application = build_application(outbound_limit=False)
+    stop = asyncio.Event()
+    ready: dict = {}
+    server = asyncio.create_task(serve_webhook(application, stop_event=stop, port=0, ready=ready))
+    while not ready.get("ready"):
+        if server.done():
+            server.result()     # пробрасывает ошибку запуска
+            return 1
+        await asyncio.sleep(0.01)
+
+    url = f"http://127.0.0.1:{ready['port']}{WEBHOOK_PATH}"
+
+    def _on_sent(n):
+        if args.stop_after and n == args.stop_after:
+            stop.set()
+
+    result = await send(url, ready["secret"], build_payloads(args.count, employee_ids), args.concurrency, _on_sent)
+    stop.set()
+    outcome = await server
+    fake.stop()
+
+    accepted = result["statuses"].get(200, 0)
+    # На каждый принятый апдейт бот отвечает ровно одним вызовом Bot API
+    answered = sum(fake.calls[m] for m in ("sendMessage", "editMessageText"))
+    print(f"Коды ответов: {result['statuses']}")
+    print(f"Доставка: p50 {result['p50_ms']:.1f} мс | p99 {result['p99_ms']:.1f} мс")
+    print(f"setWebhook: {fake.calls['setWebhook']} | принято: {accepted} | обработано: {answered} "
+          f"| дообработка успела: {outcome['drained']}")
+
+    ok = (
+        result["statuses"].get("bad_secret_403") == 1
+        and fake.calls["setWebhook"] == 1
+        and answered == accepted
+        and outcome["drained"]
+    )
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Имитация доставки апдейтов на webhook")
+    parser.add_argument("--url", help="адрес webhook бота")
+    parser.add_argument("--secret", default="", help="секрет (WEBHOOK_SECRET бота)")
+    parser.add_argument("--local", action="store_true", help="поднять бота в этом процессе")
+    parser.add_argument("--count", type=int, default=300, help="число апдейтов")
+    parser.add_argument("--concurrency", type=int, default=20, help="параллельных доставок")
+    parser.add_argument("--stop-after", type=int, default=0, help="(--local) остановить бота после N апдейтов")
+    parser.add_argument("--employees", type=int, default=2000, help="(--local) размер синтетического кэша")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        return asyncio.run(run_local(args))
+    if not args.url:
+        parser.error("нужен --url или --local")
+
+    result = asyncio.run(send(args.url, args.secret, build_payloads(args.count, []), args.concurrency))
+    print(f"Коды ответов: {result['statuses']}")
+    print(f"Доставка: p50 {result['p50_ms']:.1f} мс | p99 {result['p99_ms']:.1f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
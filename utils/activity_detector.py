@@ -0,0 +1,117 @@
+"""
+Детекция подозрительной активности: перебор чужих табельных.
+
+Для каждого пользователя хранится небольшой «эскиз» в хранилище состояния:
+    • последние MAX_TRACKED_IDS разных табельных с временем последнего поиска —
+      ширина перебора считается только по окну SUSPICIOUS_WINDOW_MINUTES;
+    • затухающий счётчик запросов (экспонента с постоянной BURST_TAU) —
+      всплеск запросов за последние минуты.
+
+Состояние не сбрасывается по /start. Алерты уходят из фонового потока
+и не чаще одного раза в SUSPICIOUS_ALERT_COOLDOWN_MINUTES на пользователя.
+"""
+
+import logging
+import math
+import queue
+import threading
+import time
+
+from config import (
+    SUSPICIOUS_DIFF_IDS, SUSPICIOUS_WINDOW_MINUTES, SUSPICIOUS_BURST,
+    SUSPICIOUS_ALERT_COOLDOWN_MINUTES,
+)
+from utils.user_state import get_field, set_field
+
+
+# Сколько разных табельных помнить на пользователя
+MAX_TRACKED_IDS = 4 * SUSPICIOUS_DIFF_IDS
+
+# Постоянная затухания счётчика всплесков (сек)
+BURST_TAU = 300
+
+WINDOW_SECONDS = SUSPICIOUS_WINDOW_MINUTES * 60
+COOLDOWN_SECONDS = SUSPICIOUS_ALERT_COOLDOWN_MINUTES * 60
+
+_lock = threading.Lock()
+_alerts: queue.Queue = queue.Queue(maxsize=100)
+_worker_started = False
+
+
+def _score(ids: dict, burst: float) -> tuple:
+    """
+    Returns:
+        (ширина, всплеск) — доли от порогов; >= 1 означает превышение
+    """
+    breadth = len(ids) / SUSPICIOUS_DIFF_IDS
+    # Многократный поиск своего же номера — не перебор
+    burstiness = burst / SUSPICIOUS_BURST if len(ids) > 1 else 0.0
+    return breadth, burstiness
+
+
+def observe(user_id: int, username: str, employee_id: str, alert_callback=None) -> tuple:
+    """
+    Учитывает поиск табельного пользователем и при необходимости ставит алерт в очередь.
+
+    Returns:
+        (ширина, всплеск) — текущие оценки пользователя
+    """
+    now = time.time()
+
+    with _lock:
+        state = get_field(user_id, "activity") or {"ids": {}, "burst": 0.0, "ts": now}
+
+        # Убираем табельные, вышедшие за окно, и добавляем текущий
+        ids = {eid: ts for eid, ts in state["ids"].items() if now - ts < WINDOW_SECONDS}
+        ids.pop(employee_id, None)
+        ids[employee_id] = now
+        while len(ids) > MAX_TRACKED_IDS:
+            ids.pop(next(iter(ids)))
+
+        burst = state["burst"] * math.exp(-(now - state["ts"]) / BURST_TAU) + 1.0
+
+        set_field(user_id, "activity", {"ids": ids, "burst": burst, "ts": now}, ttl=WINDOW_SECONDS)
+
+        breadth, burstiness = _score(ids, burst)
+        suspicious = breadth >= 1 or burstiness >= 1
+        if suspicious and alert_callback and get_field(user_id, "alert_cooldown") is None:
+            set_field(user_id, "alert_cooldown", True, ttl=COOLDOWN_SECONDS)
+            _enqueue_alert(alert_callback, _format_alert(user_id, username, ids, breadth, burstiness))
+
+    return breadth, burstiness
+
+
+def _format_alert(user_id: int, username: str, ids: dict, breadth: float, burstiness: float) -> str:
+    return (
+        f"⚠️ Подозрительная активность!\n\n"
+        f"Пользователь: @{username} (ID: {user_id})\n"
+        f"Искал {len(ids)} разных табельных за {SUSPICIOUS_WINDOW_MINUTES} мин:\n"
+        f"{', '.join(ids)}\n\n"
+        f"Ширина: {breadth:.0%} порога | Всплеск: {burstiness:.0%} порога"
+    )
+
+
+# ================= ALERTS =================
+
+def _enqueue_alert(alert_callback, text: str):
+    _start_worker()
+    try:
+        _alerts.put_nowait((alert_callback, text))
+    except queue.Full:
+        logging.warning("Очередь алертов переполнена — алерт пропущен")
+
+
+def _worker():
+    while True:
+        alert_callback, text = _alerts.get()
+        try:
+            alert_callback(text)
+        except Exception as e:
+            logging.error(f"Не удалось отправить алерт: {e}")
+
+
+def _start_worker():
+    global _worker_started
+    if not _worker_started:
+        _worker_started = True
+        threading.Thread(target=_worker, daemon=True).start()
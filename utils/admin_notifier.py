@@ -3,14 +3,16 @@
 """
 
 import logging
-import requests
-from config import TOKEN, ADMIN_ID
+from config import TOKEN, ADMIN_ID, TELEGRAM_API_BASE
+from utils.rate_limiter import wait_outbound_slot
 
 
 def send_admin_message(text: str):
-    """Отправляет сообщение администратору бота."""
+    """Отправляет сообщение администратору бота (в общем бюджете исходящих сообщений)."""
+    import requests
     try:
-        url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+        wait_outbound_slot()
+        url = f"{TELEGRAM_API_BASE}/bot{TOKEN}/sendMessage"
         requests.post(url, json={"chat_id": ADMIN_ID, "text": text}, timeout=10)
     except Exception as e:
         logging.error(f"Не удалось отправить сообщение админу: {e}")
@@ -0,0 +1,194 @@
+"""
+Потоковая аналитика запросов в фиксированном объёме памяти.
+
+    • скользящие счётчики: 60 минутных и 24 часовых ячейки (кольцевые буферы);
+    • HyperLogLog на каждый час — примерное число уникальных пользователей
+      за последний час/сутки (объединение = поэлементный максимум регистров);
+    • count-min sketch + небольшой список лидеров — самые искомые
+      табельные и самые активные пользователи.
+
+Обработка одного запроса — O(1), память не зависит от числа запросов.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+# Счётчики в каждой ячейке
+COUNTERS = ("requests", "found", "not_found", "admin", "mfu")
+
+MINUTE_SLOTS = 60
+HOUR_SLOTS = 24
+
+HLL_BITS = 10                       # 1024 регистра, погрешность ~3%
+HLL_REGISTERS = 1 << HLL_BITS
+
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+TOP_K = 20
+
+
+def _hash64(value) -> int:
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+# ================= HYPERLOGLOG =================
+
+def _hll_add(registers: bytearray, h: int):
+    idx = h & (HLL_REGISTERS - 1)
+    w = h >> HLL_BITS
+    rank = (64 - HLL_BITS) - w.bit_length() + 1
+    if rank > registers[idx]:
+        registers[idx] = rank
+
+
+def _hll_count(registers: bytearray) -> int:
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+    zeros = registers.count(0)
+    # Поправка для малых значений — линейный счёт
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+# ================= COUNT-MIN SKETCH =================
+
+class HeavyHitters:
+    """Count-min sketch с отслеживанием TOP_K самых частых ключей."""
+
+    def __init__(self):
+        self.table = [[0] * CMS_WIDTH for _ in range(CMS_DEPTH)]
+        self.top: dict = {}        # ключ -> оценка частоты
+        self.labels: dict = {}     # ключ -> подпись (только для лидеров)
+
+    def add(self, key, h: int, label: str = None):
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        estimate = None
+        for row in range(CMS_DEPTH):
+            col = (h1 + row * h2) % CMS_WIDTH
+            self.table[row][col] += 1
+            value = self.table[row][col]
+            if estimate is None or value < estimate:
+                estimate = value
+
+        if key in self.top or len(self.top) < TOP_K:
+            self.top[key] = estimate
+        else:
+            weakest = min(self.top, key=self.top.get)
+            if estimate > self.top[weakest]:
+                del self.top[weakest]
+                self.labels.pop(weakest, None)
+                self.top[key] = estimate
+            else:
+                return
+        if label:
+            self.labels[key] = label
+
+    def most_common(self, n: int) -> list:
+        items = sorted(self.top.items(), key=lambda kv: -kv[1])[:n]
+        return [(key, count, self.labels.get(key)) for key, count in items]
+
+
+# ================= STATE =================
+
+_lock = threading.Lock()
+_started = time.time()
+
+# Кольцевые буферы: [метка ячейки, [счётчики...]]
+_minutes = [[-1, [0] * len(COUNTERS)] for _ in range(MINUTE_SLOTS)]
+_hours = [[-1, [0] * len(COUNTERS), bytearray(HLL_REGISTERS)] for _ in range(HOUR_SLOTS)]
+_totals = [0] * len(COUNTERS)
+_hll_total = bytearray(HLL_REGISTERS)
+
+_top_ids = HeavyHitters()
+_top_users = HeavyHitters()
+
+
+def _slot(ring: list, stamp: int) -> list:
+    slot = ring[stamp % len(ring)]
+    if slot[0] != stamp:
+        slot[0] = stamp
+        slot[1] = [0] * len(COUNTERS)
+        if len(slot) > 2:
+            slot[2] = bytearray(HLL_REGISTERS)
+    return slot
+
+
+def record_request(user_id: int, username: str, employee_id: str, role: str, found: bool):
+    """Учитывает один запрос по табельному."""
+    now = int(time.time())
+    minute, hour = now // 60, now // 3600
+    hits = (0, 1 if found else 2, 3 if role == "admin" else 4)
+    h_user = _hash64(user_id)
+    h_emp = _hash64(employee_id)
+
+    with _lock:
+        m_slot = _slot(_minutes, minute)
+        h_slot = _slot(_hours, hour)
+        for i in hits:
+            m_slot[1][i] += 1
+            h_slot[1][i] += 1
+            _totals[i] += 1
+
+        _hll_add(h_slot[2], h_user)
+        _hll_add(_hll_total, h_user)
+
+        _top_ids.add(employee_id, h_emp)
+        _top_users.add(user_id, h_user, label=username)
+
+
+def _sum_window(ring: list, current: int, span: int) -> list:
+    totals = [0] * len(COUNTERS)
+    for slot in ring:
+        if current - span < slot[0] <= current:
+            for i, v in enumerate(slot[1]):
+                totals[i] += v
+    return totals
+
+
+def get_summary() -> dict:
+    """
+    Возвращает сводку для /status.
+
+    Returns:
+        {"last_hour": {...}, "last_day": {...}, "total": {...}} — счётчики
+        и примерное число уникальных пользователей в каждом окне
+    """
+    now = int(time.time())
+    minute, hour = now // 60, now // 3600
+
+    with _lock:
+        last_hour = _sum_window(_minutes, minute, MINUTE_SLOTS)
+        last_day = _sum_window(_hours, hour, HOUR_SLOTS)
+
+        day_hll = bytearray(HLL_REGISTERS)
+        hour_hll = None
+        for slot in _hours:
+            if hour - HOUR_SLOTS < slot[0] <= hour:
+                day_hll = bytearray(map(max, day_hll, slot[2]))
+                if slot[0] == hour:
+                    hour_hll = slot[2]
+
+        summary = {
+            "last_hour": dict(zip(COUNTERS, last_hour)),
+            "last_day": dict(zip(COUNTERS, last_day)),
+            "total": dict(zip(COUNTERS, _totals)),
+        }
+        # Уникальные за текущий час (ячейка часа), за сутки и с запуска
+        summary["last_hour"]["users"] = _hll_count(hour_hll) if hour_hll else 0
+        summary["last_day"]["users"] = _hll_count(day_hll)
+        summary["total"]["users"] = _hll_count(_hll_total)
+        summary["uptime_seconds"] = now - int(_started)
+    return summary
+
+
+def get_top(n: int = 10) -> dict:
+    """Возвращает самые искомые табельные и самых активных пользователей (оценки)."""
+    with _lock:
+        return {
+            "employee_ids": _top_ids.most_common(n),
+            "users": _top_users.most_common(n),
+        }
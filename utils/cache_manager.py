@@ -1,16 +1,58 @@
 """
 Управление кэшем данных из Google Sheets.
+
+Каждое обновление кэша публикует новый снимок (snapshot) с номером версии.
+Снимок содержит плоский список сотрудников и индексы по табельному и ПВЗ,
+поэтому поиск не сканирует таблицы целиком. Несколько последних снимков
+хранятся в памяти, чтобы листание страниц, начатое до обновления,
+оставалось согласованным.
+
+Несколько процессов на одной машине делят один снимок (CACHE_MODE):
+обновитель (writer) записывает каждый снимок в SNAPSHOT_DIR, читатели
+(reader) не ходят в Google и отображают файл в память — см.
+utils/snapshot_store.py. В режиме auto обновителя выбирают сами процессы
+(utils/leader.py). Снимок читателя устроен так же, только его
+списки и словари — представления над файлом, доступные лишь для чтения.
+
+Таблицы реестра обновляются не все разом: у каждой свой срок
+(utils/refresh_scheduler.py), цикл обновления забирает только те, у которых
+он подошёл, и публикует новый снимок, если данные изменились.
 """
 
+import json
 import logging
+import sys
 import threading
-from config import REGISTRY_ID, TOKEN, ADMIN_ID, CACHE_TTL_SECONDS
-from utils.helpers import now_tashkent
-from utils.sheets import get_registry_ids, build_role_url, load_records
-
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from config import (
+    REGISTRY_ID, TOKEN, ADMIN_ID, CACHE_TTL_SECONDS, ID_SUGGESTIONS_MAX,
+    PVZ_ALIASES_FILE, PVZ_ALIASES_SHEET, CACHE_MODE, SNAPSHOT_DIR, SNAPSHOT_POLL_SECONDS,
+    REFRESH_TICK_SECONDS,
+)
+from utils.helpers import (
+    now_tashkent, normalize_id, normalize_pvz, normalize_city, extract_pvz_number, set_pvz_aliases,
+)
+from utils.sheets import get_registry_entries, build_role_url, load_records, get_pvz_aliases
+from utils.name_search import build_name_index, search_names, translit_key
+from utils import metrics, snapshot_store, leader, result_cache, refresh_scheduler
+from utils.templates import employee_card, employee_replies
+
+
+# Сколько последних снимков держать для листания результатов
+SNAPSHOT_HISTORY = 2
+
+# События горячих путей для выборочного логирования (LOG_SAMPLE, utils/log_setup.py)
+LOOKUP_EVENT = {"event": "lookup"}
+SEARCH_EVENT = {"event": "search"}
 
 _cache: dict = {"admin": {}, "mfu": {}}
 _cache_lock = threading.Lock()
+# Одно обновление за раз: фоновый цикл и /refresh не должны строить снимки
+# с одинаковой версией и затирать результат друг друга
+_refresh_lock = threading.Lock()
 _last_refresh = None
 _cache_stats: dict = {
     "total_admin": 0,
@@ -20,6 +62,217 @@ _cache_stats: dict = {
 }
 
 
+# ================= SNAPSHOT =================
+#
+# snapshot = {
+#     "version":   int,
+#     "employees": [employee, ...],                 # admin, затем mfu
+#     "by_id":     {"admin": {id: pos}, "mfu": {id: pos}},
+#     "by_pvz":    {"5": [pos, ...], ...},           # номер ПВЗ -> позиции
+#     "name_index": {...},                           # см. utils/name_search.py
+#
+#     # Отсортированные индексы для поиска по префиксу (bisect):
+#     "id_keys":   [табельный, ...],  "id_pos":   [pos, ...],
+#     "id_sorted": {"admin": [табельный, ...], "mfu": [...]},
+#     "pvz_keys":  ["ТАШ-5", ...],    "pvz_pos":  [[pos, ...], ...],
+#     "name_keys": [скелет слова ФИО, ...],  "name_pos": [pos, ...],
+#
+#     # Готовые тексты ответов (utils/templates.py), упакованные в один буфер:
+#     "replies":   [карточка без табельного, с табельным, ...],  # 2 * pos + with_id
+#
+#     # Из какой таблицы сотрудник — для расписания обновления (только в памяти
+#     # обновителя, в общий снимок не пишется): позиции начала таблиц по порядку
+#     "sheet_starts": [pos, ...],  "sheet_ids": [spreadsheet_id, ...],
+# }
+
+def _empty_snapshot(version: int) -> dict:
+    return {
+        "version": version,
+        "employees": [],
+        "by_id": {"admin": {}, "mfu": {}},
+        "by_pvz": {},
+        "name_index": build_name_index([]),
+        "id_keys": [],
+        "id_pos": [],
+        "id_sorted": {"admin": [], "mfu": []},
+        "pvz_keys": [],
+        "pvz_pos": [],
+        "name_keys": [],
+        "name_pos": [],
+        "replies": snapshot_store.pack_strings([]),
+        "sheet_starts": [],
+        "sheet_ids": [],
+    }
+
+
+_snapshot: dict = _empty_snapshot(0)
+_snapshots: OrderedDict = OrderedDict()
+
+
+def _row_to_employee(row: dict, role: str) -> dict:
+    """Преобразует строку таблицы в словарь сотрудника."""
+    # Значения ПВЗ и показателей повторяются у многих сотрудников — храним по одной копии
+    intern = sys.intern
+    return {
+        "fio": row.get("ФИО", "N/A"),
+        "pvz": intern(row.get("ПВЗ", "N/A")),
+        "fact": intern(row.get("Факт", "N/A")),
+        "open_limits": intern(row.get("Открыто Лимитов", "N/A")),
+        "plan_limits": intern(row.get("План по лимитам", "N/A")),
+        "execution": intern(row.get("Выполнение плана по лимитам", "N/A")),
+        "virtual_cards": intern(row.get(" 📱Оформленно виртуальных карт", "N/A")),
+        "plastic_cards": intern(row.get("💷Оформленно пластиковых карт", "N/A")),
+        "vchl": intern(row.get("ВЧЛ", "N/A")),
+        "employee_id": normalize_id(row.get("Табельный номер", "")),
+        "role": role,
+        "pvz_normalized": intern(normalize_pvz(row.get("ПВЗ", ""))),
+    }
+
+
+def _build_snapshot(raw_cache: dict, version: int) -> dict:
+    """Строит снимок с индексами из сырых данных таблиц."""
+    snapshot = _empty_snapshot(version)
+    employees = snapshot["employees"]
+
+    for role in ("admin", "mfu"):
+        by_id = snapshot["by_id"][role]
+        for spreadsheet_id, records in raw_cache[role].items():
+            snapshot["sheet_starts"].append(len(employees))
+            snapshot["sheet_ids"].append(spreadsheet_id)
+            for row in records:
+                emp = _row_to_employee(row, role)
+                pos = len(employees)
+                employees.append(emp)
+
+                # Первое вхождение выигрывает — как при последовательном поиске
+                if emp["employee_id"]:
+                    by_id.setdefault(emp["employee_id"], pos)
+
+                pvz_number = extract_pvz_number(emp["pvz_normalized"])
+                if pvz_number:
+                    snapshot["by_pvz"].setdefault(pvz_number, []).append(pos)
+
+    snapshot["name_index"] = build_name_index([emp["fio"] for emp in employees])
+    _build_prefix_indexes(snapshot)
+    snapshot["replies"] = snapshot_store.pack_strings(employee_replies(employees))
+    return snapshot
+
+
+def _build_prefix_indexes(snapshot: dict):
+    """Строит отсортированные массивы для поиска по префиксу."""
+    employees = snapshot["employees"]
+
+    ids = sorted(
+        (emp_id, pos)
+        for role in ("admin", "mfu")
+        for emp_id, pos in snapshot["by_id"][role].items()
+    )
+    snapshot["id_keys"] = [k for k, _ in ids]
+    snapshot["id_pos"] = [p for _, p in ids]
+    snapshot["id_sorted"] = {role: sorted(snapshot["by_id"][role]) for role in ("admin", "mfu")}
+
+    by_pvz_key: dict = {}
+    for pos, emp in enumerate(employees):
+        if emp["pvz_normalized"]:
+            by_pvz_key.setdefault(emp["pvz_normalized"], []).append(pos)
+    snapshot["pvz_keys"] = sorted(by_pvz_key)
+    snapshot["pvz_pos"] = [by_pvz_key[k] for k in snapshot["pvz_keys"]]
+
+    name_index = snapshot["name_index"]
+    tokens = sorted(
+        (token, pos)
+        for token, positions in zip(name_index["tokens"], name_index["token_pos"])
+        for pos in positions
+    )
+    snapshot["name_keys"] = [t for t, _ in tokens]
+    snapshot["name_pos"] = [p for _, p in tokens]
+
+
+def _prefix_range(keys: list, prefix: str) -> tuple:
+    """Возвращает диапазон [lo, hi) ключей, начинающихся с prefix."""
+    lo = bisect_left(keys, prefix)
+    hi = bisect_left(keys, prefix + "\uffff", lo)
+    return lo, hi
+
+
+def _publish_snapshot(snapshot: dict, published_at: float = None):
+    """Делает снимок текущим. Вызывать под _cache_lock."""
+    global _snapshot
+    _snapshot = snapshot
+    _snapshots[snapshot["version"]] = snapshot
+    while len(_snapshots) > SNAPSHOT_HISTORY:
+        _snapshots.popitem(last=False)
+    result_cache.discard_before(next(iter(_snapshots)))
+    metrics.mark_snapshot_published(published_at)
+
+
+def get_snapshot(version: int = None):
+    """
+    Возвращает снимок кэша.
+
+    Args:
+        version: номер версии; None — текущий снимок
+
+    Returns:
+        dict снимка или None если такой версии уже нет в памяти
+    """
+    with _cache_lock:
+        if version is None:
+            return _snapshot
+        return _snapshots.get(version)
+
+
+def get_snapshot_version() -> int:
+    """Возвращает номер текущей версии снимка (0 — кэш ещё не загружен)."""
+    return _snapshot["version"]
+
+
+# ================= PVZ ALIASES =================
+
+_pvz_aliases: dict = {}
+
+
+def _read_pvz_aliases_file(path: str) -> dict:
+    """
+    Читает алиасы из JSON-файла. Поддерживаются оба вида записей:
+        {"TOSHKENT": "ТАШ"}            — вариант -> код
+        {"ТАШ": ["TOSHKENT", "TSH"]}   — код -> список вариантов
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    aliases = {}
+    for key, value in raw.items():
+        if isinstance(value, list):
+            for variant in value:
+                aliases[variant] = key
+        else:
+            aliases[key] = value
+    return aliases
+
+
+def load_pvz_aliases():
+    """Подгружает алиасы ПВЗ из файла и листа реестра, если они настроены."""
+    global _pvz_aliases
+
+    aliases = {}
+    if PVZ_ALIASES_FILE:
+        try:
+            aliases.update(_read_pvz_aliases_file(PVZ_ALIASES_FILE))
+        except Exception as e:
+            logging.error(f"Не удалось прочитать алиасы ПВЗ из {PVZ_ALIASES_FILE}: {e}")
+    if PVZ_ALIASES_SHEET:
+        aliases.update(get_pvz_aliases(REGISTRY_ID, PVZ_ALIASES_SHEET))
+
+    # Пересобираем таблицу только при изменениях — чтобы не сбрасывать мемоизацию
+    if aliases != _pvz_aliases:
+        set_pvz_aliases(aliases)
+        _pvz_aliases = aliases
+        logging.info(f"Таблица алиасов ПВЗ обновлена: {len(aliases)} доп. записей")
+
+
+# ================= REFRESH =================
+
 def get_cache_stats() -> dict:
     """Возвращает статистику кэша."""
     with _cache_lock:
@@ -31,89 +284,358 @@ def get_last_refresh():
     return _last_refresh
 
 
-def refresh_cache(notify_callback=None):
+def install_cache(new_cache: dict, sheet_count: int = None, errors: int = 0):
     """
-    Обновляет кэш из Google Sheets.
+    Строит снимок из загруженных таблиц и делает его текущим.
 
     Args:
-        notify_callback: функция для отправки уведомлений (принимает текст сообщения)
+        new_cache: {"admin": {spreadsheet_id: [record, ...]}, "mfu": {...}}
+        sheet_count: число таблиц в реестре (по умолчанию — число загруженных)
+        errors: число ошибок загрузки (для статистики)
     """
     global _last_refresh, _cache_stats
 
-    logging.info("🔄 Начинаем обновление кэша...")
-
-    sheet_ids = get_registry_ids(REGISTRY_ID)
-
-    if not sheet_ids:
-        msg = "🚨 Реестр таблиц пустой — кэш не обновлён"
-        if notify_callback:
-            notify_callback(msg)
-        return
-
-    new_cache: dict = {"admin": {}, "mfu": {}}
-    errors = 0
-
-    for spreadsheet_id in sheet_ids:
-        for role in ("admin", "mfu"):
-            try:
-                api_url = build_role_url(spreadsheet_id, role)
-                records = load_records(api_url)
-                if records:
-                    new_cache[role][spreadsheet_id] = records
-                else:
-                    with _cache_lock:
-                        old = _cache[role].get(spreadsheet_id)
-                    if old:
-                        new_cache[role][spreadsheet_id] = old
-                        logging.warning(
-                            f"⚠️ {spreadsheet_id} ({role}) вернул 0 записей — оставлены старые данные"
-                        )
-            except Exception as e:
-                errors += 1
-                logging.error(f"Ошибка загрузки {spreadsheet_id} ({role}): {e}")
-
     total_admin = sum(len(v) for v in new_cache["admin"].values())
     total_mfu = sum(len(v) for v in new_cache["mfu"].values())
+    if sheet_count is None:
+        sheet_count = len(set(new_cache["admin"]) | set(new_cache["mfu"]))
+
+    version = _snapshot["version"] + 1
+    if _writes_snapshots():
+        # Продолжаем версии записанных снимков: после рестарта обновителя номер
+        # не должен совпасть со снимком, который читатели ещё держат для листания
+        version = max(version, snapshot_store.current_version(SNAPSHOT_DIR) + 1)
+
+    # Индексы строим вне блокировки — поиск продолжает работать по старому снимку
+    snapshot = _build_snapshot(new_cache, version)
 
     with _cache_lock:
         _cache["admin"] = new_cache["admin"]
         _cache["mfu"] = new_cache["mfu"]
+        _publish_snapshot(snapshot)
         _last_refresh = now_tashkent()
         _cache_stats = {
             "total_admin": total_admin,
             "total_mfu": total_mfu,
-            "sheet_count": len(sheet_ids),
+            "sheet_count": sheet_count,
             "errors": errors,
         }
 
+    if _writes_snapshots():
+        _write_shared_snapshot(snapshot)
+
+
+# ================= SHARED SNAPSHOT =================
+
+# Имя файла общего снимка, который сейчас отображён в память (CACHE_MODE=reader)
+_mapped_name = None
+
+
+def _writes_snapshots() -> bool:
+    """Процесс записывает снимки для остальных: writer или лидер в режиме auto."""
+    return CACHE_MODE == "writer" or (CACHE_MODE == "auto" and leader.is_leader())
+
+
+def _follows_snapshots() -> bool:
+    """Процесс берёт снимки обновителя и сам в Google не ходит."""
+    return CACHE_MODE == "reader" or (CACHE_MODE == "auto" and not leader.is_leader())
+
+
+def _write_shared_snapshot(snapshot: dict):
+    """Записывает снимок в SNAPSHOT_DIR для процессов-читателей."""
+    try:
+        published_at = time.time()
+        with metrics.timer("snapshot_write_seconds"):
+            path = snapshot_store.write_snapshot(snapshot, SNAPSHOT_DIR, {
+                "published_at": published_at,
+                "last_refresh": _last_refresh.isoformat(),
+                "stats": _cache_stats,
+                "pvz_aliases": _pvz_aliases,
+            })
+        leader.heartbeat(SNAPSHOT_DIR, published_at, snapshot["version"])
+        logging.info(f"💾 Общий снимок v{snapshot['version']} записан: {path}")
+    except Exception as e:
+        logging.error(f"Не удалось записать общий снимок в {SNAPSHOT_DIR}: {e}")
+
+
+def load_shared_snapshot() -> bool:
+    """
+    Подхватывает новый общий снимок из SNAPSHOT_DIR, если обновитель его сменил.
+
+    Returns:
+        True если снимок сменился
+    """
+    global _mapped_name, _last_refresh, _cache_stats, _pvz_aliases
+
+    opened = snapshot_store.open_current(SNAPSHOT_DIR, _mapped_name)
+    if opened is None:
+        return False
+    name, snapshot, meta = opened
+
+    # Запросы нормализуются так же, как у обновителя
+    aliases = meta.get("pvz_aliases") or {}
+    if aliases != _pvz_aliases:
+        set_pvz_aliases(aliases)
+        _pvz_aliases = aliases
+
+    with _cache_lock:
+        _publish_snapshot(snapshot, meta.get("published_at"))
+        if meta.get("last_refresh"):
+            _last_refresh = datetime.fromisoformat(meta["last_refresh"])
+        _cache_stats = {**_cache_stats, **meta.get("stats", {})}
+    _mapped_name = name
+
+    logging.info(f"📥 Подхвачен общий снимок v{snapshot['version']}: {len(snapshot['employees'])} сотрудников")
+    return True
+
+
+def refresh_cache(notify_callback=None, only_due: bool = False):
+    """
+    Обновляет кэш из Google Sheets. Если обновление уже идёт — дожидается его
+    и запускает следующее.
+
+    Args:
+        notify_callback: функция для отправки уведомлений (принимает текст сообщения)
+        only_due: только таблицы, у которых подошёл срок (фоновый цикл);
+            False — все таблицы реестра (первая загрузка, /refresh)
+    """
+    if _follows_snapshots():
+        # Читатель не ходит в Google — только подхватывает свежий общий снимок
+        load_shared_snapshot()
+        return
+    with _refresh_lock:
+        _refresh_cache(notify_callback, only_due)
+
+
+# Когда последний раз читался реестр и отправлялось уведомление об обновлении
+_registry_loaded_at = 0.0
+_last_notified = 0.0
+
+
+def _load_registry(notify_callback=None):
+    """
+    Перечитывает реестр и алиасы ПВЗ и сверяет с ними расписание.
+
+    Returns:
+        True если набор таблиц изменился; None — реестр пустой
+    """
+    global _registry_loaded_at
+    load_pvz_aliases()
+    entries = get_registry_entries(REGISTRY_ID)
+    if not entries:
+        metrics.inc("cache_refresh_total", result="empty_registry")
+        msg = "🚨 Реестр таблиц пустой — кэш не обновлён"
+        if notify_callback:
+            notify_callback(msg)
+        return None
+    _registry_loaded_at = time.time()
+    return refresh_scheduler.sync(entries)
+
+
+def _fetch_sheet(spreadsheet_id: str, new_cache: dict) -> tuple:
+    """
+    Читает оба листа таблицы в new_cache (пустой лист — остаются старые данные).
+
+    Returns:
+        (изменились ли данные, число ошибок, прочитаны ли оба листа)
+    """
+    changed = False
+    errors = 0
+    ok = True
+    for role in ("admin", "mfu"):
+        with _cache_lock:
+            old = _cache[role].get(spreadsheet_id)
+        try:
+            api_url = build_role_url(spreadsheet_id, role)
+            with metrics.timer("sheet_fetch_seconds", role=role):
+                records = load_records(api_url)
+            if records:
+                new_cache[role][spreadsheet_id] = records
+                changed = changed or records != old
+            else:
+                ok = False
+                if old:
+                    logging.warning(
+                        f"⚠️ {spreadsheet_id} ({role}) вернул 0 записей — оставлены старые данные"
+                    )
+        except Exception as e:
+            errors += 1
+            ok = False
+            logging.error(f"Ошибка загрузки {spreadsheet_id} ({role}): {e}")
+    return changed, errors, ok
+
+
+def _refresh_cache(notify_callback=None, only_due=False):
+    if only_due and refresh_scheduler.deferred():
+        return
+    started = time.perf_counter()
+
+    registry_changed = False
+    if (not only_due or not refresh_scheduler.sheet_ids()
+            or time.time() - _registry_loaded_at >= CACHE_TTL_SECONDS):
+        registry_changed = _load_registry(notify_callback)
+        if registry_changed is None:
+            return
+
+    sheet_ids = refresh_scheduler.sheet_ids()
+    fetch_ids = refresh_scheduler.due() if only_due else sheet_ids
+
+    # Без изменений снимок не перестраивается, но не реже раза в CACHE_TTL,
+    # даже если ни у одной таблицы не подошёл срок: возраст снимка — признак
+    # живости обновителя (/healthz, читатели)
+    age = metrics.snapshot_age()
+    stale = age is None or age >= CACHE_TTL_SECONDS
+    if not fetch_ids and not registry_changed and not stale:
+        return
+    if only_due:
+        logging.info(f"🔄 Обновление кэша: {len(fetch_ids)} из {len(sheet_ids)} таблиц по расписанию")
+    else:
+        logging.info("🔄 Начинаем обновление кэша...")
+
+    # Таблицы, которые сейчас не читаются, переходят в новый снимок как есть
+    with _cache_lock:
+        new_cache: dict = {
+            role: {sid: _cache[role][sid] for sid in sheet_ids if sid in _cache[role]}
+            for role in ("admin", "mfu")
+        }
+    errors = 0
+    changed = 0
+    for spreadsheet_id in fetch_ids:
+        sheet_changed, sheet_errors, ok = _fetch_sheet(spreadsheet_id, new_cache)
+        refresh_scheduler.record_fetch(spreadsheet_id, sheet_changed, ok)
+        errors += sheet_errors
+        changed += sheet_changed
+
+    # Новый лидер публикует снимок, только прочитав все таблицы сам, —
+    # до этого его данные таблиц неполные или устаревшие
+    unread = refresh_scheduler.unread()
+    if unread:
+        logging.info(f"⏳ Снимок не публикуется: ещё не прочитано таблиц — {len(unread)}")
+        return
+
+    if only_due and not changed and not registry_changed and not stale:
+        metrics.inc("cache_refresh_total", result="unchanged")
+        logging.info(f"✅ Таблицы без изменений ({len(fetch_ids)}), снимок v{_snapshot['version']} оставлен")
+        return
+
+    install_cache(new_cache, sheet_count=len(sheet_ids), errors=errors)
+
+    metrics.observe("cache_refresh_seconds", time.perf_counter() - started)
+    metrics.inc("cache_refresh_total", result="ok" if not errors else "partial")
+
     from utils.helpers import fmt_dt
+    stats = get_cache_stats()
     msg = (
         f"✅ Кэш обновлён в {fmt_dt(_last_refresh)}\n"
-        f"Таблиц: {len(sheet_ids)} | Ошибок: {errors}\n"
-        f"Записей Админ: {total_admin} | МФУ: {total_mfu}"
+        f"Таблиц: {len(sheet_ids)} (прочитано {len(fetch_ids)}, изменилось {changed}) | Ошибок: {errors}\n"
+        f"Записей Админ: {stats['total_admin']} | МФУ: {stats['total_mfu']}"
     )
     logging.info(msg)
-    if notify_callback:
+    _notify_refreshed(msg, notify_callback, force=not only_due)
+
+
+def _notify_refreshed(msg: str, notify_callback=None, force: bool = False):
+    """Уведомление об обновлении — не чаще раза в CACHE_TTL, как при обновлении всех таблиц разом."""
+    global _last_notified
+    if not notify_callback:
+        return
+    if force or time.time() - _last_notified >= CACHE_TTL_SECONDS:
+        _last_notified = time.time()
         notify_callback(msg)
 
 
+def _records_gauge() -> dict:
+    snapshot = _snapshot
+    return {(("role", role),): len(ids) for role, ids in snapshot["by_id"].items()}
+
+
+metrics.register_gauge("cache_records", _records_gauge, "Сотрудников в текущем снимке кэша")
+metrics.register_gauge("cache_snapshot_version", lambda: _snapshot["version"], "Версия текущего снимка кэша")
+metrics.register_gauge("cache_snapshot_age_seconds", metrics.snapshot_age, "Сколько секунд назад опубликован снимок")
+metrics.register_gauge("cache_leader", lambda: int(leader.is_leader()), "1 — процесс обновляет кэш для остальных")
+
+
 def start_cache_refresh_loop(notify_callback=None):
-    """Запускает фоновый поток обновления кэша."""
+    """
+    Запускает фоновый поток обновления кэша. В режиме reader поток не ходит
+    в Google, а раз в SNAPSHOT_POLL_SECONDS подхватывает общий снимок;
+    в режиме auto — то или другое, смотря по тому, лидер ли процесс.
+    """
+    if CACHE_MODE == "reader":
+        _start_shared_snapshot_loop()
+        return
+    if CACHE_MODE == "auto":
+        _start_leader_loop(notify_callback)
+        return
+
     def _loop():
         while True:
             try:
-                refresh_cache(notify_callback)
+                # Первый проход читает все таблицы: в пустом расписании срок у всех — сейчас
+                refresh_cache(notify_callback, only_due=True)
             except Exception as e:
                 logging.error(f"Критическая ошибка в цикле обновления кэша: {e}")
                 if notify_callback:
                     notify_callback(f"🚨 Критическая ошибка обновления кэша: {e}")
-            threading.Event().wait(CACHE_TTL_SECONDS)
+            threading.Event().wait(REFRESH_TICK_SECONDS)
 
     t = threading.Thread(target=_loop, daemon=True)
     t.start()
     logging.info("🚀 Фоновый поток обновления кэша запущен")
 
 
+def _start_shared_snapshot_loop():
+    def _loop():
+        while True:
+            try:
+                load_shared_snapshot()
+            except Exception as e:
+                logging.error(f"Не удалось открыть общий снимок из {SNAPSHOT_DIR}: {e}")
+            threading.Event().wait(SNAPSHOT_POLL_SECONDS)
+
+    t = threading.Thread(target=_loop, daemon=True)
+    t.start()
+    logging.info(f"🚀 Режим reader: снимки кэша берутся из {SNAPSHOT_DIR}")
+
+
+def _start_leader_loop(notify_callback=None):
+    """
+    CACHE_MODE=auto: раз в SNAPSHOT_POLL_SECONDS последователь подхватывает
+    снимок и пробует стать лидером, лидер — обновляет таблицы, у которых
+    подошёл срок. Новый лидер читает все таблицы заново, но не раньше, чем
+    через CACHE_TTL от последней публикации, в том числе прежнего лидера:
+    смена лидера при деплое не вызывает внеочередного похода в Google.
+    """
+    def _loop():
+        next_tick = 0.0
+        while True:
+            try:
+                if not leader.is_leader() and leader.try_acquire(SNAPSHOT_DIR):
+                    load_shared_snapshot()
+                    age = metrics.snapshot_age()
+                    refresh_scheduler.restart(time.time() + CACHE_TTL_SECONDS - age if age is not None else 0.0)
+                    next_tick = 0.0
+
+                if leader.is_leader():
+                    if time.time() >= next_tick:
+                        next_tick = time.time() + REFRESH_TICK_SECONDS
+                        refresh_cache(notify_callback, only_due=True)
+                    leader.heartbeat(SNAPSHOT_DIR)
+                else:
+                    load_shared_snapshot()
+            except Exception as e:
+                logging.error(f"Критическая ошибка в цикле обновления кэша: {e}")
+                if notify_callback:
+                    notify_callback(f"🚨 Критическая ошибка обновления кэша: {e}")
+            threading.Event().wait(SNAPSHOT_POLL_SECONDS)
+
+    t = threading.Thread(target=_loop, daemon=True)
+    t.start()
+    logging.info(f"🚀 Режим auto: обновитель кэша выбирается через {SNAPSHOT_DIR}")
+
+
+# ================= SEARCH =================
+
 def find_employee_in_cache(employee_id: str, role: str):
     """
     Ищет сотрудника в кэше по табельному номеру и роли.
@@ -121,109 +643,317 @@ def find_employee_in_cache(employee_id: str, role: str):
     Returns:
         dict с данными сотрудника или None если не найден
     """
-    from utils.helpers import normalize_id
+    snapshot = get_snapshot()
+    pos = _find_pos(snapshot, employee_id, role)
+    return None if pos is None else dict(snapshot["employees"][pos])
 
-    logging.info(f"🔍 Поиск {employee_id} (роль: {role}) в кэше")
 
-    with _cache_lock:
-        sheets_data = dict(_cache.get(role, {}))
+def find_employee_reply(employee_id: str, role: str, with_id: bool = False) -> tuple:
+    """
+    Ищет сотрудника и готовый текст ответа с его карточкой (utils/templates.py).
+
+    Args:
+        employee_id: табельный номер
+        role: роль (admin/mfu)
+        with_id: вариант карточки со строкой табельного
+
+    Returns:
+        (dict сотрудника, текст) или (None, None) если не найден
+    """
+    snapshot = get_snapshot()
+    pos = _find_pos(snapshot, employee_id, role)
+    if pos is None:
+        return None, None
+    return dict(snapshot["employees"][pos]), snapshot["replies"][2 * pos + with_id]
+
+
+def get_reply_text(emp: dict, with_id: bool = True, snapshot: dict = None) -> str:
+    """
+    Готовый текст карточки для сотрудника из результатов поиска.
+
+    Сотрудник с тем же табельным может встретиться в нескольких таблицах —
+    готовый текст есть только у первого вхождения, для остальных карточка
+    собирается по шаблону.
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+    pos = snapshot["by_id"].get(emp["role"], {}).get(emp["employee_id"])
+    if pos is None or snapshot["employees"][pos] != emp:
+        return employee_card(emp, emp["role"], with_id)
+    return snapshot["replies"][2 * pos + with_id]
+
+
+def iter_employees_by_ids(employee_ids, snapshot: dict = None):
+    """
+    Пакетный поиск по табельным: по одному обращению к индексу на номер и роль.
+
+    Args:
+        employee_ids: итератор нормализованных табельных
+        snapshot: снимок; None — текущий (один на весь пакет)
+
+    Yields:
+        (табельный, [сотрудники]) — обе роли; пустой список — не найден
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+    by_id = snapshot["by_id"]
+    employees = snapshot["employees"]
+    for employee_id in employee_ids:
+        found = []
+        for role in ("admin", "mfu"):
+            pos = by_id[role].get(employee_id)
+            if pos is not None:
+                found.append(employees[pos])
+        yield employee_id, found
+
+
+def iter_employees(role: str = None, pvz: str = None, city: str = None, snapshot: dict = None):
+    """
+    Обходит сотрудников снимка с фильтрами — по одному, без списка в памяти.
 
-    if not sheets_data:
+    Args:
+        role: admin/mfu; None — обе роли
+        pvz: ПВЗ (любое написание) — точное совпадение нормализованного названия
+        city: город (любое написание) — все ПВЗ с этим кодом города
+        snapshot: снимок; None — текущий
+
+    Yields:
+        словари сотрудников в порядке снимка (администраторы, затем МФУ)
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+    employees = snapshot["employees"]
+
+    if pvz:
+        pvz = normalize_pvz(pvz)
+        # Кандидаты — из индекса по номеру ПВЗ, а не полный обход
+        source = (employees[pos] for pos in snapshot["by_pvz"].get(extract_pvz_number(pvz), []))
+    else:
+        source = iter(employees)
+    city_prefix = f"{normalize_city(city)}-" if city else None
+
+    for emp in source:
+        if role and emp["role"] != role:
+            continue
+        if pvz and emp["pvz_normalized"] != pvz:
+            continue
+        if city_prefix and not emp["pvz_normalized"].startswith(city_prefix):
+            continue
+        yield emp
+
+
+def _find_pos(snapshot: dict, employee_id: str, role: str):
+    """Позиция сотрудника в снимке по табельному и роли; None — не найден."""
+    if not snapshot["employees"]:
         logging.warning("Кэш пустой — данные ещё не загружены")
         return None
 
     employee_id = normalize_id(employee_id)
+    pos = snapshot["by_id"].get(role, {}).get(employee_id)
+
+    if pos is None:
+        logging.warning("❌ %s (роль: %s) не найден в кэше", employee_id, role, extra=LOOKUP_EVENT)
+        return None
+
+    emp = snapshot["employees"][pos]
+    logging.info(
+        "🎉 Найден сотрудник %s (роль: %s): %s (%s)",
+        employee_id, role, emp["pvz"], emp["fio"], extra=LOOKUP_EVENT,
+    )
+    _record_hit(snapshot, pos)
+    return pos
+
+
+def _record_hit(snapshot: dict, pos: int):
+    """Отмечает спрос на таблицу сотрудника — её обновление придёт раньше."""
+    starts = snapshot.get("sheet_starts")
+    if starts:
+        refresh_scheduler.record_hit(snapshot["sheet_ids"][bisect_right(starts, pos) - 1])
+
+
+def _id_edit_candidates(employee_id: str):
+    """
+    Перебирает табельные на расстоянии одной правки:
+    замена цифры, перестановка соседних, удаление, вставка.
+    """
+    digits = "0123456789"
+    n = len(employee_id)
+    for i in range(n):
+        for d in digits:
+            if d != employee_id[i]:
+                yield employee_id[:i] + d + employee_id[i + 1:]
+    for i in range(n - 1):
+        if employee_id[i] != employee_id[i + 1]:
+            yield employee_id[:i] + employee_id[i + 1] + employee_id[i] + employee_id[i + 2:]
+    for i in range(n):
+        yield employee_id[:i] + employee_id[i + 1:]
+    for i in range(n + 1):
+        for d in digits:
+            yield employee_id[:i] + d + employee_id[i:]
+
+
+def suggest_employee_ids(employee_id: str, role: str, pvz: str,
+                         limit: int = ID_SUGGESTIONS_MAX, snapshot: dict = None) -> list:
+    """
+    Подбирает похожие табельные, когда введённый не найден.
 
-    for spreadsheet_id, records in sheets_data.items():
-        data = _get_employee_data(employee_id, records)
-        if data:
-            return data
+    Сначала — номера на расстоянии одной правки (опечатка, перестановка,
+    пропущенная или лишняя цифра), затем соседи по общему префиксу
+    в отсортированном массиве. Каждая проверка — обращение к индексу,
+    таблицы не сканируются.
 
-    logging.warning(f"❌ {employee_id} (роль: {role}) не найден в кэше")
-    return None
+    Подсказки — только сотрудники ПВЗ пользователя: иначе каждый промах
+    раскрывал бы чужие действующие табельные (перебор номеров).
 
+    Args:
+        employee_id: ненайденный табельный
+        role: роль (admin/mfu)
+        pvz: нормализованный ПВЗ пользователя; без него подсказок нет
+        limit: максимум подсказок
 
-def _get_employee_data(employee_id: str, records: list):
-    """Извлекает данные сотрудника из списка записей."""
-    from utils.helpers import normalize_id
+    Returns:
+        список табельных (без остальных данных сотрудников)
+    """
+    if not pvz:
+        return []
+    if snapshot is None:
+        snapshot = get_snapshot()
 
     employee_id = normalize_id(employee_id)
-    for row in records:
-        table_id = normalize_id(row.get("Табельный номер", ""))
-        if table_id == employee_id:
-            logging.info(
-                f"🎉 Найден сотрудник {employee_id}: "
-                f"{row.get('ПВЗ', 'N/A')} ({row.get('ФИО', 'N/A')})"
-            )
-            return {
-                "fio": row.get("ФИО", "N/A"),
-                "pvz": row.get("ПВЗ", "N/A"),
-                "fact": row.get("Факт", "N/A"),
-                "open_limits": row.get("Открыто Лимитов", "N/A"),
-                "plan_limits": row.get("План по лимитам", "N/A"),
-                "execution": row.get("Выполнение плана по лимитам", "N/A"),
-                "virtual_cards": row.get(" 📱Оформленно виртуальных карт", "N/A"),
-                "plastic_cards": row.get("💷Оформленно пластиковых карт", "N/A"),
-                "vchl": row.get("ВЧЛ", "N/A"),
-                "employee_id": table_id,
-            }
-    return None
-
-
-def search_employees_by_name(search_query: str) -> list:
-    """
-    Ищет сотрудников по частичному совпадению ФИО.
+    by_id = snapshot["by_id"].get(role, {})
+    employees = snapshot["employees"]
+    suggestions = []
+
+    def _accept(candidate: str) -> bool:
+        pos = by_id.get(candidate)
+        if pos is None or candidate in suggestions:
+            return False
+        if employees[pos]["pvz_normalized"] != pvz:
+            return False
+        suggestions.append(candidate)
+        return len(suggestions) >= limit
+
+    for candidate in _id_edit_candidates(employee_id):
+        if _accept(candidate):
+            return suggestions
+
+    # Соседи в отсортированном массиве с общим префиксом
+    sorted_ids = snapshot["id_sorted"].get(role, [])
+    min_prefix = max(3, len(employee_id) - 2)
+    i = bisect_left(sorted_ids, employee_id)
+    for j in (i - 1, i, i - 2, i + 1):
+        if 0 <= j < len(sorted_ids) and sorted_ids[j][:min_prefix] == employee_id[:min_prefix]:
+            if _accept(sorted_ids[j]):
+                break
+
+    return suggestions
+
+
+def search_employees_by_name(search_query: str, snapshot: dict = None) -> list:
+    """
+    Ищет сотрудников по ФИО: кириллица и латиница равнозначны, опечатки
+    допускаются (см. utils/name_search.py).
 
     Args:
-        search_query: строка для поиска (имя или фамилия)
+        search_query: строка для поиска (имя и/или фамилия)
+        snapshot: снимок для поиска; None — текущий
 
     Returns:
-        список словарей с данными найденных сотрудников
+        список словарей с данными найденных сотрудников, лучшие совпадения первыми
         [{"fio": "...", "employee_id": "...", "pvz": "...", "role": "admin/mfu"}, ...]
     """
-    from utils.helpers import normalize_id
-
-    search_query = search_query.strip().upper()
+    search_query = search_query.strip()
     if not search_query:
         return []
 
-    logging.info(f"🔍 Поиск сотрудников по запросу: {search_query}")
+    if snapshot is None:
+        snapshot = get_snapshot()
+
+    employees = snapshot["employees"]
+    results = [employees[pos] for pos in search_names(snapshot["name_index"], search_query)]
+
+    logging.info("🔍 Поиск по запросу %s: найдено %d сотрудников", search_query, len(results), extra=SEARCH_EVENT)
+    return results
+
+
+def prefix_search_ids(prefix: str, limit: int = 50, snapshot: dict = None) -> list:
+    """
+    Ищет сотрудников, чей табельный начинается с prefix (обе роли).
 
+    Returns:
+        список словарей сотрудников, отсортированный по табельному
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+
+    prefix = normalize_id(prefix)
+    lo, hi = _prefix_range(snapshot["id_keys"], prefix)
+    employees = snapshot["employees"]
+    return [employees[pos] for pos in snapshot["id_pos"][lo:min(hi, lo + limit)]]
+
+
+def prefix_search_pvz(pvz_query: str, limit: int = 50, snapshot: dict = None) -> list:
+    """
+    Ищет сотрудников ПВЗ, нормализованное название которых начинается с запроса.
+
+    Returns:
+        список словарей сотрудников; точное совпадение названия идёт первым
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+
+    lo, hi = _prefix_range(snapshot["pvz_keys"], normalize_pvz(pvz_query))
+    employees = snapshot["employees"]
     results = []
+    for positions in snapshot["pvz_pos"][lo:hi]:
+        for pos in positions:
+            results.append(employees[pos])
+            if len(results) >= limit:
+                return results
+    return results
 
-    with _cache_lock:
-        cache_copy = {"admin": dict(_cache["admin"]), "mfu": dict(_cache["mfu"])}
 
-    for role in ("admin", "mfu"):
-        for spreadsheet_id, records in cache_copy[role].items():
-            for row in records:
-                fio = row.get("ФИО", "").upper()
-                if search_query in fio:
-                    employee_id = normalize_id(row.get("Табельный номер", ""))
-                    results.append({
-                        "fio": row.get("ФИО", "N/A"),
-                        "employee_id": employee_id,
-                        "pvz": row.get("ПВЗ", "N/A"),
-                        "role": role,
-                    })
-
-    logging.info(f"✅ Найдено {len(results)} сотрудников")
+def prefix_search_names(prefix: str, limit: int = 50, snapshot: dict = None) -> list:
+    """
+    Ищет сотрудников, у которых какое-либо слово ФИО начинается с prefix
+    (сравнение по транслитерированному скелету).
+
+    Returns:
+        список словарей сотрудников без повторов
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+
+    prefix = translit_key(prefix)
+    if not prefix:
+        return []
+
+    lo, hi = _prefix_range(snapshot["name_keys"], prefix)
+    employees = snapshot["employees"]
+    seen = set()
+    results = []
+    for pos in snapshot["name_pos"][lo:hi]:
+        if pos in seen:
+            continue
+        seen.add(pos)
+        results.append(employees[pos])
+        if len(results) >= limit:
+            break
     return results
 
 
-def search_employees_by_pvz(pvz_query: str) -> list:
+def search_employees_by_pvz(pvz_query: str, snapshot: dict = None) -> list:
     """
     Ищет всех сотрудников конкретного ПВЗ по точному совпадению номера.
 
     Args:
         pvz_query: название ПВЗ (например: "ТАШ-5", "Таш-5", "tash-5")
+        snapshot: снимок для поиска; None — текущий
 
     Returns:
-        список словарей с данными найденных сотрудников
+        список словарей с данными найденных сотрудников (сначала администраторы)
         [{"fio": "...", "employee_id": "...", "pvz": "...", "role": "admin/mfu"}, ...]
     """
-    from utils.helpers import normalize_id, normalize_pvz, extract_pvz_number
-
     if not pvz_query:
         return []
 
@@ -235,36 +965,14 @@ def search_employees_by_pvz(pvz_query: str) -> list:
         logging.warning(f"Не удалось извлечь номер из запроса: {pvz_query}")
         return []
 
-    logging.info(f"🔍 Поиск сотрудников ПВЗ: {normalized_query} (номер: {query_number})")
-
-    results = []
+    if snapshot is None:
+        snapshot = get_snapshot()
 
-    with _cache_lock:
-        cache_copy = {"admin": dict(_cache["admin"]), "mfu": dict(_cache["mfu"])}
+    employees = snapshot["employees"]
+    results = [employees[pos] for pos in snapshot["by_pvz"].get(query_number, [])]
 
-    for role in ("admin", "mfu"):
-        for spreadsheet_id, records in cache_copy[role].items():
-            for row in records:
-                pvz_name = row.get("ПВЗ", "")
-                if not pvz_name:
-                    continue
-
-                # Нормализуем ПВЗ из таблицы
-                normalized_pvz = normalize_pvz(pvz_name)
-                pvz_number = extract_pvz_number(normalized_pvz)
-
-                # Сравниваем только номера (точное совпадение)
-                if pvz_number == query_number:
-                    employee_id = normalize_id(row.get("Табельный номер", ""))
-                    results.append({
-                        "fio": row.get("ФИО", "N/A"),
-                        "employee_id": employee_id,
-                        "pvz": pvz_name,  # Оригинальное название из таблицы
-                        "pvz_normalized": normalized_pvz,
-                        "role": role,
-                        "fact": row.get("Факт", "N/A"),
-                        "vchl": row.get("ВЧЛ", "N/A"),
-                    })
-
-    logging.info(f"✅ Найдено {len(results)} сотрудников в ПВЗ {normalized_query}")
+    logging.info(
+        "🔍 Поиск ПВЗ %s (номер: %s): найдено %d сотрудников",
+        normalized_query, query_number, len(results), extra=SEARCH_EVENT,
+    )
     return results
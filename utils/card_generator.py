@@ -1,10 +1,16 @@
 """
 Генерация PNG-карточки сотрудника через Pillow.
 Иконки из assets/icons/*.png (64x64 RGBA).
+
+Шрифты и иконки загружаются один раз и кэшируются; warm_up() загружает их
+заранее (вызывается в фоне после запуска бота, см. utils/startup.py).
+Модуль импортируется лениво — Pillow не нужен, пока никто не делится карточкой.
 """
 
 import io
 import os as _os
+import threading
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 from .card_constants import (
     BG, CARD, GREEN, RED, YELLOW, WHITE, MUTED, DIVIDER,
@@ -20,8 +26,25 @@ _BASE     = _os.path.dirname(_os.path.abspath(__file__))
 _FONT_DIR = _os.path.join(_BASE, "..", "assets", "fonts")
 _ICON_DIR = _os.path.join(_BASE, "..", "assets", "icons")
 
-_REG  = lambda s: ImageFont.truetype(_os.path.join(_FONT_DIR, "DejaVuSans.ttf"), s)
-_BOLD = lambda s: ImageFont.truetype(_os.path.join(_FONT_DIR, "DejaVuSans-Bold.ttf"), s)
+
+@lru_cache(maxsize=None)
+def _font(name: str, size: int):
+    return ImageFont.truetype(_os.path.join(_FONT_DIR, name), size)
+
+
+_REG  = lambda s: _font("DejaVuSans.ttf", s)
+_BOLD = lambda s: _font("DejaVuSans-Bold.ttf", s)
+
+# Объекты шрифтов общие для всех потоков — рендер карточек по одной
+_render_lock = threading.Lock()
+
+_FONT_SIZES = (
+    FONT_SIZE_TITLE, FONT_SIZE_SUBTITLE, FONT_SIZE_LABEL,
+    FONT_SIZE_VALUE_LARGE, FONT_SIZE_VALUE_MEDIUM, FONT_SIZE_VALUE_SMALL,
+    FONT_SIZE_FOOTER,
+)
+_ICONS = (("clock", ICON_SIZE), ("chart", ICON_SIZE), ("card", ICON_SIZE),
+          ("play", ICON_SIZE), ("check", ICON_SIZE), ("check", 32))
 
 W   = CARD_WIDTH
 PAD = PADDING
@@ -43,13 +66,34 @@ def _initials(name: str) -> str:
     return "".join(p[0] for p in name.split() if p)[:2].upper()
 
 
-def _paste_icon(base: Image.Image, name: str, x: int, y: int, size: int = ICON_SIZE):
+@lru_cache(maxsize=None)
+def _icon(name: str, size: int) -> Image.Image:
     path = _os.path.join(_ICON_DIR, f"{name}.png")
-    icon = Image.open(path).convert("RGBA").resize((size, size), Image.LANCZOS)
+    with Image.open(path) as src:
+        return src.convert("RGBA").resize((size, size), Image.LANCZOS)
+
+
+def _paste_icon(base: Image.Image, name: str, x: int, y: int, size: int = ICON_SIZE):
+    icon = _icon(name, size)
     base.paste(icon, (x, y), icon)
 
 
+def warm_up():
+    """Загружает шрифты и иконки и рисует пробную карточку (кодеки PNG)."""
+    for size in _FONT_SIZES:
+        _REG(size)
+        _BOLD(size)
+    for name, size in _ICONS:
+        _icon(name, size)
+    generate_card({"fio": "Прогрев", "vchl": "100%"}, "admin")
+
+
 def generate_card(data: dict, role: str) -> bytes:
+    with _render_lock:
+        return _render(data, role)
+
+
+def _render(data: dict, role: str) -> bytes:
     img  = Image.new("RGB", (W, 820), BG)
     draw = ImageDraw.Draw(img)
     y    = PAD
@@ -0,0 +1,108 @@
+"""
+Выгрузка сотрудников в файл: CSV или XLSX.
+
+Строки пишутся по одной прямо в файл по мере обхода — большой выгрузке не
+нужен промежуточный список. Файл временный (SpooledTemporaryFile): пока он
+небольшой, лежит в памяти, иначе уходит на диск. Вызывать в потоке
+(asyncio.to_thread) — запись занимает сотни миллисекунд на тысячах строк.
+
+openpyxl — необязательная зависимость: без неё XLSX недоступен, выгрузка
+делается в CSV.
+"""
+
+import csv
+import gzip
+import io
+import tempfile
+
+# Колонки выгрузки: (заголовок, поле сотрудника)
+COLUMNS = (
+    ("Табельный номер", "employee_id"),
+    ("Роль", "role"),
+    ("ФИО", "fio"),
+    ("ПВЗ", "pvz"),
+    ("Факт", "fact"),
+    ("Открыто лимитов", "open_limits"),
+    ("План по лимитам", "plan_limits"),
+    ("Выполнение", "execution"),
+    ("Виртуальные карты", "virtual_cards"),
+    ("Пластиковые карты", "plastic_cards"),
+    ("ВЧЛ", "vchl"),
+)
+ROLE_LABELS = {"admin": "Администратор", "mfu": "МФУ"}
+
+# До какого размера временный файл держится в памяти
+SPOOL_MAX_BYTES = 1024 * 1024
+# Excel в русской локали ожидает «;» и BOM, иначе кириллица и колонки съезжают
+CSV_DELIMITER = ";"
+
+
+def xlsx_available() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def employee_row(emp: dict) -> list:
+    row = [emp.get(field, "") for _, field in COLUMNS]
+    row[1] = ROLE_LABELS.get(row[1], row[1])
+    return row
+
+
+def write_csv(employees, extra_sheets: dict = None, compress: bool = False):
+    """
+    Пишет сотрудников в CSV.
+
+    Args:
+        employees: итератор словарей сотрудников
+        extra_sheets: {название: [значения]} — в CSV дописываются после
+            пустой строки отдельным блоком (в XLSX это отдельные листы)
+        compress: сжимать gzip на лету (файл .csv.gz)
+
+    Returns:
+        (файл, открытый на чтение с начала, число строк сотрудников)
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    raw = gzip.GzipFile(fileobj=f, mode="wb", mtime=0) if compress else f
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text, delimiter=CSV_DELIMITER)
+    writer.writerow([title for title, _ in COLUMNS])
+    count = 0
+    for emp in employees:
+        writer.writerow(employee_row(emp))
+        count += 1
+    for title, values in (extra_sheets or {}).items():
+        writer.writerow([])
+        writer.writerow([title])
+        for value in values:
+            writer.writerow([value])
+    text.flush()
+    text.detach()
+    if compress:
+        raw.close()     # дописывает хвост gzip; сам f остаётся открытым
+    f.seek(0)
+    return f, count
+
+
+def write_xlsx(employees, extra_sheets: dict = None):
+    """То же, что write_csv, но в XLSX (openpyxl в режиме write_only)."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Сотрудники")
+    ws.append([title for title, _ in COLUMNS])
+    count = 0
+    for emp in employees:
+        ws.append(employee_row(emp))
+        count += 1
+    for title, values in (extra_sheets or {}).items():
+        extra = wb.create_sheet(title[:31])
+        for value in values:
+            extra.append([value])
+
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    wb.save(f)
+    f.seek(0)
+    return f, count
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import re
 
 TZ_TASHKENT = timezone(timedelta(hours=5))
@@ -26,6 +27,56 @@ def normalize_id(value) -> str:
     )
 
 
+# ================= PVZ =================
+#
+# Таблица алиасов: короткий код города -> варианты написания.
+# Дополняется из файла PVZ_ALIASES_FILE и листа реестра (см. set_pvz_aliases).
+
+PVZ_CITY_ALIASES = {
+    "ТАШ": ("ТАШКЕНТ", "TASHKENT", "TASH", "ТАSH"),
+    "САМ": ("САМАРКАНД", "SAMARKAND", "SAMAR", "SAM"),
+    "БУХ": ("БУХАРА", "BUKHARA", "BUKH", "BUH"),
+    "АНД": ("АНДИЖАН", "ANDIJAN", "ANDI", "AND"),
+    "НАМ": ("НАМАНГАН", "NAMANGAN", "NAMA", "NAM"),
+    "ФЕР": ("ФЕРГАНА", "FERGANA", "FERG", "FER"),
+    "ХИВ": ("ХИВА", "KHIVA", "XIVA", "HIV"),
+    "НУК": ("НУКУС", "NUKUS", "NUK"),
+}
+
+_PVZ_RE = re.compile(r'^([А-ЯA-Z]+)[\s\-]*(\d+)$')
+_PVZ_NUMBER_RE = re.compile(r'(\d+)')
+
+_pvz_city_map: dict = {}
+
+
+def _build_city_map(aliases: dict) -> dict:
+    city_map = {}
+    for code, variants in aliases.items():
+        city_map[code] = code
+        for variant in variants:
+            city_map[variant.strip().upper()] = code
+    return city_map
+
+
+def set_pvz_aliases(extra: dict = None):
+    """
+    Пересобирает таблицу замен городов и сбрасывает мемоизацию.
+
+    Args:
+        extra: дополнительные алиасы {"вариант": "КОД"}; перекрывают встроенные
+    """
+    city_map = _build_city_map(PVZ_CITY_ALIASES)
+    for alias, code in (extra or {}).items():
+        alias, code = alias.strip().upper(), code.strip().upper()
+        if alias and code:
+            city_map[alias] = code
+
+    global _pvz_city_map
+    _pvz_city_map = city_map
+    normalize_pvz.cache_clear()
+
+
+@lru_cache(maxsize=4096)
 def normalize_pvz(pvz_name: str) -> str:
     """
     Нормализует название ПВЗ к единому формату.
@@ -46,65 +97,15 @@ def normalize_pvz(pvz_name: str) -> str:
     # Убираем лишние пробелы и приводим к верхнему регистру
     pvz = pvz_name.strip().upper()
 
-    # Словарь замен для разных вариантов написания городов
-    city_replacements = {
-        "ТАШКЕНТ": "ТАШ",
-        "TASHKENT": "ТАШ",
-        "TASH": "ТАШ",
-        "ТАШ": "ТАШ",
-        "ТАSH": "ТАШ",
-
-        "САМАРКАНД": "САМ",
-        "SAMARKAND": "САМ",
-        "SAMAR": "САМ",
-        "SAM": "САМ",
-        "САМ": "САМ",
-
-        "БУХАРА": "БУХ",
-        "BUKHARA": "БУХ",
-        "BUKH": "БУХ",
-        "BUH": "БУХ",
-        "БУХ": "БУХ",
-
-        "АНДИЖАН": "АНД",
-        "ANDIJAN": "АНД",
-        "ANDI": "АНД",
-        "AND": "АНД",
-        "АНД": "АНД",
-
-        "НАМАНГАН": "НАМ",
-        "NAMANGAN": "НАМ",
-        "NAMA": "НАМ",
-        "NAM": "НАМ",
-        "НАМ": "НАМ",
-
-        "ФЕРГАНА": "ФЕР",
-        "FERGANA": "ФЕР",
-        "FERG": "ФЕР",
-        "FER": "ФЕР",
-        "ФЕР": "ФЕР",
-
-        "ХИВА": "ХИВ",
-        "KHIVA": "ХИВ",
-        "XIVA": "ХИВ",
-        "HIV": "ХИВ",
-        "ХИВ": "ХИВ",
-
-        "НУКУС": "НУК",
-        "NUKUS": "НУК",
-        "NUK": "НУК",
-        "НУК": "НУК",
-    }
-
     # Ищем паттерн: буквы + дефис/пробел + цифры
-    match = re.match(r'^([А-ЯA-Z]+)[\s\-]*(\d+)$', pvz)
+    match = _PVZ_RE.match(pvz)
 
     if match:
         city_part = match.group(1)
         number_part = match.group(2)
 
         # Заменяем город на короткий код
-        normalized_city = city_replacements.get(city_part, city_part[:3])
+        normalized_city = _pvz_city_map.get(city_part, city_part[:3])
 
         return f"{normalized_city}-{number_part}"
 
@@ -112,6 +113,19 @@ def normalize_pvz(pvz_name: str) -> str:
     return pvz
 
 
+def normalize_city(city: str) -> str:
+    """
+    Приводит название города к коду, как в названиях ПВЗ.
+
+    Примеры:
+        "Ташкент" -> "ТАШ"
+        "samarkand" -> "САМ"
+    """
+    city = city.strip().upper()
+    return _pvz_city_map.get(city, city[:3])
+
+
+@lru_cache(maxsize=4096)
 def extract_pvz_number(pvz_name: str) -> str:
     """
     Извлекает только номер из названия ПВЗ.
@@ -124,6 +138,8 @@ def extract_pvz_number(pvz_name: str) -> str:
     Returns:
         Номер ПВЗ или пустую строку
     """
-    match = re.search(r'(\d+)', pvz_name)
+    match = _PVZ_NUMBER_RE.search(pvz_name)
     return match.group(1) if match else ""
 
+
+set_pvz_aliases()
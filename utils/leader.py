@@ -0,0 +1,101 @@
+"""
+Выбор обновителя кэша среди нескольких процессов (CACHE_MODE=auto).
+
+Лидер — процесс, который держит блокировку файла LEADER.lock в SNAPSHOT_DIR
+(fcntl.lockf: работает и на локальном диске, и на общем NFS-диске).
+Только лидер ходит в Google и записывает снимки; остальные процессы —
+последователи: читают снимки лидера и раз в SNAPSHOT_POLL_SECONDS
+пробуют взять блокировку. Если лидер умер, ядро (или NFS-сервер)
+снимает его блокировку, и один из последователей становится лидером
+в пределах интервала опроса.
+
+Кто лидер и когда он последний раз публиковал снимок — в файле LEADER
+(JSON), его показывает /status.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import time
+
+from config import INSTANCE_NAME
+
+LOCK_FILE = "LEADER.lock"
+INFO_FILE = "LEADER"
+
+# Открытый файл блокировки, пока процесс — лидер
+_lock_fd = None
+_info: dict = {}
+
+
+def is_leader() -> bool:
+    return _lock_fd is not None
+
+
+def try_acquire(directory: str) -> bool:
+    """
+    Пытается стать лидером, не блокируясь.
+
+    Returns:
+        True если процесс лидер (стал сейчас или уже был)
+    """
+    global _lock_fd, _info
+    if _lock_fd is not None:
+        return True
+
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+
+    _lock_fd = fd
+    previous = read_info(directory)
+    now = time.time()
+    _info = {
+        "instance": INSTANCE_NAME,
+        "pid": os.getpid(),
+        "since": now,
+        "heartbeat": now,
+        # Время последней публикации переходит от прежнего лидера до нашей первой
+        "published_at": previous.get("published_at") if previous else None,
+        "version": previous.get("version") if previous else None,
+    }
+    _write_info(directory)
+    logging.info(f"👑 {INSTANCE_NAME} стал обновителем кэша"
+                 + (f" (прежний: {previous['instance']})" if previous else ""))
+    return True
+
+
+def heartbeat(directory: str, published_at: float = None, version: int = None):
+    """Лидер отмечает, что жив, и (после публикации) время и версию снимка."""
+    if _lock_fd is None:
+        return
+    _info["heartbeat"] = time.time()
+    if published_at is not None:
+        _info["published_at"] = published_at
+        _info["version"] = version
+    _write_info(directory)
+
+
+def _write_info(directory: str):
+    path = os.path.join(directory, INFO_FILE)
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_info, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        logging.warning(f"Не удалось записать {path}: {e}")
+
+
+def read_info(directory: str) -> dict:
+    """Сведения о лидере из файла LEADER; пустой словарь — лидера ещё не было."""
+    try:
+        with open(os.path.join(directory, INFO_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
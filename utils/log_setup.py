@@ -0,0 +1,166 @@
+"""
+Настройка логирования: запись в фоновом потоке, JSON, выборка частых событий.
+
+Обработчики запросов не ждут вывода в консоль и на диск: корневой логгер
+только кладёт запись в очередь (QueueHandler), а форматирует и пишет её
+фоновый поток (QueueListener). Сообщения на горячих путях — с ленивыми
+аргументами (`logging.info("… %s", x)`), строка собирается уже в фоновом
+потоке и только для записей, которые дойдут до вывода.
+
+Частые события (поиск сотрудника, поиск по ПВЗ и ФИО) помечаются
+`extra={"event": "lookup"}` и пишутся выборочно — с долей из LOG_SAMPLE:
+
+    LOG_SAMPLE=lookup=0.1,search=0.5   — каждое 10-е и каждое 2-е событие
+
+Отброшенные записи считаются в метрике log_sampled_out_total. Ошибки
+(ERROR и выше) пишутся всегда.
+
+Вывод — в консоль и, если задан LOG_FILE, в файл с ротацией по размеру
+(LOG_MAX_MB, LOG_BACKUPS). LOG_FORMAT=json — записи одной строкой JSON
+(время, уровень, логгер, сообщение, событие и поля из extra); в файл
+по умолчанию пишется JSON, в консоль — текст.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+from config import LOG_LEVEL, LOG_FORMAT, LOG_FILE, LOG_MAX_MB, LOG_BACKUPS, LOG_SAMPLE
+from utils import metrics
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Атрибуты, которые есть у любой записи — всё остальное пришло из extra
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+_listener = None
+
+
+# ================= FORMAT =================
+
+class JsonFormatter(logging.Formatter):
+    """Запись одной строкой JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _formatter(fmt: str) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+# ================= SAMPLING =================
+
+def parse_sample_rates(value: str) -> dict:
+    """«lookup=0.1,search=0.5» -> {"lookup": 10, "search": 2} — писать каждое N-е."""
+    rates = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        event, _, rate = part.partition("=")
+        rate = float(rate)
+        if not 0 < rate <= 1:
+            raise ValueError(f"LOG_SAMPLE: доля для {event.strip()} должна быть в (0, 1] ⚠️")
+        rates[event.strip()] = max(1, round(1 / rate))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает каждое N-е событие с полем event из таблицы выборки.
+    Счётчик, а не случайность: доля точная и не зависит от нагрузки.
+    """
+
+    def __init__(self, every: dict):
+        super().__init__()
+        self.every = every
+        self._counters = {event: itertools.count() for event in every}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        n = self.every.get(event)
+        if n is None or n == 1 or record.levelno >= logging.ERROR:
+            return True
+        if next(self._counters[event]) % n == 0:
+            return True
+        metrics.inc("log_sampled_out_total", event=event)
+        return False
+
+
+# ================= QUEUE =================
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладёт запись в очередь как есть. Стандартный QueueHandler форматирует
+    сообщение ещё в потоке обработчика (prepare) — ради передачи между
+    процессами, которой здесь нет; форматирование уходит в фоновый поток.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging():
+    """
+    Подключает очередь к корневому логгеру и запускает фоновый поток записи.
+    Повторный вызов ничего не делает.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(_formatter(LOG_FORMAT))
+    handlers = [console]
+    if LOG_FILE:
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE,
+            maxBytes=LOG_MAX_MB * 1024 * 1024,
+            backupCount=LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE)))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Дописывает записи из очереди и останавливает фоновый поток."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
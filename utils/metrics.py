@@ -0,0 +1,259 @@
+"""
+Метрики процесса в формате Prometheus и проверка готовности.
+
+    • счётчики и гистограммы хранятся в обычных словарях под одной блокировкой —
+      запись метрики на горячем пути стоит пару микросекунд;
+    • значения «на момент опроса» (возраст снимка кэша, число записей...)
+      считаются функциями-датчиками только когда их запрашивают;
+    • если задан METRICS_PORT, в фоновом потоке поднимается HTTP-сервер:
+        /metrics — текстовый формат Prometheus
+        /healthz — 200, если снимок кэша свежее HEALTHZ_MAX_AGE_SECONDS, иначе 503
+"""
+
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_PORT, HEALTHZ_MAX_AGE_SECONDS
+
+
+# Границы корзин гистограмм (сек): от быстрых поисков до загрузки таблиц
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+
+# имя -> описание (для датчиков задаётся в register_gauge)
+_help: dict = {
+    "handler_latency_seconds": "Время обработки апдейта обработчиком",
+    "handler_errors_total": "Необработанные исключения в обработчиках",
+    "bot_errors_total": "Ошибки, дошедшие до глобального error_handler",
+    "rate_limit_rejections_total": "Запросы, отклонённые rate limiter",
+    "lookups_total": "Поиски по табельному",
+    "card_render_seconds": "Генерация PNG-карточки",
+    "cache_refresh_seconds": "Длительность полного обновления кэша",
+    "cache_refresh_total": "Обновления кэша по результату",
+    "sheet_fetch_seconds": "Загрузка одного листа Google Sheets",
+    "sheet_fetch_errors_total": "Ошибки загрузки листов Google Sheets",
+    "webhook_requests_total": "Запросы к webhook по коду ответа",
+    "snapshot_write_seconds": "Запись общего снимка кэша на диск",
+    "result_cache_total": "Обращения к кэшу ответов поиска по результату",
+    "log_sampled_out_total": "Записи лога, отброшенные выборкой, по событию",
+    "sheet_refresh_total": "Чтения таблиц реестра по расписанию по результату",
+}
+# (имя, ((метка, значение), ...)) -> число
+_counters: dict = {}
+# (имя, метки) -> [счётчики по корзинам..., +Inf], сумма, количество
+_histograms: dict = {}
+# имя -> функция без аргументов, возвращающая число или {метки: число}
+_gauges: dict = {}
+
+# Время публикации последнего снимка кэша (time.time()), 0 — ещё не было
+_last_publish = 0.0
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Увеличивает счётчик."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels):
+    """Добавляет наблюдение в гистограмму."""
+    key = _key(name, labels)
+    idx = bisect_left(BUCKETS, seconds)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        hist[0][idx] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+
+def register_gauge(name: str, func, help: str = ""):
+    """Регистрирует датчик — значение вычисляется при каждом опросе /metrics."""
+    with _lock:
+        _gauges[name] = func
+        if help:
+            _help[name] = help
+
+
+class timer:
+    """Контекстный менеджер: `with timer("sheet_fetch_seconds", role="admin"): ...`"""
+
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def observe_handler(name: str):
+    """
+    Декоратор async-обработчика PTB: время обработки в handler_latency_seconds
+    и необработанные исключения в handler_errors_total.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(update, context):
+            start = time.perf_counter()
+            try:
+                return await func(update, context)
+            except Exception:
+                inc("handler_errors_total", handler=name)
+                raise
+            finally:
+                observe("handler_latency_seconds", time.perf_counter() - start, handler=name)
+        return wrapper
+    return decorator
+
+
+def mark_snapshot_published(published_at: float = None):
+    """
+    Отмечает публикацию нового снимка кэша (для возраста снимка и /healthz).
+
+    Args:
+        published_at: время публикации (time.time()); по умолчанию — сейчас.
+            Читатель общего снимка передаёт время, когда его записал обновитель.
+    """
+    global _last_publish
+    _last_publish = published_at or time.time()
+
+
+def snapshot_age() -> float:
+    """Возраст последнего снимка кэша в секундах; None — снимка ещё нет."""
+    if not _last_publish:
+        return None
+    return time.time() - _last_publish
+
+
+# ================= EXPOSITION =================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render() -> str:
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: (list(v[0]), v[1], v[2]) for k, v in _histograms.items()}
+        gauges = dict(_gauges)
+        help_text = dict(_help)
+
+    lines = []
+    declared = set()
+
+    def _declare(name: str, kind: str):
+        if name in declared:
+            return
+        declared.add(name)
+        if name in help_text:
+            lines.append(f"# HELP {name} {help_text[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        _declare(name, "counter")
+        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        _declare(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), buckets):
+            cumulative += n
+            le = 'le="%s"' % bound
+            lines.append(f"{name}_bucket{_fmt_labels(labels, le)} {cumulative}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {total}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    for name, func in sorted(gauges.items()):
+        try:
+            value = func()
+        except Exception as e:
+            logging.warning(f"Датчик {name} не ответил: {e}")
+            continue
+        if value is None:
+            continue
+        _declare(name, "gauge")
+        if isinstance(value, dict):
+            for label_items, v in sorted(value.items()):
+                lines.append(f"{name}{_fmt_labels(label_items)} {v}")
+        else:
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def healthz() -> tuple:
+    """
+    Returns:
+        (HTTP-код, текст) — 200, если снимок кэша есть и не старше HEALTHZ_MAX_AGE_SECONDS
+    """
+    age = snapshot_age()
+    if age is None:
+        return 503, "cache not loaded\n"
+    if age > HEALTHZ_MAX_AGE_SECONDS:
+        return 503, f"cache stale: {int(age)}s\n"
+    return 200, f"ok: cache age {int(age)}s\n"
+
+
+# ================= HTTP SERVER =================
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            status, body, ctype = 200, render(), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/healthz":
+            status, body = healthz()
+            ctype = "text/plain; charset=utf-8"
+        else:
+            status, body, ctype = 404, "not found\n", "text/plain; charset=utf-8"
+
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Опросы Prometheus не засоряют лог бота
+        pass
+
+
+def start_metrics_server(port: int = None):
+    """Поднимает HTTP-сервер метрик в фоновом потоке, если задан порт."""
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"📈 Метрики доступны на :{port}/metrics, проверка готовности — /healthz")
+    return server
@@ -0,0 +1,222 @@
+"""
+Нечёткий поиск по ФИО с учётом транслитерации.
+
+ФИО в таблицах записаны то кириллицей, то латиницей ("SAID", "Саид").
+Каждое слово ФИО приводится к единому латинскому «скелету» (translit_key),
+по скелетам строится индекс триграмм. Запрос нормализуется так же, кандидаты
+отбираются по общим триграммам и проверяются ограниченным расстоянием
+Левенштейна. Всё, что зависит только от данных, считается при обновлении кэша.
+"""
+
+from collections import Counter
+
+# ================= TRANSLIT =================
+
+_CYR_TO_LAT = {
+    "А": "A", "Б": "B", "В": "V", "Г": "G", "Д": "D", "Е": "E", "Ё": "YO",
+    "Ж": "J", "З": "Z", "И": "I", "Й": "Y", "К": "K", "Л": "L", "М": "M",
+    "Н": "N", "О": "O", "П": "P", "Р": "R", "С": "S", "Т": "T", "У": "U",
+    "Ф": "F", "Х": "X", "Ц": "S", "Ч": "CH", "Ш": "SH", "Щ": "SH", "Ъ": "",
+    "Ы": "I", "Ь": "", "Э": "E", "Ю": "YU", "Я": "YA",
+    # Узбекская кириллица
+    "Ў": "O", "Қ": "K", "Ғ": "G", "Ҳ": "H",
+}
+
+# Латинские варианты одного звука → одно написание (порядок важен)
+_LAT_DIGRAPHS = (
+    ("SHCH", "SH"),
+    ("KH", "X"),
+    ("ZH", "J"),
+    ("DJ", "J"),
+    ("TS", "S"),
+    ("IU", "YU"),
+    ("IA", "YA"),
+    ("YE", "E"),
+    ("C", "S"),
+    ("Q", "K"),
+    ("W", "V"),
+)
+
+_TRANSLIT_TABLE = str.maketrans({
+    **_CYR_TO_LAT,
+    "'": "", "`": "", "ʻ": "", "ʼ": "", "’": "", "‘": "", "-": " ",
+})
+
+
+def translit_key(text: str) -> str:
+    """
+    Приводит строку к латинскому скелету для сравнения.
+
+    Примеры:
+        "Саид"    -> "SAID"
+        "Юсупов"  -> "YUSUPOV"
+        "Iusupov" -> "YUSUPOV"
+        "Хасанов" -> "XASANOV"
+        "Khasanov"-> "XASANOV"
+    """
+    s = text.upper().translate(_TRANSLIT_TABLE)
+    for src, dst in _LAT_DIGRAPHS:
+        if src in s:
+            s = s.replace(src, dst)
+
+    # Схлопываем удвоенные буквы: "ALLA" == "ALA"
+    out = []
+    for ch in s:
+        if out and out[-1] == ch and ch != " ":
+            continue
+        out.append(ch)
+    return " ".join("".join(out).split())
+
+
+# ================= DISTANCE =================
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Левенштейна с отсечением.
+
+    Returns:
+        расстояние или limit + 1 если оно больше limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(
+                prev[j] + 1,
+                cur[j - 1] + 1,
+                prev[j - 1] + (ca != cb),
+            )
+            if cur[j] < row_min:
+                row_min = cur[j]
+        if row_min > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+def max_typos(token: str) -> int:
+    """Допустимое число опечаток в зависимости от длины слова."""
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 6:
+        return 1
+    return 2
+
+
+# ================= INDEX =================
+#
+# index = {
+#     "tokens":    [скелет слова, ...],         # уникальные
+#     "token_pos": [[pos, ...], ...],           # позиции сотрудников по слову
+#     "grams":     {"SAI": [token_id, ...], ...},
+# }
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_name_index(fio_list: list) -> dict:
+    """Строит индекс триграмм по списку ФИО (позиция в списке = позиция сотрудника)."""
+    token_ids: dict = {}
+    token_pos: list = []
+
+    for pos, fio in enumerate(fio_list):
+        for token in set(translit_key(fio).split()):
+            tid = token_ids.get(token)
+            if tid is None:
+                tid = token_ids[token] = len(token_pos)
+                token_pos.append([])
+            token_pos[tid].append(pos)
+
+    grams: dict = {}
+    for token, tid in token_ids.items():
+        for gram in _trigrams(token):
+            grams.setdefault(gram, []).append(tid)
+
+    return {"tokens": list(token_ids), "token_pos": token_pos, "grams": grams}
+
+
+def _match_token(index: dict, q: str) -> dict:
+    """
+    Находит слова индекса, похожие на слово запроса.
+
+    Returns:
+        {token_id: score} — чем больше, тем лучше совпадение
+    """
+    tokens = index["tokens"]
+
+    # Короткий запрос не даёт триграмм внутри слова — проверяем подстроку напрямую
+    if len(q) < 3:
+        return {
+            tid: 4.0 if token == q else 3.0 if token.startswith(q) else 2.0
+            for tid, token in enumerate(tokens)
+            if q in token
+        }
+
+    q_grams = _trigrams(q)
+    overlap: Counter = Counter()
+    for gram in q_grams:
+        overlap.update(index["grams"].get(gram, ()))
+
+    limit = max_typos(q)
+    # При limit опечатках теряется не больше 3 * limit триграмм (и ещё одна —
+    # с концом слова, если запрос совпадает с началом более длинного слова)
+    min_overlap = max(1, len(q_grams) - 3 * limit - 1)
+    # Для подстроки нужны все внутренние триграммы запроса
+    inner = {g for g in q_grams if " " not in g}
+
+    matches = {}
+    for tid, common in overlap.items():
+        token = tokens[tid]
+        if token == q:
+            matches[tid] = 4.0
+        elif token.startswith(q):
+            matches[tid] = 3.0
+        elif len(inner) <= common and q in token:
+            matches[tid] = 2.0
+        elif limit and common >= min_overlap:
+            # Опечатка в слове целиком или в его начале; совпадение только
+            # с началом слова ранжируется чуть ниже (штраф 0.5 — к оценке, не к порогу)
+            full = bounded_levenshtein(q, token, limit)
+            prefix = bounded_levenshtein(q, token[:len(q)], limit)
+            if min(full, prefix) <= limit:
+                dist = min(full, prefix + 0.5)
+                matches[tid] = 1.5 - dist / (limit + 1)
+    return matches
+
+
+def search_names(index: dict, query: str) -> list:
+    """
+    Ищет сотрудников по ФИО: каждое слово запроса должно совпасть с каким-либо
+    словом ФИО точно, по префиксу, как подстрока или с опечатками.
+
+    Returns:
+        позиции сотрудников, отсортированные по убыванию релевантности
+    """
+    q_tokens = translit_key(query).split()
+    if not q_tokens:
+        return []
+
+    scores: dict = None
+    for q in q_tokens:
+        token_scores: dict = {}
+        for tid, score in _match_token(index, q).items():
+            for pos in index["token_pos"][tid]:
+                if score > token_scores.get(pos, 0):
+                    token_scores[pos] = score
+
+        if scores is None:
+            scores = token_scores
+        else:
+            scores = {pos: s + token_scores[pos] for pos, s in scores.items() if pos in token_scores}
+        if not scores:
+            return []
+
+    return sorted(scores, key=lambda pos: (-scores[pos], pos))
@@ -0,0 +1,107 @@
+"""
+Постраничный вывод результатов поиска с callback-данными без состояния.
+
+Вся информация, нужная для отрисовки страницы (версия снимка кэша, смещение,
+запрос), кодируется прямо в callback_data кнопки. Списки результатов
+в context.user_data не хранятся — страница строится по индексу снимка.
+
+Кнопки, открывающие карточку сотрудника, подписываются (sign_callback):
+callback_data присылает клиент, и без подписи по кнопке можно было бы
+запросить любой табельный в обход лимитов и журнала запросов.
+"""
+
+import base64
+import hashlib
+import hmac
+
+from telegram import InlineKeyboardButton
+
+from config import TOKEN
+
+# Telegram ограничивает callback_data 64 байтами
+CALLBACK_DATA_LIMIT = 64
+SEPARATOR = "|"
+# Байт HMAC в подписи кнопки (в base64 — 11 символов)
+SIGNATURE_BYTES = 8
+
+PAGE_SIZE = 10
+
+
+def encode_callback(prefix: str, *parts) -> str:
+    """Собирает callback_data вида 'prefix|part1|part2'."""
+    return SEPARATOR.join([prefix, *(str(p) for p in parts)])
+
+
+def decode_callback(data: str) -> list:
+    """Разбирает callback_data, возвращает части без префикса."""
+    return data.split(SEPARATOR)[1:]
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(TOKEN.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:SIGNATURE_BYTES]).decode().rstrip("=")
+
+
+def sign_callback(prefix: str, *parts) -> str:
+    """Как encode_callback, но с подписью последней частью: 'prefix|part1|part2|подпись'."""
+    data = encode_callback(prefix, *parts)
+    return f"{data}{SEPARATOR}{_signature(data)}"
+
+
+def verify_callback(data: str):
+    """
+    Проверяет подпись callback_data из sign_callback.
+
+    Returns:
+        части без префикса и подписи или None, если подпись не сошлась
+    """
+    payload, _, signature = data.rpartition(SEPARATOR)
+    if not payload or not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    return decode_callback(payload)
+
+
+def fits_callback(data: str) -> bool:
+    """Проверяет что callback_data помещается в лимит Telegram."""
+    return len(data.encode("utf-8")) <= CALLBACK_DATA_LIMIT
+
+
+def clean_query(query: str) -> str:
+    """Убирает из запроса символ-разделитель callback_data."""
+    return query.replace(SEPARATOR, " ").strip()
+
+
+def clamp_offset(offset: int, total: int, page_size: int = PAGE_SIZE) -> int:
+    """Приводит смещение к началу существующей страницы."""
+    if total <= 0:
+        return 0
+    offset = max(0, min(offset, total - 1))
+    return offset - offset % page_size
+
+
+def page_label(offset: int, total: int, page_size: int = PAGE_SIZE) -> str:
+    """Возвращает подпись 'Страница N из M'."""
+    pages = max(1, (total + page_size - 1) // page_size)
+    return f"Страница {offset // page_size + 1} из {pages}"
+
+
+def nav_row(prefix: str, version: int, offset: int, total: int, query: str,
+            page_size: int = PAGE_SIZE) -> list:
+    """
+    Строит ряд кнопок ◀️ / ▶️ для листания.
+
+    Returns:
+        список кнопок (пустой если страница одна)
+    """
+    row = []
+    if offset > 0:
+        row.append(InlineKeyboardButton(
+            "◀️ Назад",
+            callback_data=encode_callback(prefix, version, max(0, offset - page_size), query),
+        ))
+    if offset + page_size < total:
+        row.append(InlineKeyboardButton(
+            "Вперёд ▶️",
+            callback_data=encode_callback(prefix, version, offset + page_size, query),
+        ))
+    return row
@@ -0,0 +1,186 @@
+"""
+Профилирование работающего бота по команде админа (/profile, /memprofile).
+
+    • CPU — сэмплер стеков: фоновый поток раз в PROFILE_INTERVAL секунд
+      снимает стеки всех потоков (sys._current_frames), поэтому в отчёт
+      попадают и обработчики в event loop, и поток обновления кэша;
+    • память — tracemalloc на время замера: места, где выделено больше всего
+      памяти, пережившей замер.
+
+Вне замера ничего не работает и накладных расходов нет. Одновременно
+идёт только один замер.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from utils.helpers import fmt_dt, now_tashkent
+
+
+# Период сэмплирования стеков (сек)
+PROFILE_INTERVAL = 0.005
+# Глубина трассировки выделений памяти
+TRACEMALLOC_FRAMES = 10
+# Сколько строк в каждой таблице отчёта
+TOP_N = 30
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_busy = threading.Lock()
+
+
+def _where(filename: str, lineno: int, name: str = "") -> str:
+    """Короткое имя места в коде: пути проекта — относительно корня."""
+    if filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    else:
+        parts = filename.replace("\\", "/").split("/")
+        filename = "/".join(parts[-2:])
+    return f"{filename}:{lineno} {name}".rstrip()
+
+
+def _table(title: str, rows: list, total: int) -> list:
+    lines = [title, "-" * len(title)]
+    for key, count in rows:
+        share = count / total if total else 0
+        lines.append(f"{count:>8}  {share:>6.1%}  {key}")
+    lines.append("")
+    return lines
+
+
+# ================= CPU =================
+
+def _sample_stacks(seconds: float, interval: float) -> dict:
+    own = threading.get_ident()
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    stacks: Counter = Counter()
+    threads: Counter = Counter()
+    samples = 0
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            samples += 1
+            threads[names.get(ident, str(ident))] += 1
+
+            chain = []
+            f = frame
+            while f is not None:
+                code = f.f_code
+                chain.append(_where(code.co_filename, code.co_firstlineno, code.co_name))
+                f = f.f_back
+
+            self_counts[chain[0]] += 1
+            for key in set(chain):
+                total_counts[key] += 1
+            stacks[";".join(reversed(chain))] += 1
+        time.sleep(interval)
+
+    return {
+        "samples": samples,
+        "self": self_counts,
+        "total": total_counts,
+        "stacks": stacks,
+        "threads": threads,
+    }
+
+
+def profile_cpu(seconds: float, interval: float = PROFILE_INTERVAL):
+    """
+    Сэмплирует стеки всех потоков в течение seconds секунд (блокирует вызывающий поток).
+
+    Returns:
+        текст отчёта или None, если уже идёт другой замер
+    """
+    if not _busy.acquire(blocking=False):
+        return None
+    try:
+        started = now_tashkent()
+        data = _sample_stacks(seconds, interval)
+    finally:
+        _busy.release()
+
+    samples = data["samples"]
+    lines = [
+        f"CPU profile: {fmt_dt(started)}, {seconds:g} сек, шаг {interval * 1000:g} мс",
+        f"Сэмплов (поток × снимок): {samples}",
+        "Ожидание в select/wait/sleep — простой, а не нагрузка.",
+        "",
+    ]
+    lines += _table("Потоки", data["threads"].most_common(), samples)
+    lines += _table("Собственное время (верх стека)", data["self"].most_common(TOP_N), samples)
+    lines += _table("Включая вызовы (функция есть в стеке)", data["total"].most_common(TOP_N), samples)
+    lines += ["Стеки (collapsed, для flamegraph.pl / speedscope)", "-" * 50]
+    lines += [f"{stack} {count}" for stack, count in data["stacks"].most_common()]
+    return "\n".join(lines) + "\n"
+
+
+# ================= MEMORY =================
+
+_IGNORED = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+def profile_memory(seconds: float, frames: int = TRACEMALLOC_FRAMES):
+    """
+    Включает tracemalloc на seconds секунд (блокирует вызывающий поток).
+
+    Returns:
+        текст отчёта или None, если уже идёт другой замер
+    """
+    if tracemalloc.is_tracing() or not _busy.acquire(blocking=False):
+        return None
+    try:
+        started = now_tashkent()
+        tracemalloc.start(frames)
+        time.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot()
+        traced, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        _busy.release()
+
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, pattern) for pattern in _IGNORED])
+    by_line = snapshot.statistics("lineno")
+    by_trace = snapshot.statistics("traceback")
+
+    lines = [
+        f"Memory profile: {fmt_dt(started)}, {seconds:g} сек",
+        f"Живых выделений за замер: {traced / 1024:.0f} КБ, пик: {peak / 1024:.0f} КБ",
+        f"Весь процесс (RSS, макс.): {_max_rss_kb()} КБ",
+        "",
+        "Места выделения (живые к концу замера)",
+        "--------------------------------------",
+    ]
+    for stat in by_line[:TOP_N]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{stat.size / 1024:>10.1f} КБ  {stat.count:>8}  {_where(frame.filename, frame.lineno)}"
+        )
+
+    lines += ["", "Крупнейшие цепочки вызовов (от внешнего к месту выделения)", "-" * 58]
+    for stat in by_trace[:5]:
+        lines.append(f"{stat.size / 1024:.1f} КБ в {stat.count} блоках:")
+        for frame in stat.traceback:
+            lines.append(f"    {_where(frame.filename, frame.lineno)}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return "—"
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def is_running() -> bool:
+    return _busy.locked()
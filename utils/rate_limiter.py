@@ -1,33 +1,151 @@
 """
 Rate limiting для защиты от спама.
+
+Входящие запросы: token bucket на монотонных часах, отдельное ведро
+на каждую пару (пользователь, вид команды). Вёдра хранятся в общем хранилище
+состояния пользователей с TTL, равным времени полного наполнения: ведро,
+которое успело наполниться, ничем не отличается от нового и удаляется —
+память не растёт с каждым написавшим пользователем.
+
+Исходящие запросы: общий ограничитель отправки в Telegram (OutboundRateLimiter),
+чтобы при всплесках запросы вставали в очередь, а не получали flood wait.
 """
 
+import asyncio
+import logging
 import threading
-from collections import defaultdict, deque
-from datetime import timedelta
-from config import RATE_LIMIT_MAX, RATE_LIMIT_WINDOW
-from utils.helpers import now_tashkent
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    RATE_LIMIT_MAX, RATE_LIMIT_WINDOW,
+    CARD_RATE_LIMIT_MAX, CARD_RATE_LIMIT_WINDOW,
+    PVZ_RATE_LIMIT_MAX, PVZ_RATE_LIMIT_WINDOW,
+    INLINE_RATE_LIMIT_MAX, INLINE_RATE_LIMIT_WINDOW,
+    OUTBOUND_MSG_PER_SEC,
+)
+from utils.user_state import get_field, set_field
+from utils import metrics
 
 
-_rate_data: dict = defaultdict(deque)
+# Вид команды -> (ёмкость ведра, за сколько секунд оно наполняется полностью)
+BUCKETS = {
+    "lookup": (RATE_LIMIT_MAX, RATE_LIMIT_WINDOW),
+    "card": (CARD_RATE_LIMIT_MAX, CARD_RATE_LIMIT_WINDOW),
+    "pvz": (PVZ_RATE_LIMIT_MAX, PVZ_RATE_LIMIT_WINDOW),
+    "inline": (INLINE_RATE_LIMIT_MAX, INLINE_RATE_LIMIT_WINDOW),
+}
+
 _rate_lock = threading.Lock()
 
 
-def check_rate_limit(user_id: int) -> bool:
+def check_rate_limit(user_id: int, kind: str = "lookup") -> bool:
     """
     Проверяет не превышен ли лимит запросов для пользователя.
 
+    Args:
+        user_id: ID пользователя Telegram
+        kind: вид команды — ключ BUCKETS
+
     Returns:
         True если лимит НЕ превышен, False если превышен
     """
-    now = now_tashkent()
-    window_start = now - timedelta(seconds=RATE_LIMIT_WINDOW)
+    capacity, window = BUCKETS[kind]
+    rate = capacity / window
+    now = time.monotonic()
+
+    field = f"rate:{kind}"
 
     with _rate_lock:
-        dq = _rate_data[user_id]
-        while dq and dq[0] < window_start:
-            dq.popleft()
-        if len(dq) >= RATE_LIMIT_MAX:
-            return False
-        dq.append(now)
-        return True
+        bucket = get_field(user_id, field)
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        # Через window секунд ведро гарантированно полное — дальше его можно забыть
+        set_field(user_id, field, (tokens, now), ttl=window)
+
+    if not allowed:
+        metrics.inc("rate_limit_rejections_total", kind=kind)
+    return allowed
+
+
+# ================= OUTBOUND =================
+
+class TokenBucket:
+    """
+    Потокобезопасное ведро с резервированием: reserve() сразу списывает токен
+    (баланс может уйти в минус) и возвращает, сколько секунд подождать.
+    Ожидающие обслуживаются в порядке резервирования.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+            self._ts = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+# Общий бюджет исходящих сообщений бота: и PTB, и синхронные уведомления админу
+outbound_bucket = TokenBucket(rate=OUTBOUND_MSG_PER_SEC, capacity=OUTBOUND_MSG_PER_SEC)
+
+
+def wait_outbound_slot():
+    """Блокирующее ожидание слота отправки (для кода вне event loop)."""
+    delay = outbound_bucket.reserve()
+    if delay:
+        time.sleep(delay)
+
+
+class OutboundRateLimiter(BaseRateLimiter):
+    """
+    Ограничитель запросов PTB к Bot API: держит бота ниже лимита Telegram
+    (~30 сообщений/сек) и повторяет запрос после RetryAfter.
+    """
+
+    # Long polling не отправляет сообщений — не тратим на него бюджет
+    EXEMPT_ENDPOINTS = {"getUpdates"}
+
+    def __init__(self, max_retries: int = 2):
+        self._max_retries = max_retries
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        max_retries = rate_limit_args or self._max_retries
+
+        for attempt in range(max_retries + 1):
+            if endpoint not in self.EXEMPT_ENDPOINTS:
+                delay = outbound_bucket.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == max_retries:
+                    raise
+                sleep = e.retry_after if isinstance(e.retry_after, (int, float)) else e.retry_after.total_seconds()
+                logging.warning(f"⏱ Flood wait от Telegram ({endpoint}): повтор через {sleep} сек")
+                await asyncio.sleep(sleep + 0.1)
@@ -0,0 +1,178 @@
+"""
+Расписание обновления таблиц реестра — у каждой таблицы свой срок.
+
+Цикл обновления (utils/cache_manager.py) раз в REFRESH_TICK_SECONDS
+забирает из Google только таблицы, у которых подошёл срок, а интервал
+каждой подстраивается под неё:
+
+- таблица изменилась с прошлого чтения — интервал уменьшается вдвое,
+  не изменилась — растёт в полтора раза (в пределах REFRESH_MIN_SECONDS
+  и REFRESH_MAX_SECONDS). Ошибка или пустой ответ интервал не меняют;
+- по сотрудникам таблицы искали (record_hit) — следующее чтение
+  переносится на половину интервала от прошлого;
+- колонки B и C реестра — свои мин. и макс. интервал таблицы в минутах;
+  одинаковые значения — фиксированный интервал.
+
+Так часто меняющиеся и востребованные таблицы свежее, а неизменные
+читаются реже, чем раз в CACHE_TTL. Новая таблица читается сразу,
+первый интервал — CACHE_TTL.
+"""
+
+import threading
+import time
+
+from config import CACHE_TTL_SECONDS, REFRESH_MIN_SECONDS, REFRESH_MAX_SECONDS
+from utils import metrics
+
+# Множитель интервала: таблица изменилась / не изменилась / по ней искали
+SPEEDUP = 0.5
+BACKOFF = 1.5
+DEMAND = 0.5
+
+# spreadsheet_id -> {"interval", "next_at", "fetched_at", "hits", "min", "max", "fetches", "changes"}
+_sheets: dict = {}
+_lock = threading.Lock()
+# Новые таблицы не читаются раньше этого времени (см. restart)
+_not_before = 0.0
+
+
+def _bounds(entry: dict) -> tuple:
+    lo = entry["min"] or REFRESH_MIN_SECONDS
+    hi = entry["max"] or REFRESH_MAX_SECONDS
+    if entry["min"] and not entry["max"]:
+        hi = max(hi, lo)
+    elif entry["max"] and not entry["min"]:
+        lo = min(lo, hi)
+    return lo, max(lo, hi)
+
+
+def _clamp(entry: dict, seconds: float) -> float:
+    lo, hi = _bounds(entry)
+    return min(max(seconds, lo), hi)
+
+
+def sync(entries: list) -> bool:
+    """
+    Приводит расписание к реестру: добавляет новые таблицы (их срок — сейчас),
+    убирает удалённые, обновляет свои интервалы из колонок реестра.
+
+    Args:
+        entries: [(spreadsheet_id, мин. интервал или None, макс. интервал или None), ...]
+
+    Returns:
+        True если набор таблиц изменился
+    """
+    with _lock:
+        ids = {sid for sid, _, _ in entries}
+        changed = ids != set(_sheets)
+        for sid in [sid for sid in _sheets if sid not in ids]:
+            del _sheets[sid]
+        for sid, lo, hi in entries:
+            entry = _sheets.get(sid)
+            if entry is None:
+                entry = _sheets[sid] = {
+                    "interval": CACHE_TTL_SECONDS, "next_at": _not_before, "fetched_at": 0.0,
+                    "hits": 0, "fetches": 0, "changes": 0,
+                }
+            entry["min"], entry["max"] = lo, hi
+            entry["interval"] = _clamp(entry, entry["interval"])
+        return changed
+
+
+def sheet_ids() -> list:
+    """Все таблицы реестра в порядке реестра."""
+    with _lock:
+        return list(_sheets)
+
+
+def due(now: float = None) -> list:
+    """Таблицы, у которых подошёл срок обновления, в порядке реестра."""
+    now = time.time() if now is None else now
+    with _lock:
+        return [sid for sid, entry in _sheets.items() if entry["next_at"] <= now]
+
+
+def unread() -> list:
+    """Таблицы, которые ещё ни разу не читались с начала расписания."""
+    with _lock:
+        return [sid for sid, entry in _sheets.items() if not entry["fetches"]]
+
+
+def record_hit(spreadsheet_id: str):
+    """Поиск нашёл сотрудника этой таблицы; первый поиск после чтения приближает следующее."""
+    with _lock:
+        entry = _sheets.get(spreadsheet_id)
+        if entry is None:
+            return
+        entry["hits"] += 1
+        if entry["hits"] == 1 and entry["fetched_at"]:
+            sooner = entry["fetched_at"] + _clamp(entry, entry["interval"] * DEMAND)
+            entry["next_at"] = min(entry["next_at"], sooner)
+
+
+def record_fetch(spreadsheet_id: str, changed: bool, ok: bool = True, now: float = None):
+    """
+    Таблица прочитана: пересчитывает её интервал и следующий срок.
+
+    Args:
+        changed: данные отличаются от прошлого чтения
+        ok: чтение удалось (при ошибке и при первом чтении интервал не меняется)
+    """
+    now = time.time() if now is None else now
+    metrics.inc("sheet_refresh_total", result="error" if not ok else "changed" if changed else "unchanged")
+    with _lock:
+        entry = _sheets.get(spreadsheet_id)
+        if entry is None:
+            return
+        # Первое чтение сравнивать не с чем — интервал остаётся начальным
+        if ok and entry["fetches"]:
+            factor = SPEEDUP if changed else BACKOFF
+            entry["interval"] = _clamp(entry, entry["interval"] * factor)
+            entry["changes"] += changed
+        entry["fetches"] += 1
+        entry["fetched_at"] = now
+        entry["hits"] = 0
+        entry["next_at"] = now + entry["interval"]
+
+
+def restart(not_before: float = 0.0):
+    """
+    Сбрасывает расписание: все таблицы будут прочитаны заново, но не раньше
+    not_before. Вызывается, когда процесс стал обновителем вместо другого:
+    его прежние данные таблиц устарели, а свежий снимок ещё годен.
+    """
+    global _not_before
+    with _lock:
+        _sheets.clear()
+        _not_before = not_before
+
+
+def deferred() -> bool:
+    """После restart срок ещё не подошёл — ни реестр, ни таблицы читать не нужно."""
+    return time.time() < _not_before
+
+
+def next_due() -> float:
+    """Ближайший срок обновления (time.time()); None — таблиц нет."""
+    with _lock:
+        return min((entry["next_at"] for entry in _sheets.values()), default=None)
+
+
+def get_stats() -> dict:
+    """Для /status: число таблиц, разброс интервалов, востребованные, чтения и изменения."""
+    now = time.time()
+    with _lock:
+        entries = list(_sheets.values())
+    intervals = [entry["interval"] for entry in entries]
+    return {
+        "sheets": len(entries),
+        "due": sum(entry["next_at"] <= now for entry in entries),
+        "hot": sum(entry["hits"] > 0 for entry in entries),
+        "min_interval": min(intervals, default=0),
+        "max_interval": max(intervals, default=0),
+        "fetches": sum(entry["fetches"] for entry in entries),
+        "changes": sum(entry["changes"] for entry in entries),
+    }
+
+
+metrics.register_gauge("refresh_sheets_due", lambda: get_stats()["due"], "Таблиц, у которых подошёл срок обновления")
@@ -3,14 +3,14 @@
 """
 
 import threading
-from collections import defaultdict, deque
-from config import SUSPICIOUS_DIFF_IDS
+from collections import deque
 from utils.helpers import fmt_dt, now_tashkent
+from utils.analytics import record_request
+from utils.activity_detector import observe
 
 
 _request_log: deque = deque(maxlen=200)
 _log_lock = threading.Lock()
-_user_searched_ids: dict = defaultdict(set)
 
 
 def log_request(user_id: int, username: str, employee_id: str, role: str, found: bool, alert_callback=None):
@@ -23,7 +23,8 @@ def log_request(user_id: int, username: str, employee_id: str, role: str, found:
         employee_id: табельный номер
         role: роль (admin/mfu)
         found: найден ли сотрудник
-        alert_callback: функция для отправки алертов (принимает текст сообщения)
+        alert_callback: функция для отправки алертов (принимает текст сообщения);
+            вызывается из фонового потока
     """
     entry = {
         "time": fmt_dt(now_tashkent()),
@@ -36,16 +37,9 @@ def log_request(user_id: int, username: str, employee_id: str, role: str, found:
     with _log_lock:
         _request_log.append(entry)
 
-    _user_searched_ids[user_id].add(employee_id)
-    if len(_user_searched_ids[user_id]) >= SUSPICIOUS_DIFF_IDS:
-        if alert_callback:
-            alert_callback(
-                f"⚠️ Подозрительная активность!\n\n"
-                f"Пользователь: @{username} (ID: {user_id})\n"
-                f"Искал {len(_user_searched_ids[user_id])} разных табельных:\n"
-                f"{', '.join(_user_searched_ids[user_id])}"
-            )
-        _user_searched_ids[user_id] = set()
+    record_request(user_id, username, employee_id, role, found)
+
+    observe(user_id, username, employee_id, alert_callback)
 
 
 def get_request_log() -> list:
@@ -53,7 +47,3 @@ def get_request_log() -> list:
     with _log_lock:
         return list(_request_log)
 
-
-def clear_user_searches(user_id: int):
-    """Очищает историю поисков пользователя."""
-    _user_searched_ids[user_id] = set()
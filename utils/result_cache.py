@@ -0,0 +1,91 @@
+"""
+Кэш готовых ответов поиска /pvz и /asearch.
+
+Одни и те же запросы (`/pvz ТАШ-5` с одной точки) повторяются весь день;
+вместо повторного поиска, группировки и сборки клавиатуры отдаётся
+готовая страница — текст и клавиатура.
+
+Ключ — (вид поиска, версия снимка, нормализованный запрос, смещение),
+поэтому после обновления кэша старые ответы не выдаются: новая версия
+снимка — новые ключи. Записи версий, которых уже нет в памяти
+(cache_manager.SNAPSHOT_HISTORY), удаляются при публикации снимка;
+общий размер ограничен RESULT_CACHE_SIZE (вытесняются давно не
+запрошенные — LRU).
+
+Рядом хранится число результатов запроса (смещение None): по нему
+смещение из кнопки приводится к существующей странице ещё до поиска
+в кэше, и подделанные смещения не плодят записей.
+"""
+
+import threading
+from collections import OrderedDict
+
+from config import RESULT_CACHE_SIZE
+from utils import metrics
+
+KINDS = ("pvz", "asearch")
+
+# (вид, версия, запрос, смещение) -> ответ; (вид, версия, запрос, None) -> число результатов
+_entries: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+_hits = {kind: 0 for kind in KINDS}
+_misses = {kind: 0 for kind in KINDS}
+
+
+def get(kind: str, version: int, query: str, offset: int = 0):
+    """Готовый ответ или None, если его нет в кэше."""
+    key = (kind, version, query, offset)
+    with _lock:
+        value = _entries.get(key)
+        if value is None:
+            _misses[kind] += 1
+        else:
+            _entries.move_to_end(key)
+            _hits[kind] += 1
+    metrics.inc("result_cache_total", kind=kind, result="miss" if value is None else "hit")
+    return value
+
+
+def get_total(kind: str, version: int, query: str):
+    """Число результатов запроса, если его страницы уже строились; иначе None."""
+    with _lock:
+        return _entries.get((kind, version, query, None))
+
+
+def put(kind: str, version: int, query: str, offset: int, value, total: int):
+    """Сохраняет страницу ответа и число результатов запроса."""
+    if RESULT_CACHE_SIZE <= 0:
+        return
+    with _lock:
+        for key, item in (((kind, version, query, None), total), ((kind, version, query, offset), value)):
+            _entries[key] = item
+            _entries.move_to_end(key)
+        while len(_entries) > RESULT_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def discard_before(version: int):
+    """Удаляет ответы снимков старше version (вызывается при публикации снимка)."""
+    with _lock:
+        for key in [k for k in _entries if k[1] < version]:
+            del _entries[key]
+
+
+def _pages() -> int:
+    with _lock:
+        return sum(key[3] is not None for key in _entries)
+
+
+def get_stats() -> dict:
+    """Число записей и попадания/промахи по видам поиска."""
+    pages = _pages()
+    with _lock:
+        return {
+            "entries": pages,
+            "max_entries": RESULT_CACHE_SIZE,
+            "hits": dict(_hits),
+            "misses": dict(_misses),
+        }
+
+
+metrics.register_gauge("result_cache_entries", _pages, "Ответов поиска в кэше")
@@ -1,17 +1,20 @@
 import logging
-import requests
-from config import API_KEY
+from config import API_KEY, SHEETS_API_BASE, SHEETS_TIMEOUT_SECONDS
 from .admin_notifier import send_admin_message
+from . import metrics
 
 
 def load_sheet_values(api_url: str, token: str = None, admin_id: str = None) -> list:
+    # requests импортируется при первой загрузке (~60 мс), а не при старте бота
+    import requests
     try:
-        response = requests.get(api_url, timeout=15)
+        response = requests.get(api_url, timeout=SHEETS_TIMEOUT_SECONDS)
         response.raise_for_status()
         data = response.json()
         return data.get("values", [])
 
     except requests.exceptions.HTTPError as e:
+        metrics.inc("sheet_fetch_errors_total", status=e.response.status_code)
         error_text = (
             f"🚨 Ошибка Google API\n\nURL:\n{api_url}\n\n"
             f"Status:\n{e.response.status_code}\n\nОтвет:\n{e.response.text}"
@@ -21,6 +24,7 @@ def load_sheet_values(api_url: str, token: str = None, admin_id: str = None) ->
         return []
 
     except Exception as e:
+        metrics.inc("sheet_fetch_errors_total", status=type(e).__name__)
         error_text = f"🚨 Ошибка загрузки таблицы\n\nURL:\n{api_url}\n\nОшибка:\n{e}"
         logging.error(error_text)
         send_admin_message(error_text)
@@ -36,20 +40,52 @@ def load_records(api_url: str, token: str = None, admin_id: str = None) -> list:
     return [dict(zip(headers, row)) for row in values[1:]]
 
 
-def get_registry_ids(registry_spreadsheet_id: str, token: str = None, admin_id: str = None) -> list:
+def _minutes(row: list, col: int):
+    """Число минут из ячейки реестра в секундах; пусто или не число — None."""
+    try:
+        value = float(row[col].replace(",", "."))
+    except (IndexError, ValueError):
+        return None
+    return value * 60 if value > 0 else None
+
+
+def get_registry_entries(registry_spreadsheet_id: str) -> list:
+    """
+    Читает реестр вместе с настройками обновления таблиц:
+    колонка A — spreadsheet_id, B и C — мин. и макс. интервал обновления
+    в минутах (необязательно, см. utils/refresh_scheduler.py).
+
+    Returns:
+        [(spreadsheet_id, мин. интервал сек или None, макс. интервал сек или None), ...]
+    """
+    api_url = (
+        f"{SHEETS_API_BASE}/spreadsheets/{registry_spreadsheet_id}"
+        f"/values/A2:C?key={API_KEY}"
+    )
+    values = load_sheet_values(api_url)
+    entries = [
+        (row[0].strip(), _minutes(row, 1), _minutes(row, 2))
+        for row in values if row and row[0].strip()
+    ]
+    logging.info(f"Загружено {len(entries)} spreadsheet_id из реестра")
+    return entries
+
+
+def get_pvz_aliases(registry_spreadsheet_id: str, sheet_name: str) -> dict:
+    """Читает алиасы городов ПВЗ с листа реестра: колонка A — вариант, B — код."""
     api_url = (
-        f"https://sheets.googleapis.com/v4/spreadsheets/{registry_spreadsheet_id}"
-        f"/values/A2:A?key={API_KEY}"
+        f"{SHEETS_API_BASE}/spreadsheets/{registry_spreadsheet_id}"
+        f"/values/{sheet_name}!A2:B?key={API_KEY}"
     )
     values = load_sheet_values(api_url)
-    ids = [row[0].strip() for row in values if row and row[0]]
-    logging.info(f"Загружено {len(ids)} spreadsheet_id из реестра")
-    return ids
+    aliases = {row[0].strip(): row[1].strip() for row in values if len(row) >= 2 and row[0] and row[1]}
+    logging.info(f"Загружено {len(aliases)} алиасов ПВЗ из реестра")
+    return aliases
 
 
 def build_role_url(spreadsheet_id: str, role: str) -> str:
     sheet_name = "Администраторы" if role == "admin" else "МФУ"
     return (
-        f"https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}"
+        f"{SHEETS_API_BASE}/spreadsheets/{spreadsheet_id}"
         f"/values/{sheet_name}!A2:Z1000?key={API_KEY}"
     )
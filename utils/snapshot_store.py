@@ -0,0 +1,434 @@
+"""
+Общий снимок кэша для нескольких процессов бота на одной машине.
+
+Процесс-обновитель (CACHE_MODE=writer) после каждого обновления записывает
+снимок в SNAPSHOT_DIR в двоичном виде, пригодном для mmap: строки, массивы
+позиций и индексы (табельный, ПВЗ, имена) лежат плоскими массивами.
+Рабочие процессы (CACHE_MODE=reader) не ходят в Google: они отображают файл
+в память и читают его без копирования — страницы файла общие для всех
+процессов через page cache, поэтому память почти не растёт с числом воркеров.
+
+Переключение версий атомарное: файл снимка пишется под временным именем и
+переименовывается, затем так же подменяется указатель CURRENT. Старые файлы
+удаляются — уже отображённые снимки остаются доступны, пока на них есть ссылки.
+
+Формат файла:
+    MAGIC (8 байт) | смещение метаданных (u64) | длина метаданных (u64)
+    секции, выровненные по 8 байт
+    метаданные — JSON: версия, поля сотрудника, статистика, секции {имя: [смещение, длина]}
+
+Секции бывают трёх видов: u32 — массив чисел; строки — смещения (u32, n + 1)
+и UTF-8 данные; списки — смещения (u32, n + 1) и значения (u32).
+Словари — отсортированные ключи, значения и хеш-таблица (crc32 ключа,
+открытая адресация): поиск ключа — одно-два сравнения байтов без декодирования.
+Сотрудник хранится одной строкой, поля разделены FIELD_SEP. Готовые тексты
+ответов (utils/templates.py) — строковая секция replies, как и в памяти
+обновителя (pack_strings).
+"""
+
+import json
+import logging
+import mmap
+import os
+from array import array
+from zlib import crc32
+
+MAGIC = b"PVZSNAP2"
+HEADER_SIZE = 24
+ALIGN = 8
+CURRENT = "CURRENT"
+FIELD_SEP = "\x1f"
+# Сколько файлов снимков оставлять на диске (текущий и предыдущие)
+KEEP_FILES = 3
+
+
+# ================= READ-ONLY VIEWS =================
+
+class _Strings:
+    """Последовательность строк поверх смещений и UTF-8 данных."""
+
+    __slots__ = ("_off", "_blob", "_n")
+
+    def __init__(self, off: memoryview, blob: memoryview):
+        self._off = off
+        self._blob = blob
+        self._n = len(off) - 1
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if type(i) is int and 0 <= i < self._n:
+            off = self._off
+            return str(self._blob[off[i]:off[i + 1]], "utf-8")
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return str(self._blob[self._off[i]:self._off[i + 1]], "utf-8")
+
+    def raw(self, i: int) -> memoryview:
+        """Байты i-й строки без декодирования."""
+        return self._blob[self._off[i]:self._off[i + 1]]
+
+    def __iter__(self):
+        off, blob = self._off, self._blob
+        for i in range(self._n):
+            yield str(blob[off[i]:off[i + 1]], "utf-8")
+
+
+def pack_strings(values) -> _Strings:
+    """Упаковывает строки в один UTF-8 буфер со смещениями — без объекта на строку."""
+    off, blob = _pack(values)
+    return _Strings(memoryview(off), memoryview(bytes(blob)))
+
+
+def _pack(values) -> tuple:
+    off = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        off.append(len(blob))
+    return off, blob
+
+
+class _Lists:
+    """Последовательность списков чисел (CSR): элемент — срез общего массива."""
+
+    __slots__ = ("_off", "_values", "_n")
+
+    def __init__(self, off: memoryview, values: memoryview):
+        self._off = off
+        self._values = values
+        self._n = len(off) - 1
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return self._values[self._off[i]:self._off[i + 1]]
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self[i]
+
+
+class _SortedMap:
+    """Словарь только для чтения: отсортированные ключи, значения и хеш-таблица."""
+
+    __slots__ = ("_keys", "_values", "_table", "_mask")
+
+    def __init__(self, keys: _Strings, values, table: memoryview):
+        self._keys = keys
+        self._values = values
+        self._table = table
+        self._mask = len(table) - 1
+
+    def get(self, key, default=None):
+        if not isinstance(key, str):
+            return default
+        data = key.encode("utf-8")
+        table, mask, keys = self._table, self._mask, self._keys
+        slot = crc32(data) & mask
+        while True:
+            i = table[slot]
+            if not i:
+                return default
+            if keys.raw(i - 1) == data:
+                return self._values[i - 1]
+            slot = (slot + 1) & mask
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def keys(self):
+        return self._keys
+
+    def items(self):
+        return zip(self._keys, self._values)
+
+
+_MISSING = object()
+
+
+class _Employees:
+    """Список сотрудников: словарь собирается из строки файла при обращении."""
+
+    __slots__ = ("_fields", "_rows")
+
+    def __init__(self, fields: list, rows: _Strings):
+        self._fields = fields
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [dict(zip(self._fields, row.split(FIELD_SEP))) for row in self._rows[pos]]
+        return dict(zip(self._fields, self._rows[pos].split(FIELD_SEP)))
+
+    def __iter__(self):
+        fields = self._fields
+        for row in self._rows:
+            yield dict(zip(fields, row.split(FIELD_SEP)))
+
+
+# ================= WRITE =================
+
+class _Writer:
+    """Собирает секции файла с выравниванием."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sections: dict = {}
+        f.write(b"\0" * HEADER_SIZE)
+
+    def _section(self, name: str, data: bytes):
+        pad = -self.f.tell() % ALIGN
+        if pad:
+            self.f.write(b"\0" * pad)
+        self.sections[name] = [self.f.tell(), len(data)]
+        self.f.write(data)
+
+    def u32(self, name: str, values):
+        self._section(name, array("I", values).tobytes())
+
+    def strings(self, name: str, values):
+        if isinstance(values, _Strings):
+            # Уже упакованные строки пишутся как есть
+            self._section(f"{name}.off", values._off.tobytes())
+            self._section(f"{name}.data", values._blob.tobytes())
+            return
+        off, blob = _pack(values)
+        self._section(f"{name}.off", off.tobytes())
+        self._section(f"{name}.data", bytes(blob))
+
+    def lists(self, name: str, values):
+        off = array("I", [0])
+        flat = array("I")
+        for items in values:
+            flat.extend(items)
+            off.append(len(flat))
+        self._section(f"{name}.off", off.tobytes())
+        self._section(f"{name}.data", flat.tobytes())
+
+    def mapping(self, name: str, items: list, lists: bool = False):
+        """Словарь: отсортированные ключи, значения и хеш-таблица номеров ключей."""
+        items = sorted(items)
+        self.strings(f"{name}.keys", (k for k, _ in items))
+        if lists:
+            self.lists(f"{name}.values", (v for _, v in items))
+        else:
+            self.u32(f"{name}.values", (v for _, v in items))
+
+        # Заполненность не больше половины — цепочки проб короткие
+        size = 1 << max(1, (2 * len(items)).bit_length())
+        table = array("I", bytes(4 * size))
+        for i, (key, _) in enumerate(items):
+            slot = crc32(key.encode("utf-8")) & (size - 1)
+            while table[slot]:
+                slot = (slot + 1) & (size - 1)
+            table[slot] = i + 1
+        self._section(f"{name}.hash", table.tobytes())
+
+    def finish(self, meta: dict):
+        meta["sections"] = self.sections
+        payload = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        meta_offset = self.f.tell()
+        self.f.write(payload)
+        self.f.seek(0)
+        self.f.write(MAGIC + meta_offset.to_bytes(8, "little") + len(payload).to_bytes(8, "little"))
+
+
+def _snapshot_name(version: int) -> str:
+    return f"snapshot-{version:010d}.bin"
+
+
+def write_snapshot(snapshot: dict, directory: str, meta: dict = None) -> str:
+    """
+    Записывает снимок в directory и делает его текущим.
+
+    Args:
+        snapshot: снимок из cache_manager (см. схему там)
+        directory: каталог общих снимков
+        meta: дополнительные метаданные (статистика, время обновления, алиасы ПВЗ)
+
+    Returns:
+        путь к записанному файлу
+    """
+    os.makedirs(directory, exist_ok=True)
+    employees = snapshot["employees"]
+    fields = list(employees[0]) if employees else []
+    name_index = snapshot["name_index"]
+
+    version = snapshot["version"]
+    path = os.path.join(directory, _snapshot_name(version))
+    tmp = f"{path}.tmp{os.getpid()}"
+
+    with open(tmp, "wb") as f:
+        w = _Writer(f)
+        w.strings("employees", (
+            FIELD_SEP.join(str(emp[field]).replace(FIELD_SEP, " ") for field in fields)
+            for emp in employees
+        ))
+        for role in ("admin", "mfu"):
+            w.mapping(f"by_id.{role}", snapshot["by_id"][role].items())
+        w.mapping("by_pvz", snapshot["by_pvz"].items(), lists=True)
+        w.strings("name_index.tokens", name_index["tokens"])
+        w.lists("name_index.token_pos", name_index["token_pos"])
+        w.mapping("name_index.grams", name_index["grams"].items(), lists=True)
+        w.strings("id_keys", snapshot["id_keys"])
+        w.u32("id_pos", snapshot["id_pos"])
+        w.strings("pvz_keys", snapshot["pvz_keys"])
+        w.lists("pvz_pos", snapshot["pvz_pos"])
+        w.strings("name_keys", snapshot["name_keys"])
+        w.u32("name_pos", snapshot["name_pos"])
+        w.strings("replies", snapshot["replies"])
+        w.finish({**(meta or {}), "version": version, "fields": fields})
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+    _set_current(directory, os.path.basename(path))
+    _cleanup(directory)
+    return path
+
+
+def _set_current(directory: str, name: str):
+    tmp = os.path.join(directory, f"{CURRENT}.tmp{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(directory, CURRENT))
+
+
+def _cleanup(directory: str):
+    """Удаляет старые файлы снимков (отображённые в память остаются доступны)."""
+    files = sorted(n for n in os.listdir(directory) if n.startswith("snapshot-") and n.endswith(".bin"))
+    for name in files[:-KEEP_FILES]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError as e:
+            logging.warning(f"Не удалось удалить старый снимок {name}: {e}")
+
+
+# ================= READ =================
+
+def current_name(directory: str):
+    """Имя файла текущего снимка или None, если снимков ещё нет."""
+    try:
+        with open(os.path.join(directory, CURRENT), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_version(directory: str) -> int:
+    """Версия текущего снимка в каталоге (0 — снимков нет)."""
+    name = current_name(directory)
+    if not name:
+        return 0
+    try:
+        return int(name[len("snapshot-"):-len(".bin")])
+    except ValueError:
+        return 0
+
+
+def open_snapshot(path: str) -> tuple:
+    """
+    Отображает файл снимка в память.
+
+    Returns:
+        (snapshot, meta) — snapshot с теми же ключами, что и в cache_manager,
+        но только для чтения и без копирования данных в память процесса
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mm)
+    if bytes(view[:8]) != MAGIC:
+        raise ValueError(f"{path}: не файл снимка")
+    meta_offset = int.from_bytes(view[8:16], "little")
+    meta_len = int.from_bytes(view[16:24], "little")
+    meta = json.loads(str(view[meta_offset:meta_offset + meta_len], "utf-8"))
+    sections = meta["sections"]
+
+    def raw(name: str) -> memoryview:
+        offset, length = sections[name]
+        return view[offset:offset + length]
+
+    def u32(name: str) -> memoryview:
+        return raw(name).cast("I")
+
+    def strings(name: str) -> _Strings:
+        return _Strings(u32(f"{name}.off"), raw(f"{name}.data"))
+
+    def lists(name: str) -> _Lists:
+        return _Lists(u32(f"{name}.off"), u32(f"{name}.data"))
+
+    def mapping(name: str, values) -> _SortedMap:
+        return _SortedMap(strings(f"{name}.keys"), values, u32(f"{name}.hash"))
+
+    by_id = {
+        role: mapping(f"by_id.{role}", u32(f"by_id.{role}.values"))
+        for role in ("admin", "mfu")
+    }
+    snapshot = {
+        "version": meta["version"],
+        "employees": _Employees(meta["fields"], strings("employees")),
+        "by_id": by_id,
+        "by_pvz": mapping("by_pvz", lists("by_pvz.values")),
+        "name_index": {
+            "tokens": strings("name_index.tokens"),
+            "token_pos": lists("name_index.token_pos"),
+            "grams": mapping("name_index.grams", lists("name_index.grams.values")),
+        },
+        "id_keys": strings("id_keys"),
+        "id_pos": u32("id_pos"),
+        # Отсортированные табельные роли — это ключи by_id
+        "id_sorted": {role: by_id[role].keys() for role in ("admin", "mfu")},
+        "pvz_keys": strings("pvz_keys"),
+        "pvz_pos": lists("pvz_pos"),
+        "name_keys": strings("name_keys"),
+        "name_pos": u32("name_pos"),
+        "replies": strings("replies"),
+    }
+    return snapshot, meta
+
+
+def open_current(directory: str, known: str = None):
+    """
+    Открывает текущий снимок, если он сменился.
+
+    Args:
+        directory: каталог общих снимков
+        known: имя файла уже открытого снимка
+
+    Returns:
+        (имя файла, snapshot, meta) или None, если снимок не сменился или его нет
+    """
+    name = current_name(directory)
+    if not name or name == known:
+        return None
+    snapshot, meta = open_snapshot(os.path.join(directory, name))
+    return name, snapshot, meta
@@ -0,0 +1,75 @@
+"""
+Отчёт о времени запуска бота и фоновый прогрев тяжёлых ресурсов.
+
+bot.py отмечает этапы загрузки (mark): импорт PTB, модулей бота, сборка
+Application. Когда бот готов принимать апдейты (ready), в лог пишется отчёт:
+
+    ⏱ Запуск: telegram.ext 190 мс | utils 45 мс | handlers 6 мс | application 12 мс | готов через 260 мс
+
+После этого в фоне прогреваются ресурсы, которые нужны не каждой сессии
+(Pillow, шрифты и иконки карточки) — первая «Поделиться карточкой» не
+платит за их загрузку. Время до первого обслуженного апдейта пишется
+в лог отдельно.
+
+Отсчёт идёт от импорта этого модуля — он импортируется в bot.py первым.
+"""
+
+import logging
+import threading
+import time
+
+_started = time.perf_counter()
+_last = _started
+_phases: list = []          # (этап, мс)
+_ready_at = None
+_first_update_logged = False
+
+
+def _ms(seconds: float) -> float:
+    return seconds * 1000
+
+
+def mark(phase: str):
+    """Отмечает окончание этапа загрузки."""
+    global _last
+    now = time.perf_counter()
+    _phases.append((phase, _ms(now - _last)))
+    _last = now
+
+
+def report() -> str:
+    parts = [f"{phase} {ms:.0f} мс" for phase, ms in _phases]
+    if _ready_at is not None:
+        parts.append(f"готов через {_ms(_ready_at - _started):.0f} мс")
+    return "⏱ Запуск: " + " | ".join(parts)
+
+
+def ready(warmup: bool = True):
+    """Бот готов принимать апдейты: пишет отчёт и запускает фоновый прогрев."""
+    global _ready_at
+    if _ready_at is not None:
+        return
+    mark("start")
+    _ready_at = time.perf_counter()
+    logging.info(report())
+    if warmup:
+        threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+
+
+def first_update_served():
+    """Вызывается после каждого апдейта; в лог попадает только первый."""
+    global _first_update_logged
+    if _first_update_logged:
+        return
+    _first_update_logged = True
+    logging.info(f"⏱ Первый апдейт обслужен через {_ms(time.perf_counter() - _started):.0f} мс после старта")
+
+
+def _warm_up():
+    started = time.perf_counter()
+    try:
+        from utils import card_generator
+        card_generator.warm_up()
+        logging.info(f"⏱ Прогрев карточек (Pillow, шрифты, иконки): {_ms(time.perf_counter() - started):.0f} мс")
+    except Exception as e:
+        logging.warning(f"Прогрев карточек не удался: {e}")
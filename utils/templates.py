@@ -0,0 +1,61 @@
+"""
+Шаблоны ответов с данными сотрудника — единственное место, где задан их текст.
+
+Карточки не собираются при каждом поиске: при построении снимка кэша
+(utils/cache_manager.py) для каждого сотрудника готовятся оба варианта
+ответа — без табельного (поиск по своему табельному) и с табельным
+(/pvz, /asearch, inline). Хранятся они упакованными в один UTF-8 буфер
+(snapshot_store.pack_strings), поиск — обращение к индексу и отправка.
+"""
+
+DIVIDER = "━━━━━━━━━━━━━━━━━\n"
+
+
+def employee_card(data: dict, role: str, with_id: bool = False) -> str:
+    """
+    Текст карточки сотрудника (HTML).
+
+    Args:
+        data: словарь сотрудника из снимка
+        role: роль, под которой сотрудник найден; лимиты — только у admin
+        with_id: добавить строку с табельным номером
+    """
+    parts = [
+        f"👤  <b>{data['fio']}</b>\n"
+        f"🏢  <b>ПВЗ:</b> {data['pvz']}\n"
+    ]
+    if with_id:
+        parts.append(f"🆔  <b>Табельный:</b> <code>{data['employee_id']}</code>\n")
+    parts.append(
+        f"{DIVIDER}"
+        f"⏱  <b>Факт часов:</b>  {data['fact']}\n"
+        f"{DIVIDER}"
+    )
+    if role == "admin":
+        parts.append(
+            f"📊  <b>Лимиты</b>\n"
+            f"   Открыто:       {data['open_limits']}\n"
+            f"   План:           {data['plan_limits']}\n"
+            f"   Выполнение:  {data['execution']}\n"
+            f"{DIVIDER}"
+        )
+    parts.append(
+        f"💳  <b>Карты</b>\n"
+        f"   Виртуальные:  {data['virtual_cards']}\n"
+        f"   Пластиковые:  {data['plastic_cards']}\n"
+        f"{DIVIDER}"
+        f"🎥  <b>ВЧЛ:</b>  {data['vchl']}"
+    )
+    return "".join(parts)
+
+
+def employee_replies(employees) -> list:
+    """
+    Оба варианта карточки для каждого сотрудника подряд:
+    [без табельного, с табельным, ...] — индекс 2 * pos + with_id.
+    """
+    texts = []
+    for emp in employees:
+        texts.append(employee_card(emp, emp["role"]))
+        texts.append(employee_card(emp, emp["role"], with_id=True))
+    return texts
@@ -0,0 +1,80 @@
+"""
+Параллельная обработка апдейтов с сохранением порядка для каждого пользователя.
+
+По умолчанию PTB обрабатывает апдейты строго по одному: медленный список /pvz
+или генерация карточки задерживают всех, кто стоит в очереди за ними.
+С concurrent_updates апдейты разных пользователей обрабатываются параллельно
+(не больше CONCURRENT_UPDATES одновременно).
+
+Апдейты одного пользователя при этом идут строго по порядку: ConversationHandler
+хранит состояние диалога и переключает его по результату обработчика — если
+«роль» и «табельный» от одного человека обработать одновременно, табельный
+попадёт в старое состояние диалога и потеряется.
+"""
+
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def _order_key(update: object):
+    """Ключ очереди апдейта: пользователь, иначе чат; None — порядок не важен."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает апдейты параллельно, но апдейты одного пользователя — по одному
+    и в порядке поступления (asyncio.Lock отдаёт блокировку ожидающим по очереди).
+
+    Слот из CONCURRENT_UPDATES апдейт занимает, только когда подошла его
+    очередь у пользователя: ожидающие апдейты слотов не держат, и всплеск
+    от одного пользователя не задерживает остальных.
+    """
+
+    __slots__ = ("_locks",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # ключ -> [блокировка, число апдейтов в работе и в ожидании]
+        self._locks: dict = {}
+
+    async def process_update(self, update, coroutine):
+        # Базовый класс берёт слот (семафор) сразу — сначала очередь пользователя
+        key = _order_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    @property
+    def waiting_users(self) -> int:
+        """Пользователей, у которых есть апдейты в работе или в очереди."""
+        return len(self._locks)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,254 @@
+"""
+Единое хранилище состояния пользователей.
+
+Всё, что бот помнит о пользователе (роль, последний ПВЗ, последняя карточка,
+вёдра rate limit...), лежит здесь, а не в разрозненных словарях модулей.
+
+    • у каждого поля свой TTL (FIELD_TTLS) — устаревшее удаляется само;
+    • общий объём ограничен USER_STATE_MAX_KB — при превышении вытесняются
+      пользователи, которые дольше всех не обращались к боту (LRU);
+    • поля из PERSISTED_FIELDS можно сохранять в локальный SQLite
+      (USER_STATE_DB): записи копятся и сбрасываются пачкой раз в
+      USER_STATE_FLUSH_SECONDS, после рестарта загружаются обратно.
+"""
+
+import atexit
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from config import USER_STATE_MAX_KB, USER_STATE_DB, USER_STATE_FLUSH_SECONDS
+from utils import metrics
+
+
+# Поле -> время жизни (сек). Для вёдер rate limiter ("rate:*") и детектора
+# активности ("activity", "alert_cooldown") TTL передаётся явно при записи.
+FIELD_TTLS = {
+    "role": 12 * 3600,
+    "last_pvz": 30 * 24 * 3600,
+    "last_employee": 3600,
+}
+DEFAULT_TTL = 3600
+
+PERSISTED_FIELDS = {"role", "last_pvz"}
+
+# Как часто удалять просроченные поля (сек)
+SWEEP_INTERVAL = 60
+
+# user_id -> {"fields": {name: [value, expires_at, size]}, "size": int}
+_users: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+_total_size = 0
+_last_sweep = time.time()
+
+# (user_id, field) -> (значение, истекает) для записи в SQLite; значение None — удалить
+_dirty: dict = {}
+_db_path = ""
+
+
+def _sizeof(value) -> int:
+    """Приблизительный размер значения в байтах (с содержимым контейнеров)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+def _mark_dirty(user_id: int, field: str, value, expires_at: float = 0):
+    if _db_path and field in PERSISTED_FIELDS:
+        _dirty[(user_id, field)] = (value, expires_at)
+
+
+def _drop_field(user_id: int, entry: dict, field: str):
+    """Удаляет поле пользователя. Вызывать под _lock."""
+    global _total_size
+    _, _, size = entry["fields"].pop(field)
+    entry["size"] -= size
+    _total_size -= size
+    _mark_dirty(user_id, field, None)
+    if not entry["fields"]:
+        del _users[user_id]
+
+
+def _sweep(now: float):
+    """Удаляет просроченные поля. Вызывать под _lock."""
+    global _last_sweep
+    _last_sweep = now
+    for user_id in list(_users):
+        entry = _users[user_id]
+        for field in [f for f, (_, exp, _) in entry["fields"].items() if exp <= now]:
+            _drop_field(user_id, entry, field)
+            if user_id not in _users:
+                break
+
+
+def _evict_lru():
+    """Вытесняет давно неактивных пользователей, пока объём выше лимита. Вызывать под _lock."""
+    global _total_size
+    limit = USER_STATE_MAX_KB * 1024
+    while _total_size > limit and len(_users) > 1:
+        user_id, entry = _users.popitem(last=False)
+        _total_size -= entry["size"]
+
+
+def get_field(user_id: int, field: str, default=None):
+    """Возвращает значение поля или default, если его нет или оно просрочено."""
+    now = time.time()
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is None:
+            return default
+        item = entry["fields"].get(field)
+        if item is None:
+            return default
+        if item[1] <= now:
+            _drop_field(user_id, entry, field)
+            return default
+        _users.move_to_end(user_id)
+        return item[0]
+
+
+def set_field(user_id: int, field: str, value, ttl: float = None):
+    """Записывает значение поля; TTL по умолчанию берётся из FIELD_TTLS."""
+    global _total_size
+    now = time.time()
+    if ttl is None:
+        ttl = FIELD_TTLS.get(field, DEFAULT_TTL)
+    size = _sizeof(value)
+
+    with _lock:
+        if now - _last_sweep >= SWEEP_INTERVAL:
+            _sweep(now)
+
+        entry = _users.get(user_id)
+        if entry is None:
+            entry = _users[user_id] = {"fields": {}, "size": 0}
+        else:
+            _users.move_to_end(user_id)
+
+        old = entry["fields"].get(field)
+        if old is not None:
+            entry["size"] -= old[2]
+            _total_size -= old[2]
+
+        entry["fields"][field] = [value, now + ttl, size]
+        entry["size"] += size
+        _total_size += size
+        _mark_dirty(user_id, field, value, now + ttl)
+        _evict_lru()
+
+
+def pop_field(user_id: int, field: str):
+    """Удаляет поле пользователя."""
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is not None and field in entry["fields"]:
+            _drop_field(user_id, entry, field)
+
+
+def get_stats() -> dict:
+    """Возвращает число пользователей в памяти и занятый объём."""
+    with _lock:
+        return {
+            "users": len(_users),
+            "bytes": _total_size,
+            "limit_bytes": USER_STATE_MAX_KB * 1024,
+            "pending_writes": len(_dirty),
+        }
+
+
+metrics.register_gauge("user_state_users", lambda: len(_users), "Пользователей в хранилище состояния")
+metrics.register_gauge("user_state_bytes", lambda: _total_size, "Объём хранилища состояния (байт)")
+
+
+# ================= PERSISTENCE =================
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(_db_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS user_state ("
+        " user_id INTEGER NOT NULL,"
+        " field TEXT NOT NULL,"
+        " value TEXT NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " PRIMARY KEY (user_id, field))"
+    )
+    return conn
+
+
+def flush():
+    """Сбрасывает накопленные изменения в SQLite одной транзакцией."""
+    if not _db_path:
+        return
+
+    with _lock:
+        if not _dirty:
+            return
+        batch = [(user_id, field, value, expires_at)
+                 for (user_id, field), (value, expires_at) in _dirty.items()]
+        _dirty.clear()
+
+    try:
+        conn = _connect()
+        with conn:
+            for user_id, field, value, expires_at in batch:
+                if value is None:
+                    conn.execute("DELETE FROM user_state WHERE user_id = ? AND field = ?", (user_id, field))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO user_state VALUES (?, ?, ?, ?)",
+                        (user_id, field, json.dumps(value, ensure_ascii=False), expires_at),
+                    )
+            conn.execute("DELETE FROM user_state WHERE expires_at <= ?", (time.time(),))
+        conn.close()
+    except Exception as e:
+        logging.error(f"Не удалось сохранить состояние пользователей: {e}")
+
+
+def _load():
+    """Загружает непросроченные поля из SQLite в память."""
+    global _total_size
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT user_id, field, value, expires_at FROM user_state WHERE expires_at > ?",
+        (time.time(),),
+    ).fetchall()
+    conn.close()
+
+    with _lock:
+        for user_id, field, raw, expires_at in rows:
+            value = json.loads(raw)
+            size = _sizeof(value)
+            entry = _users.setdefault(user_id, {"fields": {}, "size": 0})
+            entry["fields"][field] = [value, expires_at, size]
+            entry["size"] += size
+            _total_size += size
+        _evict_lru()
+    logging.info(f"👤 Загружено состояние {len(rows)} полей пользователей из {_db_path}")
+
+
+def init_persistence():
+    """Включает сохранение в SQLite, если задан USER_STATE_DB."""
+    global _db_path
+    if not USER_STATE_DB:
+        return
+
+    _db_path = USER_STATE_DB
+    try:
+        _load()
+    except Exception as e:
+        logging.error(f"Не удалось загрузить состояние пользователей: {e}")
+
+    def _loop():
+        while True:
+            threading.Event().wait(USER_STATE_FLUSH_SECONDS)
+            flush()
+
+    threading.Thread(target=_loop, daemon=True).start()
+    atexit.register(flush)
@@ -0,0 +1,151 @@
+"""
+Режим webhook: Telegram сам присылает апдейты на встроенный HTTP-сервер (aiohttp).
+
+По сравнению с long polling:
+    • апдейт приходит сразу, без ожидания очередного getUpdates;
+    • нет конфликтов «terminated by other getUpdates request», когда при
+      деплое старый и новый экземпляры работают одновременно — webhook
+      указывает на тот экземпляр, который зарегистрировал его последним.
+
+Каждый запрос проверяется по заголовку X-Telegram-Bot-Api-Secret-Token.
+При SIGTERM/SIGINT сервер перестаёт принимать апдейты (503 — Telegram
+повторит доставку), дообрабатывает уже принятые не дольше
+WEBHOOK_DRAIN_SECONDS и только потом закрывается.
+
+aiohttp есть в requirements.txt; импортируется только в этом режиме.
+"""
+
+import asyncio
+import hmac
+import logging
+import secrets
+import signal
+
+from telegram import Update
+
+from config import (
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS, WEBHOOK_DRAIN_SECONDS, WEBHOOK_REUSE_PORT,
+)
+from utils import metrics, startup
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def _secret() -> str:
+    if WEBHOOK_SECRET:
+        return WEBHOOK_SECRET
+    # Секрет задаём сами при setWebhook, поэтому годится и случайный — но тогда
+    # при деплое старый экземпляр отвергает апдейты, адресованные новому
+    logging.warning("WEBHOOK_SECRET не задан — используется случайный секрет")
+    return secrets.token_urlsafe(32)
+
+
+def build_web_app(application, secret: str, state: dict):
+    """Собирает aiohttp-приложение: POST WEBHOOK_PATH — апдейты, GET /healthz — готовность."""
+    from aiohttp import web
+
+    async def handle_update(request):
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            metrics.inc("webhook_requests_total", status="403")
+            return web.Response(status=403)
+        if state["draining"]:
+            metrics.inc("webhook_requests_total", status="503")
+            return web.Response(status=503)
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logging.warning(f"Некорректный апдейт во webhook: {e}")
+            metrics.inc("webhook_requests_total", status="400")
+            return web.Response(status=400)
+
+        # Отвечаем сразу: обработка идёт из очереди, как при polling
+        await application.update_queue.put(update)
+        metrics.inc("webhook_requests_total", status="200")
+        return web.Response(status=200)
+
+    async def handle_healthz(request):
+        status, text = metrics.healthz()
+        if state["draining"]:
+            status, text = 503, "draining\n"
+        return web.Response(status=status, text=text)
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle_update)
+    app.router.add_get("/healthz", handle_healthz)
+    return app
+
+
+async def serve_webhook(application, stop_event: asyncio.Event = None, port: int = None,
+                        register: bool = True, ready: dict = None) -> dict:
+    """
+    Запускает приложение в режиме webhook и работает до сигнала остановки.
+
+    Args:
+        application: собранный Application (см. bot.build_application)
+        stop_event: событие остановки; по умолчанию — SIGTERM/SIGINT
+        port: порт сервера (по умолчанию WEBHOOK_PORT)
+        register: зарегистрировать webhook в Telegram (setWebhook)
+        ready: словарь, куда после запуска записываются port, secret и ready=True
+
+    Returns:
+        {"drained": bool} — успели ли дообработать принятые апдейты
+    """
+    from aiohttp import web
+
+    if register and not WEBHOOK_URL:
+        raise RuntimeError("Для режима webhook нужен WEBHOOK_URL")
+
+    loop = asyncio.get_running_loop()
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop_event.set)
+
+    secret = _secret()
+    state = {"draining": False, "secret": secret}
+    runner = web.AppRunner(build_web_app(application, secret, state))
+
+    await application.initialize()
+    await application.start()
+    await runner.setup()
+    site = web.TCPSite(
+        runner, WEBHOOK_LISTEN, WEBHOOK_PORT if port is None else port,
+        reuse_port=WEBHOOK_REUSE_PORT or None,
+    )
+    await site.start()
+    state["port"] = runner.addresses[0][1] if runner.addresses else port
+    logging.info(f"🌐 Webhook-сервер слушает {WEBHOOK_LISTEN}:{state['port']}{WEBHOOK_PATH}")
+
+    if register:
+        await application.bot.set_webhook(
+            url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=secret,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        logging.info(f"🌐 Webhook зарегистрирован: {WEBHOOK_URL}{WEBHOOK_PATH}")
+    startup.ready()
+
+    if ready is not None:
+        ready.update(state)
+        ready["ready"] = True
+
+    await stop_event.wait()
+
+    # Новые апдейты — 503 (Telegram повторит), принятые — дообрабатываем
+    state["draining"] = True
+    logging.info("🌐 Остановка: дообрабатываем принятые апдейты...")
+    drained = True
+    try:
+        await asyncio.wait_for(application.stop(), WEBHOOK_DRAIN_SECONDS)
+    except asyncio.TimeoutError:
+        # wait_for отменяет stop(): недообработанные апдейты бросаем,
+        # но HTTP-клиент бота и persistence всё равно закрываем
+        drained = False
+        logging.warning(f"Не все апдейты обработаны за {WEBHOOK_DRAIN_SECONDS} сек")
+    finally:
+        await runner.cleanup()
+        await application.shutdown()
+    logging.info("🌐 Webhook-сервер остановлен")
+    return {"drained": drained}